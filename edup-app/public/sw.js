@@ -1,6 +1,106 @@
 const CACHE_NAME = "edup-v1";
 const PRECACHE_URLS = ["/", "/manifest.json"];
 
+// 音声は scripts/tts_precache.py が書き出すマニフェストに従ってプリキャッシュする。
+// マニフェスト自体も AUDIO_CACHE に保存しておき、次回の更新時に
+// ハッシュが変わったファイルだけを取り直す。
+const AUDIO_CACHE = "edup-audio";
+const AUDIO_MANIFEST_URL = "/audio/precache-manifest.json";
+// アプリが読み込む形式だけをプリキャッシュする（.opus は対象外）
+const AUDIO_PRECACHE_EXTENSIONS = [".mp3", ".json"];
+// sw.js が変わらなくても音声の再生成を拾えるよう、ページ遷移時にも確認する（この間隔ごと）
+const AUDIO_SYNC_INTERVAL_MS = 60 * 60 * 1000;
+let lastAudioSync = 0;
+
+function isPrecachedAudio(url) {
+  return AUDIO_PRECACHE_EXTENSIONS.some((ext) => url.endsWith(ext));
+}
+
+// マニフェストの URL は日本語のファイル名をそのまま含むので、キャッシュのキー
+// （パーセントエンコードされた pathname）と比べるときはこの形にそろえる
+function audioPath(url) {
+  return new URL(url, self.location).pathname;
+}
+
+async function readCachedManifest(cache) {
+  const response = await cache.match(AUDIO_MANIFEST_URL);
+  if (!response) return { apps: {} };
+  try {
+    return await response.json();
+  } catch {
+    return { apps: {} };
+  }
+}
+
+/** マニフェストを取得し、変更のあった音声だけをアプリごとにキャッシュし直す */
+async function syncAudioCache() {
+  lastAudioSync = Date.now();
+  const response = await fetch(AUDIO_MANIFEST_URL, { cache: "no-store" });
+  if (!response.ok) return;
+  const manifest = await response.clone().json();
+  const cache = await caches.open(AUDIO_CACHE);
+  const previous = await readCachedManifest(cache);
+  if (previous.version === manifest.version) return;
+
+  const previousHashes = new Map();
+  for (const entries of Object.values(previous.apps || {})) {
+    for (const entry of entries) previousHashes.set(entry.url, entry.hash);
+  }
+
+  const current = new Set();
+  const failed = new Set();
+  for (const entries of Object.values(manifest.apps)) {
+    const stale = [];
+    for (const entry of entries) {
+      if (!isPrecachedAudio(entry.url)) continue;
+      current.add(audioPath(entry.url));
+      const cached =
+        previousHashes.get(entry.url) === entry.hash &&
+        (await cache.match(entry.url));
+      if (!cached) stale.push(entry.url);
+    }
+    // 1ファイルの失敗でアプリ全体のプリキャッシュを止めない
+    await Promise.all(
+      stale.map((url) =>
+        fetch(url, { cache: "reload" })
+          .then((res) => {
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            return cache.put(url, res);
+          })
+          .catch(() => failed.add(url))
+      )
+    );
+  }
+
+  // マニフェストから消えたファイルを削除
+  const requests = await cache.keys();
+  await Promise.all(
+    requests
+      .filter((req) => {
+        const path = new URL(req.url).pathname;
+        return path !== AUDIO_MANIFEST_URL && !current.has(path);
+      })
+      .map((req) => cache.delete(req))
+  );
+
+  if (failed.size === 0) {
+    await cache.put(AUDIO_MANIFEST_URL, response);
+    return;
+  }
+  // 取れなかったファイルがあれば、取れた分だけを version なしで記録する。
+  // 次回は version が一致しないので、記録にないファイルだけを取り直す
+  const apps = {};
+  for (const [group, entries] of Object.entries(manifest.apps)) {
+    apps[group] = entries.filter((entry) => !failed.has(entry.url));
+  }
+  await cache.put(
+    AUDIO_MANIFEST_URL,
+    new Response(JSON.stringify({ apps }), {
+      headers: { "Content-Type": "application/json" },
+    })
+  );
+}
+
 self.addEventListener("install", (event) => {
   event.waitUntil(
     caches.open(CACHE_NAME).then((cache) => cache.addAll(PRECACHE_URLS))
@@ -10,16 +110,61 @@ self.addEventListener("install", (event) => {
 
 self.addEventListener("activate", (event) => {
   event.waitUntil(
-    caches.keys().then((keys) =>
-      Promise.all(
-        keys.filter((key) => key !== CACHE_NAME).map((key) => caches.delete(key))
+    caches
+      .keys()
+      .then((keys) =>
+        Promise.all(
+          keys
+            .filter((key) => key !== CACHE_NAME && key !== AUDIO_CACHE)
+            .map((key) => caches.delete(key))
+        )
       )
-    )
+      .then(() => syncAudioCache().catch(() => undefined))
   );
   self.clients.claim();
 });
 
+self.addEventListener("message", (event) => {
+  // ページ側から再生成後の更新を促す: navigator.serviceWorker.controller.postMessage("sync-audio")
+  if (event.data === "sync-audio") {
+    event.waitUntil(syncAudioCache().catch(() => undefined));
+  }
+});
+
 self.addEventListener("fetch", (event) => {
+  const url = new URL(event.request.url);
+
+  if (
+    event.request.mode === "navigate" &&
+    Date.now() - lastAudioSync > AUDIO_SYNC_INTERVAL_MS
+  ) {
+    event.waitUntil(syncAudioCache().catch(() => undefined));
+  }
+
+  // Cache-first for audio: precached by syncAudioCache, filled on miss
+  if (
+    event.request.method === "GET" &&
+    url.origin === self.location.origin &&
+    url.pathname.startsWith("/audio/") &&
+    url.pathname !== AUDIO_MANIFEST_URL
+  ) {
+    event.respondWith(
+      caches.open(AUDIO_CACHE).then((cache) =>
+        cache.match(url.pathname).then(
+          (cached) =>
+            cached ||
+            fetch(event.request).then((response) => {
+              if (response.status === 200 && isPrecachedAudio(url.pathname)) {
+                cache.put(url.pathname, response.clone());
+              }
+              return response;
+            })
+        )
+      )
+    );
+    return;
+  }
+
   // Network-first strategy: try network, fall back to cache
   event.respondWith(
     fetch(event.request)
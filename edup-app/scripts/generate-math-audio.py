@@ -1,47 +1,20 @@
 #!/usr/bin/env python3
-"""Generate audio files for dots-card-math app using gTTS.
+"""dots-card-math の演算子（たす・ひく・わ）と数字 (1-100) を gTTS で生成する。
 
-Generates:
-  - public/audio/dots-math/plus.mp3   ("たす")
-  - public/audio/dots-math/minus.mp3  ("ひく")
-  - public/audio/dots-math/wa.mp3     ("は")
-  - public/audio/dots-math/{1-100}.mp3 (numbers without "これは〜です" wrapper)
+語彙は scripts/tts_catalog.py にまとめたので、scripts/generate-audio.py を
+--backends gtts --app dots-math で呼ぶだけの互換用スクリプト。
+追加の引数（--force など）はそのまま渡す。
+
+  python edup-app/scripts/generate-math-audio.py [--force]
 """
 
 import os
-import time
-from gtts import gTTS
-
-OUT_DIR = os.path.join(os.path.dirname(__file__), "..", "public", "audio", "dots-math")
-os.makedirs(OUT_DIR, exist_ok=True)
-
-# Operator words
-operators = {
-    "plus": "たす",
-    "minus": "ひく",
-    "wa": "わ",
-}
-
-for filename, text in operators.items():
-    path = os.path.join(OUT_DIR, f"{filename}.mp3")
-    if os.path.exists(path):
-        print(f"Skip (exists): {path}")
-        continue
-    print(f"Generating: {filename}.mp3 -> '{text}'")
-    tts = gTTS(text=text, lang="ja")
-    tts.save(path)
-    time.sleep(0.5)
+import runpy
+import sys
 
-# Numbers 1-100 (just the number, no wrapper sentence)
-for n in range(1, 101):
-    path = os.path.join(OUT_DIR, f"{n}.mp3")
-    if os.path.exists(path):
-        print(f"Skip (exists): {path}")
-        continue
-    text = str(n)
-    print(f"Generating: {n}.mp3 -> '{text}'")
-    tts = gTTS(text=text, lang="ja")
-    tts.save(path)
-    time.sleep(0.5)
+TTS_SCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts")
 
-print("Done!")
+if __name__ == "__main__":
+    sys.argv = [sys.argv[0], "--backends", "gtts", "--app", "dots-math", *sys.argv[1:]]
+    sys.path.insert(0, TTS_SCRIPT_DIR)
+    runpy.run_path(os.path.join(TTS_SCRIPT_DIR, "generate-audio.py"), run_name="__main__")
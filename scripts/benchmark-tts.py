@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""生成スクリプトのスループットをモックサーバー相手に計測する（API のクォータを使わない）。
+
+tts_mock_server.MockTtsServer を起動し、各生成スクリプトを scripts/ の一時コピーから
+サブプロセスで実行する（マニフェスト・クォータ・応答時間の履歴や出力先は一時ディレクトリ側に
+作られ、リポジトリの状態は変わらない）。送り先は環境変数 TTS_API_URL / GEMINI_BASE_URL で
+モックに向ける。
+
+計測する値:
+  items/s    生成できたファイル数 / 実行時間
+  req/item   モックが受けたリクエスト数（429 を含む）/ 生成できたファイル数
+  p50 / p95  1リクエストの応答時間（生成スクリプトが記録した tts-latency.json から）
+  CPU        子プロセス（ffmpeg を含む）のユーザー + システム CPU 時間
+
+--json で結果を保存し、次回 --baseline に渡すと items/s と CPU の増減を並べて表示する。
+
+使い方:
+  python scripts/benchmark-tts.py
+  python scripts/benchmark-tts.py --generators gemini,cloud-tts-ssml --latency 0.5 --jitter 0.2
+  python scripts/benchmark-tts.py --burst-every 20 --json bench.json
+  python scripts/benchmark-tts.py --baseline bench.json
+  python scripts/benchmark-tts.py --generators gemini --args --stream --profiles mp3-48k
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from tts_catalog import APPS
+from tts_mock_server import DEFAULT_GAP_MS, MockTtsServer, parse_gap
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 計測する生成スクリプトと引数（クォータの待ちで計測がぶれないよう上限は十分に大きくする）
+GENERATORS = {
+    "gemini": ["generate-audio-gemini.py", "--rpm", "10000", "--rpd", "1000000"],
+    "cloud-tts": ["generate-audio-cloud-tts.py", "--concurrency", "4", "--delay", "0"],
+    "cloud-tts-ssml": ["generate-audio-cloud-tts.py", "--concurrency", "4", "--delay", "0",
+                       "--batch-size", "20", "--voice-ja", "ja-JP-Neural2-B"],
+    "multi": ["generate-audio.py", "--backends", "gemini,cloud-tts",
+              "--gemini-rpm", "10000", "--gemini-rpd", "1000000"],
+}
+# 生成スクリプトごとに渡す API キー（モックなので値は何でもよい）
+API_KEYS = {
+    "gemini": ["GEMINI_API_KEY"],
+    "cloud-tts": ["GOOGLE_API_KEY"],
+    "cloud-tts-ssml": ["GOOGLE_API_KEY"],
+    "multi": ["GEMINI_API_KEY", "GOOGLE_API_KEY"],
+}
+DEFAULT_GENERATORS = ",".join(GENERATORS)
+
+
+def children_cpu_seconds() -> float | None:
+    """終了済みの子プロセス（孫を含む）の CPU 時間の合計。"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(values: list[float], pct: int) -> float | None:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def prepare_workdir() -> str:
+    """scripts/*.py を一時ディレクトリにコピーし、同じ相対位置に空の出力先を作る。"""
+    work_dir = tempfile.mkdtemp(prefix="tts-bench-")
+    scripts_dir = os.path.join(work_dir, "scripts")
+    os.makedirs(scripts_dir)
+    for path in glob.glob(os.path.join(SCRIPT_DIR, "*.py")):
+        shutil.copy2(path, scripts_dir)
+    os.makedirs(os.path.join(work_dir, "edup-app", "public", "audio"))
+    return work_dir
+
+
+def run_generator(name: str, server: MockTtsServer, app_id: str | None,
+                  extra_args: list[str], keep: bool) -> dict:
+    """1つの生成スクリプトを実行し、計測結果を dict で返す。"""
+    work_dir = prepare_workdir()
+    script, *args = GENERATORS[name]
+    cmd = [sys.executable, os.path.join(work_dir, "scripts", script), *args, *extra_args]
+    if app_id:
+        cmd += ["--app", app_id]
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("GEMINI_API_KEY", "GOOGLE_API_KEY")}
+    env.update({key: "mock" for key in API_KEYS[name]})
+    env.update(TTS_API_URL=server.cloud_url, GEMINI_BASE_URL=server.gemini_url)
+
+    server.reset_stats()
+    cpu_before = children_cpu_seconds()
+    start = time.monotonic()
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, encoding="utf-8", errors="replace")
+    elapsed = time.monotonic() - start
+    cpu_after = children_cpu_seconds()
+
+    audio_dir = os.path.join(work_dir, "edup-app", "public", "audio")
+    items = sum(1 for _root, _dirs, files in os.walk(audio_dir)
+                for filename in files if filename.endswith(".mp3"))
+    latencies = []
+    latency_path = os.path.join(work_dir, "scripts", "tts-latency.json")
+    if os.path.exists(latency_path):
+        with open(latency_path, encoding="utf-8") as f:
+            for samples in json.load(f).get("samples", {}).values():
+                latencies.extend(seconds for seconds, _items in samples)
+    stats = dict(server.stats)
+    requests = sum(count for kind, count in stats.items() if kind != "429")
+
+    if proc.returncode != 0:
+        print(proc.stdout[-2000:])
+    if keep:
+        print(f"  作業ディレクトリ: {work_dir}")
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "generator": name,
+        "returncode": proc.returncode,
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(items / elapsed, 3) if elapsed > 0 else None,
+        "requests": requests,
+        "throttled": stats.get("429", 0),
+        "requests_per_item": round(requests / items, 3) if items else None,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "cpu_seconds": (round(cpu_after - cpu_before, 3)
+                        if cpu_before is not None and cpu_after is not None else None),
+    }
+
+
+def fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def change(value, base) -> str:
+    if value is None or not base:
+        return ""
+    return f" ({(value - base) / base:+.0%})"
+
+
+def print_report(results: list[dict], baseline: dict):
+    print(f"\n{'='*92}")
+    print(f"  {'generator':<16}{'items':>6}{'sec':>8}{'items/s':>16}{'req/item':>10}"
+          f"{'429':>6}{'p50':>8}{'p95':>8}{'CPU sec':>16}")
+    for r in results:
+        base = baseline.get(r["generator"], {})
+        ips = fmt(r["items_per_second"], ".2f") + change(r["items_per_second"],
+                                                        base.get("items_per_second"))
+        cpu = fmt(r["cpu_seconds"], ".2f") + change(r["cpu_seconds"], base.get("cpu_seconds"))
+        status = "" if r["returncode"] == 0 else f"  (exit {r['returncode']})"
+        print(f"  {r['generator']:<16}{r['items']:>6}{r['seconds']:>8.1f}{ips:>16}"
+              f"{fmt(r['requests_per_item'], '.3f'):>10}{r['throttled']:>6}"
+              f"{fmt(r['p50'], '.3f'):>8}{fmt(r['p95'], '.3f'):>8}{cpu:>16}{status}")
+    print(f"{'='*92}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="モック TTS サーバーで生成スクリプトのスループットを計測"
+    )
+    parser.add_argument("--generators", default=DEFAULT_GENERATORS,
+                        help=f"計測する生成スクリプト（カンマ区切り） (default: {DEFAULT_GENERATORS})")
+    parser.add_argument("--app", choices=list(APPS.keys()),
+                        help="特定のアプリのみ生成（省略時は全アプリ）")
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="モックの応答時間・秒 (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.05,
+                        help="応答時間の揺らぎ・秒 (default: 0.05)")
+    parser.add_argument("--burst-every", type=int, default=0,
+                        help="この回数ごとに 429 を burst-length 回返す（0 なら返さない）")
+    parser.add_argument("--burst-length", type=int, default=3,
+                        help="429 を続けて返す回数（burst-every より小さくする） (default: 3)")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="429 で指示する待ち秒数 (default: 1)")
+    parser.add_argument("--gap-ms", type=parse_gap, default=DEFAULT_GAP_MS,
+                        help="Gemini の単語間の無音・ms の範囲 (default: 2500,3200)")
+    parser.add_argument("--args", nargs=argparse.REMAINDER, default=[],
+                        help="これ以降の引数を全て生成スクリプトに渡す（最後に置く。"
+                             "例: --args --stream --profiles mp3-48k）")
+    parser.add_argument("--json", help="結果を保存する JSON ファイル")
+    parser.add_argument("--baseline", help="比較する前回の結果（--json で保存したもの）")
+    parser.add_argument("--keep", action="store_true",
+                        help="一時ディレクトリ（生成物・ログ）を消さずに残す")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.generators.split(",") if name.strip()]
+    unknown = [name for name in names if name not in GENERATORS]
+    if unknown:
+        parser.error(f"不明な生成スクリプト: {', '.join(unknown)} "
+                     f"(選択肢: {', '.join(GENERATORS)})")
+    if args.burst_every and args.burst_length >= args.burst_every:
+        parser.error("--burst-length は --burst-every より小さくしてください")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {r["generator"]: r for r in json.load(f)["results"]}
+
+    server = MockTtsServer(latency=args.latency, jitter=args.jitter,
+                           burst_every=args.burst_every, burst_length=args.burst_length,
+                           retry_after=args.retry_after, gap_ms=args.gap_ms).start()
+    print(f"TTS ベンチマーク（モックサーバー）")
+    print(f"{'='*60}")
+    print(f"  応答時間     : {args.latency}s ± {args.jitter}s")
+    if args.burst_every:
+        print(f"  429          : {args.burst_every}回ごとに{args.burst_length}回 "
+              f"(retry after {args.retry_after:g}s)")
+    print(f"  対象アプリ   : {args.app or '全アプリ'}")
+    print(f"{'='*60}")
+
+    results = []
+    try:
+        for name in names:
+            print(f"\n--- {name} ---", flush=True)
+            result = run_generator(name, server, args.app, args.args, args.keep)
+            print(f"  {result['items']}件 / {result['seconds']:.1f}秒 "
+                  f"({result['requests']}リクエスト, 429: {result['throttled']})")
+            results.append(result)
+    finally:
+        server.stop()
+
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": {key: value for key, value in vars(args).items()
+                                    if key not in ("json", "baseline", "keep")},
+                       "results": results}, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+        print(f"\n結果: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""ドッツ計算の等式音声を1ファイルに合成する（ビルド／ローカルサーバー）。
+
+public/audio/dots-math/ の個別クリップ（数字・たす・ひく・わ）を連結して
+「a たす b わ c」を1本の MP3 にする。5ファイルを順に読み込む代わりに
+1ファイルで済むようにするためのもの。ffmpeg が必要。
+
+使い方:
+  # アプリが出題しうる等式をまとめて生成（public/audio/dots-math/equations/）
+  python scripts/compose-equations.py build --max-number 20 --mode mixed
+
+  # 要求された等式をその場で合成して返すローカルサーバー
+  # GET /audio/dots-math/equations/3-plus-4.mp3
+  # 合成済みの等式は scripts/equation-cache/ に LRU で保持する
+  python scripts/compose-equations.py serve --port 8765 --cache-size 500
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tts_compose import (DEFAULT_CACHE_SIZE, DEFAULT_GAP_MS, MAX_NUMBER,
+                         EquationComposer, equation_filename)
+from tts_precache import update_precache_manifest
+
+# --- 定数 ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_BASE_DIR = os.path.join(SCRIPT_DIR, "..", "edup-app", "public", "audio")
+CLIP_DIR = os.path.join(AUDIO_BASE_DIR, "dots-math")
+BUILD_DIR = os.path.join(CLIP_DIR, "equations")
+DEFAULT_PORT = 8765
+DEFAULT_MAX_NUMBER = 20
+
+EQUATION_PATH = re.compile(r"^/audio/dots-math/equations/(\d+)-(plus|minus)-(\d+)\.mp3$")
+
+
+def app_equations(mode: str, max_number: int) -> list[tuple[int, str, int]]:
+    """DotsCardMath の generateEquations が出題しうる等式を全て列挙する。"""
+    equations = []
+    if mode in ("addition", "mixed"):
+        # 答え 3〜max_number、第1項 1〜答え-2
+        for answer in range(3, max_number + 1):
+            for a in range(1, answer - 1):
+                equations.append((a, "plus", answer - a))
+    if mode in ("subtraction", "mixed"):
+        # 第1項 3〜max_number、第2項 1〜第1項-1
+        for a in range(3, max_number + 1):
+            for b in range(1, a):
+                equations.append((a, "minus", b))
+    return equations
+
+
+def build(args):
+    equations = app_equations(args.mode, args.max_number)
+    composer = EquationComposer(CLIP_DIR, cache_dir=args.output, max_entries=None,
+                                gap_ms=args.gap_ms)
+
+    print(f"等式音声の一括生成")
+    print(f"{'='*60}")
+    print(f"  モード       : {args.mode} (最大 {args.max_number})")
+    print(f"  出力先       : {args.output}")
+    print(f"  等式数       : {len(equations)}件")
+    print(f"{'='*60}")
+
+    start_time = time.time()
+    total_bytes = 0
+    for idx, (a, op, b) in enumerate(equations):
+        path = composer.get(a, op, b)
+        total_bytes += os.path.getsize(path)
+        if (idx + 1) % 50 == 0 or idx + 1 == len(equations):
+            print(f"  [{idx+1}/{len(equations)}] {equation_filename(a, op, b)}")
+
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"  完了! (実行時間: {elapsed:.1f}s)")
+    print(f"  新規: {composer.misses}  既存: {composer.hits}  "
+          f"合計: {total_bytes / 1024:.1f}KB")
+    print(f"{'='*60}")
+
+    # public/audio に出力した場合は Service Worker のプリキャッシュ対象にも反映する
+    audio_base_dir = os.path.abspath(AUDIO_BASE_DIR)
+    if os.path.abspath(args.output).startswith(audio_base_dir + os.sep):
+        update_precache_manifest(audio_base_dir)
+
+
+def make_handler(composer: EquationComposer):
+    class EquationHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = EQUATION_PATH.match(self.path.split("?", 1)[0])
+            if not match:
+                self.send_error(404)
+                return
+            a, op, b = int(match.group(1)), match.group(2), int(match.group(3))
+            try:
+                path = composer.get(a, op, b)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            except FileNotFoundError as e:
+                self.send_error(404, f"clip not found: {os.path.basename(str(e))}")
+                return
+            with open(path, "rb") as f:
+                data = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *fmt_args):
+            print(f"  {self.address_string()} {fmt % fmt_args} "
+                  f"(hit {composer.hits} / miss {composer.misses})")
+
+    return EquationHandler
+
+
+def serve(args):
+    composer = EquationComposer(CLIP_DIR, max_entries=args.cache_size, gap_ms=args.gap_ms)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(composer))
+    print(f"等式音声サーバー: http://{args.host}:{args.port}/audio/dots-math/equations/<a>-plus-<b>.mp3")
+    print(f"  キャッシュ: {composer.cache_dir} (最大 {args.cache_size}件)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止しました。")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ドッツ計算の等式音声を1ファイルに合成"
+    )
+    parser.add_argument("--gap-ms", type=int, default=DEFAULT_GAP_MS,
+                        help=f"クリップ間の無音・ms (default: {DEFAULT_GAP_MS})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="出題しうる等式をまとめて生成")
+    build_parser.add_argument("--mode", choices=["addition", "subtraction", "mixed"],
+                              default="mixed", help="出題モード (default: mixed)")
+    build_parser.add_argument("--max-number", type=int, default=DEFAULT_MAX_NUMBER,
+                              help=f"等式に使う最大数 (default: {DEFAULT_MAX_NUMBER})")
+    build_parser.add_argument("--output", default=BUILD_DIR,
+                              help="出力先ディレクトリ (default: public/audio/dots-math/equations)")
+
+    serve_parser = sub.add_parser("serve", help="等式音声をその場で合成して返す")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                              help=f"ポート (default: {DEFAULT_PORT})")
+    serve_parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                              help=f"キャッシュに残す等式の数 (default: {DEFAULT_CACHE_SIZE})")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not 3 <= args.max_number <= MAX_NUMBER:
+            print(f"Error: --max-number は 3〜{MAX_NUMBER} で指定してください")
+            sys.exit(1)
+        build(args)
+    else:
+        if args.cache_size < 1:
+            print("Error: --cache-size は 1 以上で指定してください")
+            sys.exit(1)
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,8 @@ Gemini TTSと違い、専用TTSエンジンなので:
   - バッチ＋分割不要（1単語1リクエスト）
   - 無料枠: 月100万文字（Neural2）→ 全414件余裕
 
-依存ライブラリ不要（Python標準ライブラリのみ）。
+依存ライブラリ不要（Python標準ライブラリのみ）。--sprite / --profiles を使う場合は ffmpeg、
+--trim を使う場合は ffmpeg と numpy が必要。
 
 使い方:
   # APIキーを取得: https://console.cloud.google.com/apis/credentials
@@ -22,9 +23,37 @@ Gemini TTSと違い、専用TTSエンジンなので:
   # 既存ファイルを上書き
   python scripts/generate-audio-cloud-tts.py --force
 
+  ※ 生成済みかどうかは scripts/tts-manifest.json の合成キー
+    （テキスト・ボイス・話速）で判定する。入力が変わったファイルだけ再生成される。
+    ファイルは一時ファイルに書いてから置き換えるので、途中で止めても壊れたファイルは残らない。
+    実行中の Ctrl-C では未送信の分を取り消し、送信済みの分を保存してから終了する。
+
   # ボイスを変更
   python scripts/generate-audio-cloud-tts.py --voice-ja ja-JP-Neural2-B --voice-en en-US-Neural2-F
 
+  # 8並列で生成（keep-alive 接続をワーカーごとに使い回す）
+  # 429 を受けたら Retry-After の間は全ワーカーの送信を止め、その分を後ろに回して再送する
+  python scripts/generate-audio-cloud-tts.py --concurrency 8
+
+  # SSML バッチ: 20単語を1リクエストで合成し、<mark> のタイムポイントで切る
+  # （リクエスト数が約1/20になる。LINEAR16 で受け取りローカルでエンコードする。
+  #   SSML 非対応の Chirp3-HD ボイスの分は1単語1リクエストのまま）
+  python scripts/generate-audio-cloud-tts.py --batch-size 20 --voice-ja ja-JP-Neural2-B
+
+  # 各ファイルの前後の無音を削る（LINEAR16 で受け取り、トリム後に MP3 化）
+  python scripts/generate-audio-cloud-tts.py --trim --trim-onset-ms 30 --trim-tail-ms 80
+
+  # API の MP3 をそのまま保存せず、LINEAR16 から指定プロファイルでエンコード
+  # （MP3 は1つ必須。Opus は同名の .opus を併せて出力。最後にアプリごとのサイズを比較表示）
+  python scripts/generate-audio-cloud-tts.py --force --profiles mp3-48k,opus-24k
+
+  # アプリごとに全クリップを1ファイルにまとめたスプライトも出力
+  python scripts/generate-audio-cloud-tts.py --sprite
+
+  # 生成計画だけを表示（APIキー不要・API を呼ばない）
+  # 未生成件数・課金文字数・リクエスト数・所要時間（過去の応答時間から）
+  python scripts/generate-audio-cloud-tts.py --plan
+
 日本語ボイス（Neural2）:
   ja-JP-Neural2-B (男性), ja-JP-Neural2-C (女性), ja-JP-Neural2-D (男性)
 
@@ -34,227 +63,283 @@ Gemini TTSと違い、専用TTSエンジンなので:
 """
 
 import argparse
-import base64
-import json
+import io
 import os
 import sys
 import time
-import urllib.request
 import urllib.error
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from tts_backends import (CLOUD_RATE_EN, CLOUD_RATE_JA, CLOUD_VOICE_EN, CLOUD_VOICE_JA,
+                          BackendThrottled, build_marked_ssml, cloud_cache_key, cloud_http_error,
+                          supports_ssml_marks, synthesize, synthesize_marked)
+from tts_cache import SharedClips, SynthesisCache
+from tts_catalog import APPS
+from tts_encode import (DEFAULT_PROFILES, app_audio_sizes, encode_batch, parse_profiles,
+                        print_size_report, profile_path)
+from tts_journal import write_file_atomic
+from tts_metrics import METRICS, add_metrics_arguments
+from tts_plan import (LatencyHistory, format_duration, latency_key, print_plan,
+                      simulate_wall_seconds)
+from tts_precache import update_precache_manifest
+from tts_quota import PauseGate
+from tts_sprite import write_sprites
 
 # --- 定数 ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 AUDIO_BASE_DIR = os.path.join(SCRIPT_DIR, "..", "edup-app", "public", "audio")
 
-# DEFAULT_VOICE_JA = "ja-JP-Neural2-C"   # 女性、明瞭
-DEFAULT_VOICE_JA = "ja-JP-Chirp3-HD-Callirrhoe"   # 女性、明瞭
-DEFAULT_VOICE_EN = "en-US-Neural2-F"    # 女性、明瞭
-DEFAULT_SPEAKING_RATE_JA = 0.9          # やや遅め（子供向け）
-DEFAULT_SPEAKING_RATE_EN = 0.9
+DEFAULT_VOICE_JA = CLOUD_VOICE_JA
+DEFAULT_VOICE_EN = CLOUD_VOICE_EN
+DEFAULT_SPEAKING_RATE_JA = CLOUD_RATE_JA
+DEFAULT_SPEAKING_RATE_EN = CLOUD_RATE_EN
 DEFAULT_DELAY = 0.1                     # リクエスト間隔（秒）
-TTS_API_URL = "https://texttospeech.googleapis.com/v1/text:synthesize"
-
-
-# --- 各アプリの音声データ定義 ---
-
-def get_dots_items():
-    """ドッツカード: 「これは N です」(1-100)"""
-    items = []
-    for n in range(1, 101):
-        items.append({
-            "filename": f"{n}.mp3",
-            "text": f"これは{n}です",
-            "lang": "ja",
-        })
-    return items
-
-
-def get_dots_math_items():
-    """ドッツ計算: 演算子 + 数字(1-100)"""
-    items = []
-    operators = [("plus.mp3", "たす"), ("minus.mp3", "ひく"), ("wa.mp3", "わ")]
-    for filename, text in operators:
-        items.append({"filename": filename, "text": text, "lang": "ja"})
-    for n in range(1, 101):
-        items.append({"filename": f"{n}.mp3", "text": str(n), "lang": "ja"})
-    return items
-
-
-def get_hiragana_flash_items():
-    """ひらがなフラッシュ: 日本語単語
-    3つ組: (ファイル名用ひらがな, 表示用漢字, TTS用テキスト)
-    TTS用テキストは漢字で正しく読めるものは漢字、
-    難読漢字・誤読されやすいものはカタカナ/ひらがなを使用。
+DEFAULT_CONCURRENCY = 1                 # 同時リクエスト数
+DEFAULT_BATCH_SIZE = 1                  # SSML 1リクエストにまとめる単語数（1 ならバッチなし）
+THROTTLE_RETRIES = 5                    # 429 で後ろに回して再送する回数の上限
+BACKEND = "cloud-tts"
+DEFAULT_LATENCY = 0.3                   # 応答時間の履歴がないときの見積もり（秒/件）
+FREE_CHARS_PER_MONTH = 1_000_000        # 無料枠の月間文字数
+
+# 前後の無音トリムパラメータ（--trim 時）
+TRIM_THRESH = -45               # これより小さい音は無音とみなす (dBFS)
+DEFAULT_TRIM_ONSET_MS = 30      # 音の立ち上がり前に残す無音 (ms)
+DEFAULT_TRIM_TAIL_MS = 80       # 音の終わりの後に残す無音 (ms)
+
+
+def encode_wav(wav_data: bytes, trim: tuple[int, int] | None,
+               profiles: list | None) -> tuple[dict[str, bytes], int]:
+    """LINEAR16 の WAV を（必要なら前後の無音を削って）各プロファイルでエンコードする。
+
+    (プロファイル名 -> バイト列, 削った長さ ms) を返す。
+    """
+    with wave.open(io.BytesIO(wav_data), "rb") as wf:
+        sample_rate = wf.getframerate()
+        pcm = wf.readframes(wf.getnframes())
+
+    pcm, trimmed_ms = trim_pcm(pcm, sample_rate, trim)
+    [outputs] = encode_batch([pcm], sample_rate, profiles)
+    return outputs, trimmed_ms
+
+
+def trim_pcm(pcm: bytes, sample_rate: int, trim: tuple[int, int] | None) -> tuple[bytes, int]:
+    """trim に (onset_ms, tail_ms) を渡すと前後の無音を削る。(PCM, 削った長さ ms) を返す。"""
+    if not trim:
+        return pcm, 0
+    # numpy は --trim 時だけ必要なので、ここで読み込む
+    from tts_silence import SilenceEnvelope
+
+    with METRICS.stage("trim"):
+        envelope = SilenceEnvelope(pcm, sample_rate)
+        start, end = envelope.trim_range(TRIM_THRESH, *trim)
+    pcm = pcm[start * sample_rate // 1000 * 2:end * sample_rate // 1000 * 2]
+    return pcm, envelope.duration_ms - (end - start)
+
+
+def process_item(item: dict, filepath: str, voice: str, lang_code: str,
+                 rate: float, api_key: str, delay: float,
+                 trim: tuple[int, int] | None = None,
+                 profiles: list | None = None, gate: PauseGate | None = None) -> dict:
+    """1件を合成して保存し、結果を dict で返す（表示は呼び出し側）。
+
+    trim に (onset_ms, tail_ms) を渡すと前後の無音を削ってから保存し、
+    削った長さを trimmed_ms に入れる。trim か profiles を指定した場合は
+    LINEAR16 で受け取り、ローカルでエンコードする（未指定なら API の MP3 をそのまま保存）。
+    API の応答時間を latency（秒）に入れる。
+    429 のときは retry_after（秒）を入れ、gate を渡していれば全ワーカーをその間止める。
+    ワーカースレッドから呼ばれるため print はしない。
     """
-    data = [
-        # あ行
-        ("あり", "蟻", "蟻"), ("あめ", "飴", "飴"), ("あひる", "家鴨", "アヒル"),
-        ("いぬ", "犬", "犬"), ("いちご", "苺", "苺"), ("いるか", "海豚", "イルカ"),
-        ("うし", "牛", "うし"), ("うさぎ", "兎", "ウサギ"), ("うみ", "海", "海"),
-        ("えび", "海老", "海老"), ("えんぴつ", "鉛筆", "鉛筆"),
-        ("おに", "鬼", "おに"), ("おばけ", "お化け", "お化け"),
-        # か行
-        ("かに", "蟹", "カニ"), ("かさ", "傘", "傘"), ("かめ", "亀", "亀"),
-        ("きつね", "狐", "狐"), ("きのこ", "茸", "キノコ"),
-        ("くま", "熊", "熊"), ("くじら", "鯨", "鯨"), ("くるま", "車", "車"),
-        ("けむし", "毛虫", "毛虫"), ("けーき", "ケーキ", "ケーキ"),
-        ("こあら", "コアラ", "コアラ"), ("こいのぼり", "鯉のぼり", "鯉のぼり"),
-        # さ行
-        ("さる", "猿", "猿"), ("さかな", "魚", "魚"),
-        ("しか", "鹿", "鹿"), ("しんかんせん", "新幹線", "新幹線"),
-        ("すいか", "西瓜", "スイカ"), ("すし", "寿司", "寿司"),
-        ("せんす", "扇子", "扇子"), ("せんべい", "煎餅", "煎餅"),
-        ("そら", "空", "空"), ("そり", "橇", "ソリ"),
-        # た行
-        ("たこ", "蛸", "蛸"), ("たいよう", "太陽", "太陽"),
-        ("ちょう", "蝶", "蝶"), ("ちーず", "チーズ", "チーズ"),
-        ("つき", "月", "月"), ("つばめ", "燕", "ツバメ"),
-        ("てんとうむし", "天道虫", "テントウムシ"), ("てがみ", "手紙", "手紙"),
-        ("とら", "虎", "虎"), ("とけい", "時計", "時計"),
-        # な行
-        ("なす", "茄子", "茄子"), ("なると", "鳴門", "なると"),
-        ("にわとり", "鶏", "ニワトリ"), ("にじ", "虹", "虹"),
-        ("ぬいぐるみ", "縫いぐるみ", "ぬいぐるみ"),
-        ("ねこ", "猫", "猫"), ("ねずみ", "鼠", "ネズミ"),
-        ("のり", "海苔", "ノリ"),
-        # は行
-        ("はな", "花", "花"), ("はち", "蜂", "蜂"),
-        ("ひよこ", "雛", "ヒヨコ"), ("ひこうき", "飛行機", "飛行機"),
-        ("ふくろう", "梟", "フクロウ"), ("ふね", "船", "船"),
-        ("へび", "蛇", "蛇"),
-        ("ほし", "星", "星"), ("ほうき", "箒", "ホウキ"),
-        # ま行
-        ("まめ", "豆", "豆"), ("まと", "的", "まと"),
-        ("みかん", "蜜柑", "ミカン"), ("みず", "水", "みず"),
-        ("むし", "虫", "虫"),
-        ("め", "目", "目"), ("めだまやき", "目玉焼き", "目玉焼き"),
-        ("もも", "桃", "桃"), ("もり", "森", "森"),
-        # や行
-        ("やま", "山", "山"), ("やきいも", "焼き芋", "焼き芋"),
-        ("ゆき", "雪", "雪"), ("ゆびわ", "指輪", "指輪"),
-        ("よっと", "ヨット", "ヨット"),
-        # ら行
-        ("らいおん", "ライオン", "ライオン"), ("らっこ", "ラッコ", "ラッコ"),
-        ("りんご", "林檎", "リンゴ"), ("りす", "栗鼠", "リス"),
-        ("るびー", "ルビー", "ルビー"), ("れもん", "レモン", "レモン"),
-        ("ろうそく", "蝋燭", "ロウソク"), ("ろけっと", "ロケット", "ロケット"),
-        # わ行
-        ("わに", "鰐", "ワニ"),
-        # 濁音 が行
-        ("がっこう", "学校", "学校"), ("がいこつ", "骸骨", "ガイコツ"),
-        ("ぎたー", "ギター", "ギター"), ("ぎゅうにゅう", "牛乳", "牛乳"),
-        ("ぐー", "グー", "グー"), ("げーむ", "ゲーム", "ゲーム"),
-        ("ごりら", "ゴリラ", "ゴリラ"), ("ごはん", "御飯", "ごはん"),
-        # 濁音 ざ行
-        ("ざりがに", "ザリガニ", "ザリガニ"),
-        ("じしゃく", "磁石", "磁石"), ("じてんしゃ", "自転車", "自転車"),
-        ("ずぼん", "ズボン", "ズボン"), ("ぜりー", "ゼリー", "ゼリー"),
-        ("ぞう", "象", "象"),
-        # 濁音 だ行
-        ("だんご", "団子", "団子"),
-        ("でんしゃ", "電車", "電車"), ("でんわ", "電話", "電話"),
-        ("どんぐり", "団栗", "ドングリ"), ("どーなつ", "ドーナツ", "ドーナツ"),
-        # 濁音 ば行
-        ("ばなな", "バナナ", "バナナ"), ("ばった", "飛蝗", "バッタ"),
-        ("びーだま", "ビー玉", "ビー玉"),
-        ("ぶどう", "葡萄", "葡萄"), ("ぶた", "豚", "豚"),
-        ("べる", "ベル", "ベル"),
-        ("ぼうし", "帽子", "帽子"), ("ぼーる", "ボール", "ボール"),
-        # 半濁音 ぱ行
-        ("ぱんだ", "パンダ", "パンダ"), ("ぱいなっぷる", "パイナップル", "パイナップル"),
-        ("ぴあの", "ピアノ", "ピアノ"), ("ぷーる", "プール", "プール"),
-        ("ぺんぎん", "ペンギン", "ペンギン"),
-        ("ぽすと", "ポスト", "ポスト"), ("ぽっぷこーん", "ポップコーン", "ポップコーン"),
-    ]
-    items = []
-    for word, _kanji, tts_text in data:
-        items.append({"filename": f"{word}.mp3", "text": tts_text, "lang": "ja"})
-    return items
-
-
-def get_english_flash_items():
-    """英語フラッシュ: 英単語"""
-    words = [
-        "dog", "cat", "bird", "fish", "rabbit", "bear", "elephant", "lion",
-        "monkey", "pig", "cow", "horse", "sheep", "chicken", "duck", "frog",
-        "turtle", "penguin", "whale", "butterfly", "giraffe", "zebra", "snake",
-        "owl", "dolphin",
-        "apple", "banana", "orange", "grape", "strawberry", "watermelon",
-        "peach", "cherry", "bread", "rice", "egg", "milk", "cake", "cookie",
-        "ice cream", "pizza", "tomato", "corn", "carrot", "lemon",
-        "chocolate", "cheese", "donut", "pineapple", "mushroom",
-        "car", "bus", "train", "airplane", "bicycle", "boat", "rocket",
-        "star", "sun", "moon", "rainbow", "flower", "tree", "house", "book",
-        "pencil", "clock", "umbrella", "hat", "shoe", "key", "bell", "ball",
-        "guitar", "camera",
-        "eye", "ear", "hand", "foot", "heart", "nose", "mouth", "tooth",
-        "leg", "bone", "brain", "muscle", "finger", "face", "tongue",
-        "fire", "water", "snow", "cloud", "mountain", "rain", "wind",
-        "thunder", "ocean", "river", "leaf", "rock", "sand", "earth", "volcano",
-        "red", "blue", "green", "yellow", "orange", "purple", "pink",
-        "white", "black", "brown",
-    ]
-    items = []
-    for w in words:
-        items.append({
-            "filename": w.replace(" ", "-") + ".mp3",
-            "text": w,
-            "lang": "en",
-        })
-    return items
-
-
-APPS = {
-    "dots": {
-        "label": "ドッツカード",
-        "output_dir": "dots",
-        "get_items": get_dots_items,
-    },
-    "dots-math": {
-        "label": "ドッツ計算",
-        "output_dir": "dots-math",
-        "get_items": get_dots_math_items,
-    },
-    "hiragana-flash": {
-        "label": "ひらがなフラッシュ",
-        "output_dir": "hiragana-flash",
-        "get_items": get_hiragana_flash_items,
-    },
-    "english-flash": {
-        "label": "英語フラッシュ",
-        "output_dir": "english-flash",
-        "get_items": get_english_flash_items,
-    },
-}
-
-
-def synthesize(text: str, voice_name: str, lang_code: str,
-               speaking_rate: float, api_key: str) -> bytes:
-    """Google Cloud TTS REST API で音声合成し、MP3バイト列を返す。"""
-    url = f"{TTS_API_URL}?key={api_key}"
-    body = json.dumps({
-        "input": {"text": text},
-        "voice": {
-            "languageCode": lang_code,
-            "name": voice_name,
-        },
-        "audioConfig": {
-            "audioEncoding": "MP3",
-            "speakingRate": speaking_rate,
-        },
-    }).encode("utf-8")
-
-    req = urllib.request.Request(url, data=body,
-                                headers={"Content-Type": "application/json"})
-    with urllib.request.urlopen(req) as resp:
-        data = json.loads(resp.read())
-
-    return base64.b64decode(data["audioContent"])
-
-
-def format_eta(seconds: float) -> str:
-    m, s = divmod(int(seconds), 60)
-    return f"{m}m {s}s" if m > 0 else f"{s}s"
+    result = {"ok": False, "size": 0, "error": None, "code": None, "trimmed_ms": 0,
+              "latency": None, "retry_after": None}
+    try:
+        if gate is not None:
+            gate.wait()
+        start = time.monotonic()
+        if trim or profiles:
+            wav_data = synthesize(item["text"], voice, lang_code, rate, api_key,
+                                  encoding="LINEAR16")
+            result["latency"] = time.monotonic() - start
+            outputs, result["trimmed_ms"] = encode_wav(wav_data, trim, profiles)
+        else:
+            outputs = {None: synthesize(item["text"], voice, lang_code, rate, api_key)}
+            result["latency"] = time.monotonic() - start
+        for profile, data in outputs.items():
+            path = profile_path(filepath, profile) if profile else filepath
+            write_file_atomic(path, data)
+        result["ok"] = True
+        result["size"] = sum(len(data) for data in outputs.values())
+    except urllib.error.HTTPError as e:
+        error = cloud_http_error(e)
+        result.update(code=e.code, error=str(error))
+        if isinstance(error, BackendThrottled):
+            result["retry_after"] = error.retry_after
+            if gate is not None:
+                gate.pause(error.retry_after)
+    except Exception as e:
+        result["error"] = str(e)
+
+    if delay > 0:
+        with METRICS.stage("sleep"):
+            time.sleep(delay)
+    return result
+
+
+def process_batch(batch: list, voice: str, lang_code: str, rate: float, api_key: str,
+                  delay: float, trim: tuple[int, int] | None, profiles: list,
+                  gate: PauseGate | None = None) -> list[dict]:
+    """batch（(item, filepath) のリスト）を SSML 1リクエストで合成して保存し、結果を返す。
+
+    <mark> のタイムポイントで切り出し、1回の ffmpeg でまとめてエンコードする。
+    応答時間は先頭の結果の latency に入れ、latency_items に件数を入れる。
+    タイムポイントが揃わなければ1件ずつ process_item で合成し直す。
+    429 の扱いは process_item と同じ（バッチの全件に retry_after を入れる）。
+    """
+    results = [{"ok": False, "size": 0, "error": None, "code": None, "trimmed_ms": 0,
+                "latency": None, "retry_after": None} for _ in batch]
+    try:
+        if gate is not None:
+            gate.wait()
+        start = time.monotonic()
+        clips, sample_rate = synthesize_marked([item["text"] for item, _path in batch],
+                                               voice, lang_code, rate, api_key)
+        results[0]["latency"] = time.monotonic() - start
+        results[0]["latency_items"] = len(batch)
+        trimmed = [trim_pcm(clip, sample_rate, trim) for clip in clips]
+        outputs = encode_batch([pcm for pcm, _ms in trimmed], sample_rate, profiles)
+        for result, (_item, filepath), encoded, (_pcm, trimmed_ms) in zip(
+                results, batch, outputs, trimmed):
+            for profile, data in encoded.items():
+                write_file_atomic(profile_path(filepath, profile), data)
+            result.update(ok=True, size=sum(len(data) for data in encoded.values()),
+                          trimmed_ms=trimmed_ms)
+    except ValueError:
+        # タイムポイントが返らなかった（SSML の mark に非対応など）
+        METRICS.count("fallbacks")
+        return [process_item(item, filepath, voice, lang_code, rate, api_key, 0, trim, profiles,
+                             gate)
+                for item, filepath in batch]
+    except urllib.error.HTTPError as e:
+        error = cloud_http_error(e)
+        retry_after = error.retry_after if isinstance(error, BackendThrottled) else None
+        for result in results:
+            result.update(code=e.code, error=str(error), retry_after=retry_after)
+        if retry_after is not None and gate is not None:
+            gate.pause(retry_after)
+    except Exception as e:
+        for result in results:
+            result["error"] = str(e)
+
+    if delay > 0:
+        with METRICS.stage("sleep"):
+            time.sleep(delay)
+    return results
+
+
+def make_units(pending: list, args) -> list[list]:
+    """pending を1リクエスト分ずつに分ける。
+
+    --batch-size が2以上なら同じアプリ・言語の連続したアイテムをまとめる
+    （SSML の mark に非対応のボイスは1件ずつ）。
+    """
+    units = []
+    for entry in pending:
+        app_id, _output_dir, item, _key = entry
+        if units and len(units[-1]) < args.batch_size:
+            last_app_id, _dir, last_item, _k = units[-1][0]
+            voice = voice_settings(item, args)[0]
+            if ((last_app_id, last_item["lang"]) == (app_id, item["lang"])
+                    and supports_ssml_marks(voice)):
+                units[-1].append(entry)
+                continue
+        units.append([entry])
+    return units
+
+
+def voice_settings(item: dict, args) -> tuple[str, str, float]:
+    """アイテムの言語に応じた (ボイス名, 言語コード, 話速) を返す。"""
+    if item["lang"] == "ja":
+        return args.voice_ja, "ja-JP", args.rate_ja
+    return args.voice_en, "en-US", args.rate_en
+
+
+def item_cache_key(item: dict, args) -> str:
+    """アイテムの合成キャッシュキー。"""
+    voice, _lang_code, rate = voice_settings(item, args)
+    return cloud_cache_key(item, voice, rate)
+
+
+def collect_pending(args, app_ids: list, cache: SynthesisCache,
+                    create_dirs: bool = True) -> tuple[list, list, int]:
+    """全アイテムを集め、(全アイテム, 未生成・入力変更ありのアイテム, スキップ数) を返す。"""
+    all_items = []
+    for app_id in app_ids:
+        app = APPS[app_id]
+        output_dir = os.path.join(AUDIO_BASE_DIR, app["output_dir"])
+        if create_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+        for item in app["get_items"]():
+            all_items.append((app_id, output_dir, item))
+
+    pending = []
+    skipped = 0
+    for app_id, output_dir, item in all_items:
+        filepath = os.path.join(output_dir, item["filename"])
+        key = item_cache_key(item, args)
+        if not args.force and cache.is_fresh(filepath, key):
+            skipped += 1
+        else:
+            pending.append((app_id, output_dir, item, key))
+    return all_items, pending, skipped
+
+
+def share_pending(args, pending: list, cache: SynthesisCache,
+                  dry_run: bool = False) -> tuple[list, SharedClips]:
+    """同じ合成キーの出力先を1件にまとめ、以前の実行で同じ音声があれば配る。"""
+    shared = SharedClips(cache, args.profiles or ["api-mp3"])
+    unique = shared.dedupe(pending,
+                           lambda entry: (os.path.join(entry[1], entry[2]["filename"]), [entry[3]]),
+                           reuse=not args.force, dry_run=dry_run)
+    return unique, shared
+
+
+def plan_estimate(pending: list, args, latency: LatencyHistory) -> dict:
+    """pending を全て生成するまでの文字数・リクエスト数・所要時間を見積もる。
+
+    1リクエストの応答時間はボイスごとの過去の実測の中央値（秒/件。履歴がなければ既定値）
+    × 件数に --delay を足したもの。SSML バッチの文字数はタグ込みで数える（多めの見積もり）。
+    戻り値は tts_plan.print_plan の1行分。
+    """
+    latencies = []
+    per_items = []
+    chars = 0
+    samples = 0
+    voices = set()
+    for unit in make_units(pending, args):
+        item = unit[0][2]
+        voice = voice_settings(item, args)[0]
+        key = latency_key(BACKEND, voice)
+        if voice not in voices:
+            voices.add(voice)
+            samples += latency.count(key)
+        per_item = latency.seconds_per_item(key) or DEFAULT_LATENCY
+        per_items.extend([per_item] * len(unit))
+        latencies.append(per_item * len(unit) + args.delay)
+        texts = [entry[2]["text"] for entry in unit]
+        chars += len(build_marked_ssml(texts)) if len(unit) > 1 else len(texts[0])
+    seconds = simulate_wall_seconds(latencies, args.concurrency)
+    return {
+        "backend": BACKEND,
+        "items": len(pending),
+        "chars": chars,
+        "requests": len(latencies),
+        "days": None,
+        "today_seconds": seconds,
+        "total_seconds": seconds,
+        "latency": sum(per_items) / len(per_items) if per_items else DEFAULT_LATENCY,
+        "samples": samples,
+        "note": f"無料枠（月{FREE_CHARS_PER_MONTH:,}文字）の {chars / FREE_CHARS_PER_MONTH:.2%}",
+    }
 
 
 def main():
@@ -275,7 +360,53 @@ def main():
                         help=f"英語の話速 (default: {DEFAULT_SPEAKING_RATE_EN})")
     parser.add_argument("--delay", type=float, default=DEFAULT_DELAY,
                         help=f"リクエスト間隔・秒 (default: {DEFAULT_DELAY})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"同時リクエスト数 (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="SSML 1リクエストにまとめる単語数。2以上で <mark> のタイムポイントで"
+                             "切り出す（ffmpeg が必要。SSML 非対応の Chirp3-HD ボイスは1件ずつ） "
+                             f"(default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--trim", action="store_true",
+                        help="各ファイルの前後の無音を削る（ffmpeg と numpy が必要）")
+    parser.add_argument("--trim-onset-ms", type=int, default=DEFAULT_TRIM_ONSET_MS,
+                        help=f"--trim 時に音の前に残す無音・ms (default: {DEFAULT_TRIM_ONSET_MS})")
+    parser.add_argument("--trim-tail-ms", type=int, default=DEFAULT_TRIM_TAIL_MS,
+                        help=f"--trim 時に音の後に残す無音・ms (default: {DEFAULT_TRIM_TAIL_MS})")
+    parser.add_argument("--profiles",
+                        help="ローカルでエンコードするプロファイル（カンマ区切り。MP3 を1つ含める。"
+                             "例: mp3-48k,opus-24k）。省略時は API の MP3 をそのまま保存")
+    parser.add_argument("--sprite", action="store_true",
+                        help="アプリごとの音声スプライト (audio/sprites/<app>.mp3 + .json) も出力")
+    parser.add_argument("--plan", action="store_true",
+                        help="生成計画（件数・文字数・リクエスト数・所要時間）だけを表示")
+    add_metrics_arguments(parser)
     args = parser.parse_args()
+    if args.profiles:
+        try:
+            args.profiles = parse_profiles(args.profiles)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.batch_size > 1:
+        # バッチは LINEAR16 で受け取って切り出すので、ローカルでエンコードする
+        args.profiles = DEFAULT_PROFILES
+
+    app_ids = [args.app] if args.app else list(APPS.keys())
+    latency = LatencyHistory()
+    if args.plan:
+        # 何も書き出さない（マニフェスト未登録ファイルの登録もしない）
+        cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+        all_items, pending, skipped = collect_pending(args, app_ids, cache, create_dirs=False)
+        pending, shared = share_pending(args, pending, cache, dry_run=True)
+        print(f"Google Cloud TTS 生成計画")
+        print(f"{'='*60}")
+        print(f"  対象アプリ   : {', '.join(app_ids)}")
+        print(f"  全ファイル   : {len(all_items)}件 (生成済み {skipped}件)")
+        if shared.reused or shared.merged:
+            print(f"  共有         : 既存から配布 {shared.reused}件, "
+                  f"同じ音声をまとめる {shared.merged}件")
+        print(f"  並列数       : {args.concurrency}")
+        print_plan([plan_estimate(pending, args, latency)])
+        return
 
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
@@ -285,90 +416,159 @@ def main():
         print("  設定: $env:GOOGLE_API_KEY='your-key'  (PowerShell)")
         sys.exit(1)
 
-    app_ids = [args.app] if args.app else list(APPS.keys())
-
-    # 全アイテム収集
-    all_items = []
-    for app_id in app_ids:
-        app = APPS[app_id]
-        output_dir = os.path.join(AUDIO_BASE_DIR, app["output_dir"])
-        os.makedirs(output_dir, exist_ok=True)
-        for item in app["get_items"]():
-            all_items.append((app_id, output_dir, item))
-
-    # 未生成のみ抽出
-    pending = []
-    skipped = 0
-    for app_id, output_dir, item in all_items:
-        filepath = os.path.join(output_dir, item["filename"])
-        if os.path.exists(filepath) and not args.force:
-            skipped += 1
-        else:
-            pending.append((app_id, output_dir, item))
+    # 未生成・入力変更ありのみ抽出
+    cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+    all_items, pending, skipped = collect_pending(args, app_ids, cache)
+    pending, shared = share_pending(args, pending, cache)
+    cache.save()
 
     print(f"Google Cloud TTS 音声生成")
     print(f"{'='*60}")
     print(f"  日本語ボイス : {args.voice_ja} (rate={args.rate_ja})")
     print(f"  英語ボイス   : {args.voice_en} (rate={args.rate_en})")
     print(f"  対象アプリ   : {', '.join(app_ids)}")
+    print(f"  並列数       : {args.concurrency}")
+    if args.batch_size > 1:
+        print(f"  SSML バッチ  : {args.batch_size}単語/リクエスト")
     print(f"{'='*60}")
     print(f"  全ファイル   : {len(all_items)}件")
     print(f"  既存スキップ : {skipped}件")
-    print(f"  今回生成     : {len(pending)}件")
-    est = len(pending) * (args.delay + 0.3)  # API応答 ~0.3s + delay
-    print(f"  推定所要時間 : 約{format_eta(est)}")
+    if cache.adopted:
+        print(f"  (うちマニフェスト未登録の既存ファイル {cache.adopted}件を登録)")
+    if shared.reused:
+        print(f"  既存から配布 : {shared.reused}件（同じ音声のファイルをリンク/コピー）")
+    if shared.merged:
+        print(f"  まとめて生成 : {shared.merged}件（同じ音声の出力先を1回の合成で作る）")
+    units = make_units(pending, args)
+    print(f"  今回生成     : {len(pending)}件 ({len(units)}リクエスト)")
+    plan = plan_estimate(pending, args, latency)
+    print(f"  推定所要時間 : 約{format_duration(plan['total_seconds'])}"
+          f"（応答 {plan['latency']:.2f}秒/件）")
     print(f"{'='*60}")
 
     if not pending:
         print("\n全て生成済みです。")
+        if args.sprite:
+            write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+        update_precache_manifest(AUDIO_BASE_DIR)
         return
 
     generated = 0
     errors = 0
     start_time = time.time()
+    METRICS.start("cloud-tts", args.metrics_jsonl)
     current_app = None
-
-    for idx, (app_id, output_dir, item) in enumerate(pending):
+    trim = (args.trim_onset_ms, args.trim_tail_ms) if args.trim else None
+    trim_saved = {}  # app_id -> [削った合計 ms, 件数]
+    sizes_before = app_audio_sizes(APPS, app_ids, AUDIO_BASE_DIR)
+    gate = PauseGate()
+
+    def submit(executor, unit):
+        voice, lang_code, rate = voice_settings(unit[0][2], args)
+        batch = [(item, os.path.join(output_dir, item["filename"]))
+                 for _app_id, output_dir, item, _key in unit]
+        if len(batch) > 1:
+            return executor.submit(process_batch, batch, voice, lang_code, rate, api_key,
+                                   args.delay, trim, args.profiles, gate)
+        item, filepath = batch[0]
+        return executor.submit(process_item, item, filepath, voice, lang_code,
+                               rate, api_key, args.delay, trim, args.profiles, gate)
+
+    def show_result(idx, entry, result):
+        nonlocal current_app, generated, errors
+        app_id, output_dir, item, key = entry
         if app_id != current_app:
             current_app = app_id
             print(f"\n--- {APPS[app_id]['label']} ({app_id}) ---")
 
-        filepath = os.path.join(output_dir, item["filename"])
-        is_ja = item["lang"] == "ja"
-        voice = args.voice_ja if is_ja else args.voice_en
-        lang_code = "ja-JP" if is_ja else "en-US"
-        rate = args.rate_ja if is_ja else args.rate_en
-
-        print(f"  [{idx+1}/{len(pending)}] {item['filename']} "
-              f"(\"{item['text']}\")", end="", flush=True)
-
-        try:
-            mp3_data = synthesize(item["text"], voice, lang_code, rate, api_key)
-            with open(filepath, "wb") as f:
-                f.write(mp3_data)
-            kb = len(mp3_data) / 1024
+        print(f"  [{idx}/{len(pending)}] {item['filename']} "
+              f"(\"{item['text']}\")", end="")
+        if result["latency"] is not None:
+            voice = voice_settings(item, args)[0]
+            latency.record(latency_key(BACKEND, voice), result["latency"],
+                           result.get("latency_items", 1))
+        if result["ok"]:
+            kb = result["size"] / 1024
             print(f" -> OK ({kb:.1f}KB)")
+            filepath = os.path.join(output_dir, item["filename"])
+            cache.record(filepath, key, backend=BACKEND, text=item["text"],
+                         profiles=args.profiles or ["api-mp3"])
+            shared.written(filepath)
             generated += 1
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode("utf-8", errors="replace")
-            print(f" -> ERROR ({e.code}): {error_body}")
+            if trim:
+                saved = trim_saved.setdefault(app_id, [0, 0])
+                saved[0] += result["trimmed_ms"]
+                saved[1] += 1
+        elif result["retry_after"] is not None:
+            print(f" -> ERROR (429): {THROTTLE_RETRIES}回再送してもレートリミット")
             errors += 1
-            if e.code == 429:
-                print("    レートリミット。10秒待機...")
-                time.sleep(10)
-        except Exception as e:
-            print(f" -> ERROR: {e}")
+        else:
+            print(f" -> ERROR: {result['error']}")
             errors += 1
 
-        if idx < len(pending) - 1:
-            time.sleep(args.delay)
-
+    # 結果は投入順に受け取り、表示順を逐次実行時と揃える。
+    # 429 の分は最後に回して再送する（待ち時間は PauseGate で全ワーカーが守る）
+    interrupted = False
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        queue = [(unit, submit(executor, unit), 0) for unit in units]
+
+        index = 0
+        while index < len(queue):
+            unit, future, attempt = queue[index]
+            index += 1
+            if future.cancelled():
+                continue
+            try:
+                results = future.result()
+            except KeyboardInterrupt:
+                # 未送信の分を取り消し、送信済みの分は保存まで待つ（もう一度 Ctrl-C で即中断）
+                interrupted = True
+                print("\n中断要求: 送信済みの分を保存してから終了します")
+                for _unit, pending_future, _attempt in queue:
+                    pending_future.cancel()
+                results = future.result()
+            if isinstance(results, dict):
+                results = [results]
+            throttled = [i for i, result in enumerate(results) if result["retry_after"] is not None]
+            if throttled and attempt < THROTTLE_RETRIES and not interrupted:
+                METRICS.count("retries")
+                retry_unit = [unit[i] for i in throttled]
+                queue.append((retry_unit, submit(executor, retry_unit), attempt + 1))
+            else:
+                throttled = []
+            for i, (entry, result) in enumerate(zip(unit, results)):
+                if i in throttled:
+                    continue
+                done += 1
+                show_result(done, entry, result)
+
+    cache.save()
+    latency.save()
     elapsed = time.time() - start_time
 
     print(f"\n{'='*60}")
-    print(f"  完了! (実行時間: {format_eta(elapsed)})")
+    if interrupted:
+        remaining = len(pending) - generated - errors
+        print(f"  中断しました (実行時間: {format_duration(elapsed)}) 残り: {remaining}件 → 再実行で続きから")
+    else:
+        print(f"  完了! (実行時間: {format_duration(elapsed)})")
     print(f"  生成: {generated}  エラー: {errors}  スキップ(既存): {skipped}")
+    if shared.fanned_out:
+        print(f"  同じ音声を配布: {shared.fanned_out}件")
+    if trim_saved:
+        print(f"  無音トリム:")
+        for app_id, (ms, count) in trim_saved.items():
+            avg = ms / count if count else 0
+            print(f"    {app_id}: 合計 -{ms / 1000:.1f}秒 ({count}件, 平均 -{avg:.0f}ms)")
+    print_size_report(sizes_before, app_audio_sizes(APPS, app_ids, AUDIO_BASE_DIR))
+    METRICS.print_summary()
     print(f"{'='*60}")
+    METRICS.finish(args.metrics_prom)
+
+    if args.sprite:
+        write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+    update_precache_manifest(AUDIO_BASE_DIR)
 
 
 if __name__ == "__main__":
@@ -3,13 +3,18 @@
 
 バッチ生成方式: 複数単語をまとめて1回のAPI呼び出しで生成し、
 無音区間で分割して個別MP3に保存する。API呼び出し数を約1/10に削減。
+分割に失敗したバッチは半分ずつに分けて再生成する（1件ずつにはしない）。
+取得・分割・MP3エンコード・書き込みはパイプラインで並行に進め、
+リクエスト間隔の待ち時間の間にローカルの処理を済ませる。
+リクエストは RPM / RPD クォータに合わせて複数同時に出す（tts_quota.QuotaScheduler）。
+1日の使用数は scripts/gemini-usage.json に保存され、当日の残りで終わらない分は次回に回す。
 
 無料枠(Free tier)での目安:
-  - 10 RPM, 250 RPD
+  - 10 RPM, 250 RPD（--rpm / --rpd で変更）
   - 全414件 → バッチサイズ10 → 約42回のAPI呼び出し → 1日で完了
 
 使い方:
-  pip install google-genai pydub audioop-lts
+  pip install google-genai pydub audioop-lts numpy
 
   # ffmpeg も必要（pydubのMP3変換に使用）
   # Windows: winget install ffmpeg / choco install ffmpeg
@@ -24,9 +29,41 @@
   # 既存ファイルを上書き
   python scripts/generate-audio-gemini.py --force
 
-  # バッチサイズを変更（デフォルト10）
+  ※ 生成済みかどうかは scripts/tts-manifest.json の合成キー
+    （テキスト・補足・ボイス・モデル）で判定する。入力が変わったファイルだけ再生成される。
+
+  # バッチサイズを固定（省略時は過去の分割成否から自動で選ぶ）
   python scripts/generate-audio-gemini.py --batch-size 5
 
+  # 分割方式を指定（デフォルト auto: 期待数に合わせた分割 → 閾値探索）
+  python scripts/generate-audio-gemini.py --split-mode threshold
+
+  # 各ファイルの前後の無音を削る（数式の連続再生などで間延びしないように）
+  python scripts/generate-audio-gemini.py --trim --trim-onset-ms 30 --trim-tail-ms 80
+
+  # エンコードプロファイルを指定（MP3 は1つ必須。Opus は同名の .opus を併せて出力）
+  # 全プロファイルを同じ PCM から1回の ffmpeg 起動で出力し、最後にアプリごとのサイズを比較表示
+  python scripts/generate-audio-gemini.py --offline --profiles mp3-48k,opus-24k
+
+  # ストリーミングで受け取り、単語の後ろの無音が届いた時点でその単語をエンコード
+  # （エンコードが受信と並行して進み、応答全体をメモリに溜めない。書き込みは切り出した
+  #   数を確かめてから行い、合わなければ応答全体で --split-mode の分割をやり直す）
+  python scripts/generate-audio-gemini.py --stream --batch-size 50
+
+  # 同時リクエスト数とクォータを指定（有料枠など）
+  python scripts/generate-audio-gemini.py --in-flight 4 --rpm 30 --rpd 1000
+
+  # 保存済みの生PCM (scripts/gemini-pcm/) から分割・エンコードだけやり直す
+  # （APIリクエストなし・APIキー不要。無音パラメータやビットレート調整用）
+  python scripts/generate-audio-gemini.py --offline
+
+  # アプリごとに全クリップを1ファイルにまとめたスプライトも出力
+  python scripts/generate-audio-gemini.py --sprite
+
+  # 生成計画だけを表示（APIキー不要・API を呼ばない。google-genai / pydub も読み込まない）
+  # 未生成件数・課金文字数・リクエスト数・RPD で必要な日数・所要時間（過去の応答時間から）
+  python scripts/generate-audio-gemini.py --plan
+
 利用可能なボイス:
   Zephyr, Puck, Charon, Kore, Fenrir, Leda, Orus, Aoede,
   Callirrhoe, Autonoe, Enceladus, Iapetus, Umbriel, Algieba,
@@ -35,430 +72,1018 @@
   Vindemiatrix, Sadachbia, Sadaltager, Sulafat
 """
 
+from __future__ import annotations
+
 import argparse
-import io
 import os
+import queue
+import signal
 import sys
+import threading
 import time
-import wave
-
-from google import genai
-from google.genai import types
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from tts_backends import (GEMINI_MODEL, GEMINI_SAMPLE_RATE, GEMINI_VOICE_EN, GEMINI_VOICE_JA,
+                          SILENCE_KEEP, SILENCE_MIN_LEN, SILENCE_THRESH, SPLIT_MODES,
+                          build_prompt, find_split_ranges, gemini_cache_key, gemini_client,
+                          generate_speech, generate_speech_stream)
+from tts_batch_tuner import BatchSizeTuner, profile_key
+from tts_cache import SharedClips, SynthesisCache
+from tts_catalog import APPS
+from tts_encode import (DEFAULT_PROFILES, app_audio_sizes, encode_batch, parse_profiles,
+                        print_size_report, profile_path)
+from tts_pcm_store import PcmStore, pcm_key
+from tts_plan import (LatencyHistory, format_duration, latency_key, print_plan, rpd_days,
+                      simulate_wall_seconds)
+from tts_precache import update_precache_manifest
+from tts_journal import RunJournal, write_file_atomic
+from tts_metrics import METRICS, add_metrics_arguments
+from tts_quota import QuotaScheduler, is_daily_quota_error, is_rate_limited, retry_delay
+from tts_sprite import write_sprites
+
+# google-genai / pydub / numpy は読み込みに時間がかかるので、使う関数の中で読み込む
+# （--plan は API もエンコードも使わないため、これらなしで即座に起動する）
+if TYPE_CHECKING:
+    from google import genai
+    from pydub import AudioSegment
+    from tts_silence import SilenceEnvelope
 
 # --- 定数 ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 AUDIO_BASE_DIR = os.path.join(SCRIPT_DIR, "..", "edup-app", "public", "audio")
 
-DEFAULT_VOICE_JA = "Kore"
-DEFAULT_VOICE_EN = "Aoede"
-MODEL = "gemini-2.5-flash-preview-tts"
+DEFAULT_VOICE_JA = GEMINI_VOICE_JA
+DEFAULT_VOICE_EN = GEMINI_VOICE_EN
+MODEL = GEMINI_MODEL
+BACKEND = "gemini"
 
-DEFAULT_DELAY = 8
+DEFAULT_DELAY = 0                  # リクエスト開始の最小間隔（秒）。通常はクォータ任せで 0
+DEFAULT_RPM = 10                   # 無料枠の1分あたりリクエスト数
+DEFAULT_RPD = 250                  # 無料枠の1日あたりリクエスト数
+DEFAULT_IN_FLIGHT = 3              # 同時に応答待ちにするリクエスト数
 DEFAULT_BATCH_SIZE = 50
 DEFAULT_MAX_REQUESTS = 200
+DEFAULT_ENCODE_WORKERS = min(4, os.cpu_count() or 1)
+PIPELINE_QUEUE_SIZE = 2   # 段の間のキューに溜めるバッチ数の上限
 MAX_RETRIES = 3
-RATE_LIMIT_WAIT = 60
-
-# 無音分割パラメータ
-SILENCE_MIN_LEN = 800    # 無音と判定する最小長さ (ms)
-SILENCE_THRESH = -36      # 無音と判定する音量閾値 (dBFS)
-SILENCE_KEEP = 150        # 分割後に前後に残す無音 (ms)
-
-
-# --- 各アプリの音声データ定義 ---
-# 各アイテムは以下の形式:
-#   filename: 出力ファイル名
-#   speech:   実際に読み上げるテキスト
-#   context:  同音異義語の区別等、TTS への補足情報（省略可）
-#   lang:     言語 ("ja" or "en")
-
-def get_dots_items():
-    """ドッツカード: 「これは N です」(1-100)"""
-    items = []
-    for n in range(1, 101):
-        items.append({
-            "filename": f"{n}.mp3",
-            "speech": f"これは{n}です",
-            "context": "",
-            "lang": "ja",
-        })
-    return items
-
-
-def get_dots_math_items():
-    """ドッツ計算: 演算子 + 数字(1-100)"""
-    items = []
-    operators = [
-        ("plus.mp3", "たす", "足し算の「たす」"),
-        ("minus.mp3", "ひく", "引き算の「ひく」"),
-        ("wa.mp3", "わ", "「〜は」の助詞"),
-    ]
-    for filename, speech, context in operators:
-        items.append({
-            "filename": filename,
-            "speech": speech,
-            "context": context,
-            "lang": "ja",
-        })
-    for n in range(1, 101):
-        items.append({
-            "filename": f"{n}.mp3",
-            "speech": str(n),
-            "context": f"数字の{n}",
-            "lang": "ja",
-        })
-    return items
-
-
-def get_hiragana_flash_items():
-    """ひらがなフラッシュ: 日本語単語（漢字・絵文字で意味を補足）"""
-    # (word, kanji, emoji) - コンポーネントのHIRAGANA_DATAと同期
-    data = [
-        # あ行
-        ("あり", "蟻", "🐜"), ("あめ", "飴", "🍬"), ("あひる", "家鴨", "🦆"),
-        ("いぬ", "犬", "🐕"), ("いちご", "苺", "🍓"), ("いるか", "海豚", "🐬"),
-        ("うし", "牛", "🐄"), ("うさぎ", "兎", "🐰"), ("うみ", "海", "🌊"),
-        ("えび", "海老", "🦐"), ("えんぴつ", "鉛筆", "✏️"),
-        ("おに", "鬼", "👹"), ("おばけ", "お化け", "👻"),
-        # か行
-        ("かに", "蟹", "🦀"), ("かさ", "傘", "☂️"), ("かめ", "亀", "🐢"),
-        ("きつね", "狐", "🦊"), ("きのこ", "茸", "🍄"),
-        ("くま", "熊", "🐻"), ("くじら", "鯨", "🐋"), ("くるま", "車", "🚗"),
-        ("けむし", "毛虫", "🐛"), ("けーき", "ケーキ", "🎂"),
-        ("こあら", "コアラ", "🐨"), ("こいのぼり", "鯉のぼり", "🎏"),
-        # さ行
-        ("さる", "猿", "🐵"), ("さかな", "魚", "🐟"),
-        ("しか", "鹿", "🦌"), ("しんかんせん", "新幹線", "🚄"),
-        ("すいか", "西瓜", "🍉"), ("すし", "寿司", "🍣"),
-        ("せんす", "扇子", "🪭"), ("せんべい", "煎餅", "🍘"),
-        ("そら", "空", "🌤️"), ("そり", "橇", "🛷"),
-        # た行
-        ("たこ", "蛸", "🐙"), ("たいよう", "太陽", "☀️"),
-        ("ちょう", "蝶", "🦋"), ("ちーず", "チーズ", "🧀"),
-        ("つき", "月", "🌙"), ("つばめ", "燕", "🐦"),
-        ("てんとうむし", "天道虫", "🐞"), ("てがみ", "手紙", "💌"),
-        ("とら", "虎", "🐯"), ("とけい", "時計", "⏰"),
-        # な行
-        ("なす", "茄子", "🍆"), ("なると", "鳴門", "🍥"),
-        ("にわとり", "鶏", "🐔"), ("にじ", "虹", "🌈"),
-        ("ぬいぐるみ", "縫いぐるみ", "🧸"),
-        ("ねこ", "猫", "🐱"), ("ねずみ", "鼠", "🐭"),
-        ("のり", "海苔", "🍙"),
-        # は行
-        ("はな", "花", "🌸"), ("はち", "蜂", "🐝"),
-        ("ひよこ", "雛", "🐤"), ("ひこうき", "飛行機", "✈️"),
-        ("ふくろう", "梟", "🦉"), ("ふね", "船", "🚢"),
-        ("へび", "蛇", "🐍"),
-        ("ほし", "星", "⭐"), ("ほうき", "箒", "🧹"),
-        # ま行
-        ("まめ", "豆", "🫘"), ("まと", "的", "🎯"),
-        ("みかん", "蜜柑", "🍊"), ("みず", "水", "💧"),
-        ("むし", "虫", "🐛"),
-        ("め", "目", "👁️"), ("めだまやき", "目玉焼き", "🍳"),
-        ("もも", "桃", "🍑"), ("もり", "森", "🌲"),
-        # や行
-        ("やま", "山", "⛰️"), ("やきいも", "焼き芋", "🍠"),
-        ("ゆき", "雪", "❄️"), ("ゆびわ", "指輪", "💍"),
-        ("よっと", "ヨット", "⛵"),
-        # ら行
-        ("らいおん", "ライオン", "🦁"), ("らっこ", "ラッコ", "🦦"),
-        ("りんご", "林檎", "🍎"), ("りす", "栗鼠", "🐿️"),
-        ("るびー", "ルビー", "💎"), ("れもん", "レモン", "🍋"),
-        ("ろうそく", "蝋燭", "🕯️"), ("ろけっと", "ロケット", "🚀"),
-        # わ行
-        ("わに", "鰐", "🐊"),
-        # 濁音 が行
-        ("がっこう", "学校", "🏫"), ("がいこつ", "骸骨", "💀"),
-        ("ぎたー", "ギター", "🎸"), ("ぎゅうにゅう", "牛乳", "🥛"),
-        ("ぐー", "グー", "✊"),
-        ("げーむ", "ゲーム", "🎮"),
-        ("ごりら", "ゴリラ", "🦍"), ("ごはん", "御飯", "🍚"),
-        # 濁音 ざ行
-        ("ざりがに", "ザリガニ", "🦞"),
-        ("じしゃく", "磁石", "🧲"), ("じてんしゃ", "自転車", "🚲"),
-        ("ずぼん", "ズボン", "👖"), ("ぜりー", "ゼリー", "🍮"),
-        ("ぞう", "象", "🐘"),
-        # 濁音 だ行
-        ("だんご", "団子", "🍡"),
-        ("でんしゃ", "電車", "🚃"), ("でんわ", "電話", "📞"),
-        ("どんぐり", "団栗", "🌰"), ("どーなつ", "ドーナツ", "🍩"),
-        # 濁音 ば行
-        ("ばなな", "バナナ", "🍌"), ("ばった", "飛蝗", "🦗"),
-        ("びーだま", "ビー玉", "🔮"),
-        ("ぶどう", "葡萄", "🍇"), ("ぶた", "豚", "🐷"),
-        ("べる", "ベル", "🔔"),
-        ("ぼうし", "帽子", "🎩"), ("ぼーる", "ボール", "⚽"),
-        # 半濁音 ぱ行
-        ("ぱんだ", "パンダ", "🐼"), ("ぱいなっぷる", "パイナップル", "🍍"),
-        ("ぴあの", "ピアノ", "🎹"), ("ぷーる", "プール", "🏊"),
-        ("ぺんぎん", "ペンギン", "🐧"),
-        ("ぽすと", "ポスト", "📮"), ("ぽっぷこーん", "ポップコーン", "🍿"),
-    ]
-    items = []
-    for word, kanji, emoji in data:
-        items.append({
-            "filename": f"{word}.mp3",
-            "speech": word,
-            "context": f"{kanji}{emoji}",
-            "lang": "ja",
-        })
-    return items
-
-
-def get_english_flash_items():
-    """英語フラッシュ: 英単語"""
-    words = [
-        "dog", "cat", "bird", "fish", "rabbit", "bear", "elephant", "lion",
-        "monkey", "pig", "cow", "horse", "sheep", "chicken", "duck", "frog",
-        "turtle", "penguin", "whale", "butterfly", "giraffe", "zebra", "snake",
-        "owl", "dolphin",
-        "apple", "banana", "orange", "grape", "strawberry", "watermelon",
-        "peach", "cherry", "bread", "rice", "egg", "milk", "cake", "cookie",
-        "ice cream", "pizza", "tomato", "corn", "carrot", "lemon",
-        "chocolate", "cheese", "donut", "pineapple", "mushroom",
-        "car", "bus", "train", "airplane", "bicycle", "boat", "rocket",
-        "star", "sun", "moon", "rainbow", "flower", "tree", "house", "book",
-        "pencil", "clock", "umbrella", "hat", "shoe", "key", "bell", "ball",
-        "guitar", "camera",
-        "eye", "ear", "hand", "foot", "heart", "nose", "mouth", "tooth",
-        "leg", "bone", "brain", "muscle", "finger", "face", "tongue",
-        "fire", "water", "snow", "cloud", "mountain", "rain", "wind",
-        "thunder", "ocean", "river", "leaf", "rock", "sand", "earth", "volcano",
-        "red", "blue", "green", "yellow", "orange", "purple", "pink",
-        "white", "black", "brown",
-    ]
-    items = []
-    for w in words:
-        items.append({
-            "filename": w.replace(" ", "-") + ".mp3",
-            "speech": w,
-            "context": "",
-            "lang": "en",
-        })
-    return items
-
-
-# アプリ定義
-APPS = {
-    "dots": {
-        "label": "ドッツカード",
-        "output_dir": "dots",
-        "get_items": get_dots_items,
-    },
-    "dots-math": {
-        "label": "ドッツ計算",
-        "output_dir": "dots-math",
-        "get_items": get_dots_math_items,
-    },
-    "hiragana-flash": {
-        "label": "ひらがなフラッシュ",
-        "output_dir": "hiragana-flash",
-        "get_items": get_hiragana_flash_items,
-    },
-    "english-flash": {
-        "label": "英語フラッシュ",
-        "output_dir": "english-flash",
-        "get_items": get_english_flash_items,
-    },
-}
+RATE_LIMIT_WAIT = 60      # 429 に待ち時間の指示がない場合の待機（秒）
+DEFAULT_LATENCY_PER_ITEM = 1.5   # 応答時間の履歴がないときの見積もり（秒/件）
+
+# 前後の無音トリムパラメータ
+TRIM_THRESH = -45               # これより小さい音は無音とみなす (dBFS)
+DEFAULT_TRIM_ONSET_MS = 30      # 音の立ち上がり前に残す無音 (ms)
+DEFAULT_TRIM_TAIL_MS = 80       # 音の終わりの後に残す無音 (ms)
 
 
 # --- ユーティリティ ---
 
-def pcm_to_audio_segment(pcm_data: bytes, sample_rate: int = 24000) -> AudioSegment:
-    """PCM (16-bit mono) を AudioSegment に変換。"""
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate)
-        wf.writeframes(pcm_data)
-    wav_buffer.seek(0)
-    return AudioSegment.from_wav(wav_buffer)
-
-
-def export_mp3(segment: AudioSegment) -> bytes:
-    """AudioSegment を MP3 バイト列に変換。"""
-    buf = io.BytesIO()
-    segment.export(buf, format="mp3", bitrate="128k")
-    return buf.getvalue()
-
-
-def generate_speech(client: genai.Client, text: str, voice_name: str, model: str) -> bytes:
-    """Gemini TTS で音声を生成し、PCM バイト列を返す。"""
-    response = client.models.generate_content(
-        model=model,
-        contents=text,
-        config=types.GenerateContentConfig(
-            response_modalities=["AUDIO"],
-            speech_config=types.SpeechConfig(
-                voice_config=types.VoiceConfig(
-                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                        voice_name=voice_name,
-                    )
-                )
-            ),
-        ),
-    )
-    if not response.candidates:
-        raise RuntimeError(f"Empty candidates. prompt_feedback={response.prompt_feedback}")
-    candidate = response.candidates[0]
-    if candidate.finish_reason and candidate.finish_reason.name not in ("STOP", "MAX_TOKENS"):
-        raise RuntimeError(f"Blocked: finish_reason={candidate.finish_reason}")
-    if not candidate.content or not candidate.content.parts:
-        raise RuntimeError(
-            f"No content returned. finish_reason={candidate.finish_reason}, "
-            f"safety_ratings={candidate.safety_ratings}"
-        )
-    return candidate.content.parts[0].inline_data.data
-
-
-def build_batch_prompt_ja(batch_items: list) -> str:
-    """日本語バッチ用のプロンプトを構築。"""
-    lines = []
-    for i, item in enumerate(batch_items, 1):
-        ctx = f"（{item['context']}）" if item["context"] else ""
-        lines.append(f"{i}. 「{item['speech']}」{ctx}")
-    word_list = "\n".join(lines)
-    return (
-        f"子供に語りかけるように、以下の{len(batch_items)}個のフレーズを"
-        f"1つずつ順番に、はっきりと日本語で読んでください。\n"
-        f"各フレーズの間には3秒の沈黙を入れてください。\n"
-        f"番号や余計な言葉は加えず、指定されたフレーズのみ読んでください。\n\n"
-        f"{word_list}"
-    )
+def pcm_to_audio_segment(pcm_data, sample_rate: int = GEMINI_SAMPLE_RATE) -> AudioSegment:
+    """PCM (16-bit mono) をコピーせずに AudioSegment として見る。
 
+    pcm_data（bytes や PcmStore の mmap 上のビュー）の memoryview をそのままデータにするので、
+    WAV を経由した変換のコピーが要らない。切り出しは slice_segment で行う。
+    """
+    from pydub import AudioSegment
 
-def build_batch_prompt_en(batch_items: list) -> str:
-    """英語バッチ用のプロンプトを構築。"""
-    lines = []
-    for i, item in enumerate(batch_items, 1):
-        lines.append(f'{i}. "{item["speech"]}"')
-    word_list = "\n".join(lines)
-    return (
-        f"Speak clearly and cheerfully for a child learning English.\n"
-        f"Say each of the following {len(batch_items)} words one at a time, in order.\n"
-        f"Put 3 seconds of silence between each word.\n"
-        f"Do not add numbers, explanations, or any extra words.\n\n"
-        f"{word_list}"
-    )
+    with METRICS.stage("pcm_to_audio_segment"):
+        view = memoryview(pcm_data)
+        return AudioSegment(data=view[:len(view) // 2 * 2], sample_width=2,
+                            frame_rate=sample_rate, channels=1)
 
 
-def split_audio_segments(audio: AudioSegment, expected_count: int) -> list[AudioSegment] | None:
-    """音声を無音区間で分割。期待数と一致しなければ None を返す。"""
-    segments = split_on_silence(
-        audio,
-        min_silence_len=SILENCE_MIN_LEN,
-        silence_thresh=SILENCE_THRESH,
-        keep_silence=SILENCE_KEEP,
-    )
-    if len(segments) == expected_count:
-        return segments
-
-    # 閾値を調整してリトライ
-    for thresh_adj in [-4, -8, 4, 8]:
-        for len_adj in [0, -200, 200]:
-            adjusted_thresh = SILENCE_THRESH + thresh_adj
-            adjusted_len = max(300, SILENCE_MIN_LEN + len_adj)
-            segments = split_on_silence(
-                audio,
-                min_silence_len=adjusted_len,
-                silence_thresh=adjusted_thresh,
-                keep_silence=SILENCE_KEEP,
-            )
-            if len(segments) == expected_count:
-                return segments
+def slice_segment(segment: AudioSegment, start_ms: int, end_ms: int) -> AudioSegment:
+    """segment[start_ms:end_ms] と同じ範囲を、元のバッファ上のビューのまま切り出す。
 
-    return None
+    pydub のスライスは bytes のコピーを作り、終端が丸めで長さを超えると無音を連結するので使わない。
+    """
+    from pydub import AudioSegment
 
+    view = memoryview(segment.raw_data)
+    frames = len(view) // segment.frame_width
+    first = min(start_ms * segment.frame_rate // 1000, frames) * segment.frame_width
+    last = min(end_ms * segment.frame_rate // 1000, frames) * segment.frame_width
+    return AudioSegment(data=view[first:max(first, last)], sample_width=segment.sample_width,
+                        frame_rate=segment.frame_rate, channels=segment.channels)
 
-def format_eta(seconds: float) -> str:
-    m, s = divmod(int(seconds), 60)
-    if m > 0:
-        return f"{m}m {s}s"
-    return f"{s}s"
 
+def export_batch(segments: list[AudioSegment], profiles: list) -> list[dict[str, bytes]]:
+    """AudioSegment 群を1回の ffmpeg 起動でまとめて各プロファイルのバイト列に変換。"""
+    if not segments:
+        return []
+    return encode_batch([seg.raw_data for seg in segments],
+                        sample_rate=segments[0].frame_rate, profiles=profiles)
 
-# --- メイン処理 ---
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Gemini TTS 音声生成（バッチ方式・無料枠対応）"
-    )
-    parser.add_argument("--app", choices=list(APPS.keys()),
-                        help="特定のアプリのみ生成")
-    parser.add_argument("--force", action="store_true",
-                        help="既存ファイルを上書き")
-    parser.add_argument("--voice-ja", default=DEFAULT_VOICE_JA,
-                        help=f"日本語ボイス (default: {DEFAULT_VOICE_JA})")
-    parser.add_argument("--voice-en", default=DEFAULT_VOICE_EN,
-                        help=f"英語ボイス (default: {DEFAULT_VOICE_EN})")
-    parser.add_argument("--model", default=MODEL,
-                        help=f"使用モデル (default: {MODEL})")
-    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY,
-                        help=f"リクエスト間隔・秒 (default: {DEFAULT_DELAY})")
-    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
-                        help=f"1回のAPIで生成する単語数 (default: {DEFAULT_BATCH_SIZE})")
-    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS,
-                        help=f"最大APIリクエスト数 (default: {DEFAULT_MAX_REQUESTS})")
-    args = parser.parse_args()
+def trim_segment(segment: AudioSegment, onset_ms: int, tail_ms: int) -> tuple[AudioSegment, int]:
+    """前後の無音を削ったセグメントと、削った長さ (ms) を返す。"""
+    from tts_silence import SilenceEnvelope
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY 環境変数を設定してください")
-        print("  取得: https://aistudio.google.com/apikey")
-        print("  設定: $env:GEMINI_API_KEY='your-key'  (PowerShell)")
-        sys.exit(1)
+    with METRICS.stage("trim"):
+        envelope = SilenceEnvelope(segment.raw_data, segment.frame_rate)
+        start, end = envelope.trim_range(TRIM_THRESH, onset_ms, tail_ms)
+        return slice_segment(segment, start, end), len(segment) - (end - start)
 
-    model = args.model
-    client = genai.Client(api_key=api_key)
 
-    # 全アイテム収集
-    app_ids = [args.app] if args.app else list(APPS.keys())
+def split_audio_segments(audio: AudioSegment, expected_count: int,
+                         envelope: SilenceEnvelope | None = None,
+                         mode: str = "auto") -> list[AudioSegment] | None:
+    """音声を無音区間で分割。期待数と一致しなければ None を返す（方式は find_split_ranges）。"""
+    if envelope is None:
+        from tts_silence import SilenceEnvelope
+
+        envelope = SilenceEnvelope(audio.raw_data, audio.frame_rate)
+    ranges = find_split_ranges(envelope, expected_count, mode)
+    if ranges is None:
+        return None
+    return [slice_segment(audio, start, end) for start, end in ranges]
+
+
+_print_lock = threading.Lock()
+
+
+def log(msg: str):
+    """複数スレッドから呼ばれても行が混ざらないように出力する。"""
+    with _print_lock:
+        print(msg, flush=True)
+
+
+def fetch_audio(client: genai.Client, prompt: str, voice: str, model: str,
+                scheduler: QuotaScheduler, indent: str,
+                latency: LatencyHistory | None = None, items: int = 1,
+                sink: StreamIngest | None = None) -> bytes | None:
+    """クォータ待ち・リトライ込みで PCM を取得。失敗時は None。
+
+    latency を渡すと、成功したリクエストの応答時間（クォータ待ちを除く）を記録する。
+    sink を渡すとストリーミングで受け取り、届いたチャンクを順に sink.feed() に渡す
+    （試行ごとに最初に sink.reset() を呼ぶ）。この場合、成功時の戻り値は空の bytes。
+    """
+    for attempt in range(MAX_RETRIES):
+        if not scheduler.acquire():
+            log(f"{indent}1日のリクエスト上限 ({scheduler.rpd}) に達しました。続きは次回")
+            return None
+        try:
+            start = time.monotonic()
+            if sink is None:
+                pcm_data = generate_speech(client, prompt, voice, model)
+            else:
+                sink.reset()
+                for chunk in generate_speech_stream(client, prompt, voice, model):
+                    sink.feed(chunk)
+                pcm_data = b""
+            if latency is not None:
+                latency.record(latency_key(BACKEND, model), time.monotonic() - start, items)
+            return pcm_data
+        except Exception as e:
+            if is_rate_limited(e):
+                if is_daily_quota_error(e):
+                    scheduler.exhaust_today()
+                    log(f"{indent}日次クォータ超過。続きは次回")
+                    return None
+                # サーバーの指示 (RetryInfo / Retry-After) を優先し、全ワーカーを止める
+                METRICS.count("retries")
+                wait = retry_delay(e) or RATE_LIMIT_WAIT * (attempt + 1)
+                log(f"{indent}レートリミット (attempt {attempt+1}/{MAX_RETRIES})。{wait:.0f}秒待機...")
+                scheduler.pause(wait)
+            else:
+                log(f"{indent}ERROR: {e}")
+                if attempt < MAX_RETRIES - 1:
+                    log(f"{indent}リトライ ({attempt+2}/{MAX_RETRIES})...")
+                    METRICS.count("retries")
+                    with METRICS.stage("sleep"):
+                        time.sleep(5)
+    return None
+
+
+class StreamIngest:
+    """ストリーミングで受け取る1ジョブ分の PCM の受け口。
+
+    届いたチャンクを PcmStore の一時ファイルに書きつつ StreamingSplitter に渡し、
+    後ろの無音まで届いた単語から順にエンコードをエンコーダーに投げる。
+    エンコード結果はメモリに持つだけで、書き込みは分割の数を確かめてから write 段で行う
+    （数が合わなかったり途中で止まったりしても、出力先のファイルは変わらない）。
+    """
+
+    def __init__(self, pipeline: GenerationPipeline, job: dict, key: str):
+        self.pipeline = pipeline
+        self.job = job
+        self.key = key
+        self.writer = None
+        self.splitter = None
+        self.futures = []       # 単語ごとのエンコード
+        self.durations = []     # 切り出した単語ごとの長さ (ms)。期待数を超えた分も数える
+        self.trimmed = []       # 無音トリムで削った長さ (ms)
+
+    def reset(self):
+        """試行の最初に呼ばれる。前の試行の分（リトライ時）は捨てる。"""
+        if self.writer is not None:
+            self.writer.discard()
+        ctx = self.job["ctx"]
+        self.writer = self.pipeline.store.open_stream(
+            self.key, GEMINI_SAMPLE_RATE, voice=ctx["voice"], model=ctx["model"],
+            lang=ctx["lang"], app_id=ctx["app_id"], items=self.job["items"])
+        from tts_silence import StreamingSplitter
+
+        self.splitter = StreamingSplitter(SILENCE_MIN_LEN, SILENCE_THRESH, SILENCE_KEEP,
+                                          GEMINI_SAMPLE_RATE)
+        self.futures = []
+        self.durations = []
+        self.trimmed = []
+
+    def feed(self, pcm: bytes):
+        with METRICS.stage("pcm_store"):
+            self.writer.write(pcm)
+        with METRICS.stage("split_stream"):
+            segments = self.splitter.feed(pcm)
+        for _start, _end, segment_pcm in segments:
+            self._emit(segment_pcm)
+
+    def _emit(self, pcm: bytes):
+        index = len(self.durations)
+        items = self.job["items"]
+        if index >= len(items):
+            # 期待数より多い。commit 後に全体で分割し直す
+            self.durations.append(len(pcm) * 1000 // (GEMINI_SAMPLE_RATE * 2))
+            return
+        segment = pcm_to_audio_segment(pcm)
+        if self.pipeline.trim:
+            segment, saved = trim_segment(segment, *self.pipeline.trim)
+            self.trimmed.append(saved)
+        self.durations.append(len(segment))
+        self.futures.append(self.pipeline._encoder.submit(
+            export_batch, [segment], self.pipeline.profiles))
+
+    def commit(self):
+        """応答を受け取り終えたら呼ぶ。残りの単語を切り出し、PCM を PcmStore に追記する。"""
+        with METRICS.stage("split_stream"):
+            segments = self.splitter.finish()
+        for _start, _end, segment_pcm in segments:
+            self._emit(segment_pcm)
+        with METRICS.stage("pcm_store"):
+            self.writer.commit()
+        self.writer = None
+
+    def discard(self):
+        """取得に失敗したときに呼ぶ。"""
+        if self.writer is not None:
+            self.writer.discard()
+            self.writer = None
+
+
+class GenerationPipeline:
+    """取得 → 分割 → MP3エンコード → 書き込み を並行に流すパイプライン。
+
+    API 取得は in_flight 本の取得スレッドが QuotaScheduler の許可に合わせて並行に行い、
+    その間に分割（専用スレッド）・エンコード（バッチごとに ffmpeg 1プロセス）・
+    書き込み（専用スレッド）を進める。段の間は上限付きキューでつなぎ、後段が詰まれば取得側が待つ。
+
+    分割に失敗したバッチは半分ずつに分けて取得キューの先頭へ戻す。
+    分割できない部分だけが最終的に1件ずつのリクエストになるため、
+    失敗時の追加リクエスト数は O(N) ではなく概ね O(log N) で済む。
+
+    取得した PCM は全て PcmStore に保存する。offline=True のときは API を呼ばず、
+    保存済みの PCM を取得結果の代わりに使う（二分割した側も保存済みなら再現できる）。
+
+    stream=True では2件以上のバッチをストリーミングで受け取り（StreamIngest）、
+    単語ごとに分割段を通さずエンコードまで進める。切り出した数が期待数と合えば
+    エンコード結果を書き込み段に渡し、合わなければ捨てて、保存した応答全体を
+    通常どおり分割段に回す。
+
+    ジョブ（dict）:
+      items:  アイテムのリスト
+      ctx:    voice, model, lang, app_id, output_dir, profile
+      label:  ログ表示用のバッチ名（二分割で "3/9-1-2" のように伸びる）
+      indent: ログのインデント
+      skip:   書き込まないファイル名の集合（省略可。offline で他のエントリと重なる分）
+
+    trim に (onset_ms, tail_ms) を渡すと、エンコード前に各クリップ前後の無音を削り、
+    削った長さをアプリごとに trim_saved (app_id -> [ms, 件数]) に集計する。
+    profiles はエンコードプロファイル名のリスト（tts_encode.ENCODING_PROFILES）。
+
+    journal（RunJournal）を渡すと各ジョブの状態を記録し、前回 received まで進んだ
+    ジョブは API を呼ばずに保存済み PCM から続ける。実行中の Ctrl-C では新しい取得を止め、
+    取得済みのジョブを書き込み終えてから戻る（2回目の Ctrl-C で即中断）。
+    latency（LatencyHistory）を渡すと API の応答時間を記録する（--plan の見積もり用）。
+    shared（SharedClips）を渡すと、書き込んだファイルを同じ合成キーの他の出力先にも配る。
+    """
+
+    def __init__(self, client: genai.Client | None, scheduler: QuotaScheduler | None,
+                 cache: SynthesisCache, tuner: BatchSizeTuner, split_mode: str,
+                 encode_workers: int, store: PcmStore, offline: bool = False,
+                 trim: tuple[int, int] | None = None, profiles: list | None = None,
+                 in_flight: int = 1, journal: RunJournal | None = None,
+                 latency: LatencyHistory | None = None, shared: SharedClips | None = None,
+                 stream: bool = False):
+        self.client = client
+        self.scheduler = scheduler
+        self.in_flight = max(1, in_flight)
+        self.cache = cache
+        self.tuner = tuner
+        self.split_mode = split_mode
+        self.encode_workers = encode_workers
+        self.store = store
+        self.offline = offline
+        self.trim = trim
+        self.trim_saved = {}
+        self.profiles = profiles or DEFAULT_PROFILES
+        self.journal = journal
+        self.latency = latency
+        self.shared = shared
+        self.stream = stream
+        self.stopping = False
+        self.generated = 0
+        self.errors = 0
+
+        self._work = deque()              # 取得待ちジョブ
+        self._outstanding = 0             # 完了していないジョブ数（取得待ち含む）
+        self._cond = threading.Condition()
+        self._split_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._write_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._encoder = None
+
+    def _add_jobs(self, jobs: list, front: bool = False):
+        with self._cond:
+            if front:
+                self._work.extendleft(reversed(jobs))
+            else:
+                self._work.extend(jobs)
+            self._outstanding += len(jobs)
+            self._cond.notify_all()
+
+    def _finish_job(self, generated: int = 0, errors: int = 0):
+        with self._cond:
+            self.generated += generated
+            self.errors += errors
+            self._outstanding -= 1
+            self._cond.notify_all()
+
+    def _next_job(self) -> dict | None:
+        """次に取得するジョブ。全ジョブが完了したか、停止要求があれば None。"""
+        with self._cond:
+            while not self._work and self._outstanding > 0 and not self.stopping:
+                self._cond.wait()
+            if self.stopping:
+                return None
+            return self._work.popleft() if self._work else None
+
+    def request_stop(self):
+        """新しい取得を止める。取得済みのジョブは分割・書き込みまで進める。"""
+        with self._cond:
+            self.stopping = True
+            self._cond.notify_all()
+
+    def _on_sigint(self, signum, frame):
+        if self.stopping:
+            raise KeyboardInterrupt
+        log("\n中断要求: 取得済みのバッチを書き込んでから終了します（もう一度 Ctrl-C で即中断）")
+        self.request_stop()
+
+    def _record(self, job: dict, state: str, with_job: bool = False):
+        """ジャーナルにジョブの状態を記録する（offline 時は記録しない）。"""
+        if self.journal is not None and not self.offline:
+            self.journal.record(job_key(job), state, job if with_job else None)
+
+    def run(self, jobs: list) -> tuple[int, int]:
+        """ジョブを全て処理し、(生成数, エラー数) を返す。"""
+        self._add_jobs(jobs)
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGINT, self._on_sigint)
+        try:
+            self._run_stages()
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+        return self.generated, self.errors
+
+    def _run_stages(self):
+        # エンコードは ffmpeg の子プロセスが行うので、スレッドプールで十分並列に動く
+        with ThreadPoolExecutor(max_workers=self.encode_workers) as encoder:
+            self._encoder = encoder
+            splitter = threading.Thread(target=self._split_stage, daemon=True)
+            writer = threading.Thread(target=self._write_stage, daemon=True)
+            splitter.start()
+            writer.start()
+            fetchers = [threading.Thread(target=self._fetch_stage, daemon=True)
+                        for _ in range(self.in_flight)]
+            try:
+                for fetcher in fetchers:
+                    fetcher.start()
+                for fetcher in fetchers:
+                    # join(timeout) にしてメインスレッドで SIGINT を受け取れるようにする
+                    while fetcher.is_alive():
+                        fetcher.join(0.5)
+            finally:
+                self._split_queue.put(None)
+                splitter.join()
+                writer.join()
+
+    def _fetch_stage(self):
+        while (job := self._next_job()) is not None:
+            items = job["items"]
+            if "header" in job:
+                log(job["header"])
+            if self._use_stream(job):
+                audio, source = self._stream_audio(job)
+            else:
+                audio, source = self._load_audio(job)
+            if audio is None and source == "queued":
+                continue
+            if audio is None:
+                log(f"{job['indent']}FAILED: {len(items)}件をスキップ ({job['label']})")
+                self._record(job, "failed")
+                self._finish_job(errors=len(items))
+                continue
+            log(f"{job['indent']}{source}: {len(audio) / 1000:.1f}秒 ({job['label']})")
+            self._split_queue.put((job, audio))
+
+    def _load_audio(self, job: dict) -> tuple[AudioSegment | None, str]:
+        """ジョブの音声を API（offline なら PcmStore）から取得し、(音声, 取得元) を返す。"""
+        ctx = job["ctx"]
+        prompt = build_prompt(job["items"], ctx["lang"])
+        key = pcm_key(prompt, ctx["voice"], ctx["model"])
+        if self.offline or (self.journal is not None and self.journal.was_received(key)):
+            stored = self.store.get(key)
+            if stored is not None:
+                pcm_data, sample_rate = stored
+                source = "保存済みPCM" if self.offline else "再開（保存済みPCM）"
+                return pcm_to_audio_segment(pcm_data, sample_rate), source
+            if self.offline:
+                log(f"{job['indent']}オフライン: 保存済みPCMがありません ({job['label']})")
+                return None, ""
+
+        self._record(job, "requested", with_job=True)
+        pcm_data = fetch_audio(self.client, prompt, ctx["voice"], ctx["model"],
+                               self.scheduler, job["indent"], self.latency, len(job["items"]))
+        if pcm_data is None:
+            return None, ""
+        with METRICS.stage("pcm_store"):
+            self.store.append(key, pcm_data, GEMINI_SAMPLE_RATE, voice=ctx["voice"],
+                              model=ctx["model"], lang=ctx["lang"], app_id=ctx["app_id"],
+                              items=job["items"])
+        self._record(job, "received")
+        return pcm_to_audio_segment(pcm_data), "音声取得"
+
+    def _use_stream(self, job: dict) -> bool:
+        """ストリーミングで取得するか（1件だけのジョブと、保存済み PCM から続けるジョブは使わない）。"""
+        if not self.stream or self.offline or len(job["items"]) == 1:
+            return False
+        return self.journal is None or not self.journal.was_received(job_key(job))
+
+    def _stream_audio(self, job: dict) -> tuple[AudioSegment | None, str]:
+        """ストリーミングで取得し、単語ごとにエンコードまで進める。
+
+        期待数どおりに切り出せればエンコード結果を書き込みキューに入れて (None, "queued") を返す。
+        数が合わなければエンコード結果を捨て、保存した応答全体を (音声, 取得元) で返す
+        （分割段で --split-mode の分割・二分割を行う）。失敗時は (None, "")。
+        """
+        ctx = job["ctx"]
+        items = job["items"]
+        prompt = build_prompt(items, ctx["lang"])
+        key = pcm_key(prompt, ctx["voice"], ctx["model"])
+        sink = StreamIngest(self, job, key)
+        self._record(job, "requested", with_job=True)
+        pcm_data = fetch_audio(self.client, prompt, ctx["voice"], ctx["model"],
+                               self.scheduler, job["indent"], self.latency, len(items), sink=sink)
+        if pcm_data is None:
+            sink.discard()
+            return None, ""
+        sink.commit()
+        self._record(job, "received")
+        total_ms = sum(sink.durations)
+        if len(sink.durations) != len(items):
+            log(f"{job['indent']}ストリーミング分割: 期待{len(items)}個, 実際{len(sink.durations)}個 "
+                f"→ 応答全体で分割し直す ({job['label']})")
+            pcm, sample_rate = self.store.get(key)
+            return pcm_to_audio_segment(pcm, sample_rate), "音声取得"
+
+        self.tuner.record(ctx["profile"], len(items), True)
+        self.tuner.save()
+        self._record(job, "split")
+        self._add_trim_saved(job, sink.trimmed)
+        log(f"{job['indent']}ストリーミング取得・分割 OK ({len(items)}セグメント, "
+            f"{total_ms / 1000:.1f}秒, {job['label']})")
+        self._write_queue.put((job, sink.durations, sink.futures))
+        return None, "queued"
+
+    def _add_trim_saved(self, job: dict, saved_ms: list):
+        if not saved_ms:
+            return
+        with self._cond:
+            saved = self.trim_saved.setdefault(job["ctx"]["app_id"], [0, 0])
+            saved[0] += sum(saved_ms)
+            saved[1] += len(saved_ms)
+
+    def _split_stage(self):
+        while (entry := self._split_queue.get()) is not None:
+            job, audio = entry
+            try:
+                self._split_job(job, audio)
+            except Exception as e:
+                log(f"{job['indent']}ERROR: {e} ({job['label']})")
+                self._record(job, "failed")
+                self._finish_job(errors=len(job["items"]))
+        self._write_queue.put(None)
+
+    def _split_job(self, job: dict, audio: AudioSegment):
+        items = job["items"]
+        if len(items) == 1:
+            segments = [audio]
+        else:
+            from tts_silence import SilenceEnvelope
+
+            with METRICS.stage("split_audio_segments"):
+                envelope = SilenceEnvelope(audio.raw_data, audio.frame_rate)
+                segments = split_audio_segments(audio, len(items), envelope, self.split_mode)
+            if not self.offline:
+                self.tuner.record(job["ctx"]["profile"], len(items), segments is not None)
+                self.tuner.save()
+            if segments is None:
+                actual = len(envelope.split_ranges(SILENCE_MIN_LEN, SILENCE_THRESH,
+                                                   SILENCE_KEEP))
+                METRICS.count("fallbacks")
+                mid = (len(items) + 1) // 2
+                halves = [items[:mid], items[mid:]]
+                log(f"{job['indent']}分割失敗（期待{len(items)}個, 実際{actual}個） "
+                    f"→ {len(halves[0])}件 + {len(halves[1])}件に分けて再生成 ({job['label']})")
+                half_jobs = [
+                    {"items": half, "ctx": job["ctx"], "label": f"{job['label']}-{n}",
+                     "indent": job["indent"] + "  "}
+                    for n, half in enumerate(halves, 1)
+                ]
+                for half_job in half_jobs:
+                    self._record(half_job, "queued", with_job=True)
+                self._record(job, "bisected")
+                self._add_jobs(half_jobs, front=True)
+                self._finish_job()
+                return
+            log(f"{job['indent']}分割 OK ({len(segments)}セグメント, {job['label']})")
+        self._record(job, "split")
+
+        if self.trim:
+            trimmed = [trim_segment(seg, *self.trim) for seg in segments]
+            segments = [seg for seg, _saved in trimmed]
+            self._add_trim_saved(job, [ms for _seg, ms in trimmed])
+
+        future = self._encoder.submit(export_batch, segments, self.profiles)
+        self._write_queue.put((job, [len(seg) for seg in segments], future))
+
+    def _write_stage(self):
+        while (entry := self._write_queue.get()) is not None:
+            job, durations, future = entry
+            ctx = job["ctx"]
+            try:
+                # ストリーミングのジョブは単語ごとの future のリスト
+                encoded = ([f.result()[0] for f in future] if isinstance(future, list)
+                           else future.result())
+            except Exception as e:
+                log(f"{job['indent']}ERROR: エンコード失敗: {e} ({job['label']})")
+                self._record(job, "failed")
+                self._finish_job(errors=len(job["items"]))
+                continue
+            generated = errors = 0
+            for duration, item, outputs in zip(durations, job["items"], encoded):
+                if item["filename"] in job.get("skip", ()):
+                    continue
+                filepath = os.path.join(ctx["output_dir"], item["filename"])
+                try:
+                    for profile, data in outputs.items():
+                        write_file_atomic(profile_path(filepath, profile), data)
+                except Exception as e:
+                    log(f"{job['indent']}  {item['filename']} -> ERROR: {e}")
+                    errors += 1
+                    continue
+                self.cache.record(filepath, item_cache_key(item, ctx["voice"], ctx["model"]),
+                                  backend=BACKEND, speech=item["speech"],
+                                  profiles=list(outputs))
+                if self.shared is not None:
+                    self.shared.written(filepath)
+                kb = sum(len(data) for data in outputs.values()) / 1024
+                dur = duration / 1000
+                log(f"{job['indent']}  {item['filename']} ({dur:.1f}s, {kb:.1f}KB)")
+                generated += 1
+            # バッチごとに保存し、途中で止まっても生成済み分の記録を残す
+            self.cache.save()
+            self._record(job, "failed" if errors else "written")
+            self._finish_job(generated, errors)
+
+
+def job_key(job: dict) -> str:
+    """ジョブのプロンプトから決まる PcmStore / ジャーナルのキー。"""
+    ctx = job["ctx"]
+    return pcm_key(build_prompt(job["items"], ctx["lang"]), ctx["voice"], ctx["model"])
+
+
+def item_cache_key(item: dict, voice: str, model: str) -> str:
+    """アイテムの合成キャッシュキー。"""
+    return gemini_cache_key(item, voice, model)
+
+
+def build_offline_jobs(store: PcmStore, app_ids: list) -> list:
+    """保存済み PCM から再分割・再エンコードするジョブを組み立てる。
+
+    新しいエントリから順に見て、各ファイルは最後に取得した PCM から作る。
+    二分割で再取得した場合は子エントリが新しいので、前回成功した分け方が再現される。
+    """
+    claimed = set()  # (app_id, filename)
+    jobs = []
+    for entry in store.latest_entries():
+        app_id = entry["app_id"]
+        if app_id not in app_ids:
+            continue
+        names = {(app_id, item["filename"]) for item in entry["items"]}
+        if names <= claimed:
+            continue
+        skip = {filename for _app_id, filename in names & claimed}
+        claimed |= names
+        jobs.append({
+            "items": entry["items"],
+            "ctx": {
+                "voice": entry["voice"],
+                "model": entry["model"],
+                "lang": entry["lang"],
+                "app_id": app_id,
+                "output_dir": os.path.join(AUDIO_BASE_DIR, APPS[app_id]["output_dir"]),
+                "profile": profile_key(entry["lang"], app_id, entry["voice"], entry["model"]),
+            },
+            "indent": "    ",
+            "skip": skip,
+        })
+    jobs.reverse()  # 元の生成順に戻す
+    for idx, job in enumerate(jobs):
+        filenames = [it["filename"] for it in job["items"]]
+        job["label"] = f"{idx+1}/{len(jobs)}"
+        job["header"] = (f"\n  バッチ {idx+1}/{len(jobs)} "
+                         f"[{APPS[job['ctx']['app_id']]['label']}] {len(filenames)}件: "
+                         f"{filenames[0]}...{filenames[-1]}")
+    return jobs
+
+
+def resume_jobs(journal: RunJournal, pending: list, app_ids: list, args, model: str) -> list:
+    """ジャーナルの未完了ジョブのうち、今回も同じ内容で生成すべきものをジョブとして返す。
+
+    アイテム・ボイス・モデルが変わったもの、もう生成済みのアイテムを含むものは再開しない
+    （それらのアイテムは通常どおり新しいバッチに入る）。
+    """
+    pending_items = {(app_id, item["filename"]): item for app_id, _dir, item in pending}
+    claimed = set()
+    jobs = []
+    for _key, job, state in journal.unfinished():
+        ctx = job["ctx"]
+        voice = args.voice_ja if ctx["lang"] == "ja" else args.voice_en
+        names = {(ctx["app_id"], it["filename"]) for it in job["items"]}
+        if (ctx["app_id"] not in app_ids or ctx["voice"] != voice or ctx["model"] != model
+                or names & claimed
+                or any(pending_items.get((ctx["app_id"], it["filename"])) != it
+                       for it in job["items"])):
+            continue
+        claimed |= names
+        ctx = dict(ctx, output_dir=os.path.join(AUDIO_BASE_DIR, APPS[ctx["app_id"]]["output_dir"]))
+        filenames = [it["filename"] for it in job["items"]]
+        label = f"再開 {job['label']}"
+        jobs.append({
+            "items": job["items"],
+            "ctx": ctx,
+            "label": label,
+            "indent": "    ",
+            "header": (f"\n  バッチ {label} ({state}) [{APPS[ctx['app_id']]['label']}] "
+                       f"{len(filenames)}件: {filenames[0]}...{filenames[-1]}"),
+        })
+    return jobs
+
+
+def collect_pending(args, app_ids: list, model: str, cache: SynthesisCache,
+                    create_dirs: bool = True) -> tuple[list, list, int]:
+    """全アイテムを集め、(全アイテム, 未生成・入力変更ありのアイテム, スキップ数) を返す。"""
     all_items = []
     for app_id in app_ids:
         app = APPS[app_id]
         output_dir = os.path.join(AUDIO_BASE_DIR, app["output_dir"])
-        os.makedirs(output_dir, exist_ok=True)
+        if create_dirs:
+            os.makedirs(output_dir, exist_ok=True)
         for item in app["get_items"]():
             all_items.append((app_id, output_dir, item))
 
-    # 未生成のみ抽出
     pending = []
     skipped = 0
     for app_id, output_dir, item in all_items:
         filepath = os.path.join(output_dir, item["filename"])
-        if os.path.exists(filepath) and not args.force:
+        voice = args.voice_ja if item["lang"] == "ja" else args.voice_en
+        if not args.force and cache.is_fresh(filepath, item_cache_key(item, voice, model)):
             skipped += 1
         else:
             pending.append((app_id, output_dir, item))
+    return all_items, pending, skipped
+
+
+def share_pending(args, pending: list, model: str, cache: SynthesisCache,
+                  dry_run: bool = False) -> tuple[list, SharedClips]:
+    """同じ合成キーの出力先を1件にまとめ、以前の実行で同じ音声があれば配る。"""
+    shared = SharedClips(cache, args.profiles)
+
+    def target(entry):
+        _app_id, output_dir, item = entry
+        voice = args.voice_ja if item["lang"] == "ja" else args.voice_en
+        return (os.path.join(output_dir, item["filename"]),
+                [item_cache_key(item, voice, model)])
 
-    # バッチに分割（同一言語でグループ化）
-    # 言語が混在するバッチは避ける
-    batches = []  # [(app_id, output_dir, [items...])]
+    return shared.dedupe(pending, target, reuse=not args.force, dry_run=dry_run), shared
+
+
+def without_resumed(pending: list, resumed_jobs: list) -> list:
+    """再開するジョブに含まれるアイテムを pending から除く。"""
+    resumed_names = {(job["ctx"]["app_id"], it["filename"])
+                     for job in resumed_jobs for it in job["items"]}
+    return [(app_id, output_dir, item) for app_id, output_dir, item in pending
+            if (app_id, item["filename"]) not in resumed_names]
+
+
+def make_batches(pending: list, args, tuner: BatchSizeTuner, model: str) -> tuple[list, dict]:
+    """同一アプリ・同一言語の連続するアイテムをバッチにまとめる。
+
+    (バッチ [(app_id, output_dir, lang, [items...])], profile -> バッチサイズ) を返す。
+    """
+    batch_sizes = {}  # profile -> batch size
+    batches = []
     i = 0
     while i < len(pending):
         batch_items = []
         app_id, output_dir, first_item = pending[i]
         lang = first_item["lang"]
+        voice = args.voice_ja if lang == "ja" else args.voice_en
+        profile = profile_key(lang, app_id, voice, model)
+        if profile not in batch_sizes:
+            batch_sizes[profile] = args.batch_size or tuner.choose(profile)
         batch_items.append(first_item)
         j = i + 1
-        while j < len(pending) and len(batch_items) < args.batch_size:
-            _, _, next_item = pending[j]
-            if next_item["lang"] == lang:
+        while j < len(pending) and len(batch_items) < batch_sizes[profile]:
+            next_app_id, _, next_item = pending[j]
+            if next_app_id == app_id and next_item["lang"] == lang:
                 batch_items.append(next_item)
                 j += 1
             else:
                 break
         batches.append((app_id, output_dir, lang, batch_items))
         i = j
+    return batches, batch_sizes
+
+
+def plan_estimate(batches: list, resumed_jobs: list, journal: RunJournal, args,
+                  tuner: BatchSizeTuner, scheduler: QuotaScheduler,
+                  latency: LatencyHistory, model: str) -> dict:
+    """残り全件を生成するまでのリクエスト数・文字数・日数・所要時間を見積もる。
+
+    リクエスト数は分割失敗時の二分割による再生成の期待値込み（BatchSizeTuner の履歴から）。
+    応答時間は過去の実測の「1件あたり秒数」の中央値（履歴がなければ既定値）。
+    戻り値は tts_plan.print_plan の1行分。
+    """
+    key = latency_key(BACKEND, model)
+    per_item = latency.seconds_per_item(key) or DEFAULT_LATENCY_PER_ITEM
+
+    latencies = []   # リクエストごとの見積もり応答時間（出す順）
+    chars = 0
+    for job in resumed_jobs:
+        if not journal.was_received(job_key(job)):
+            latencies.append(len(job["items"]) * per_item)
+            chars += len(build_prompt(job["items"], job["ctx"]["lang"]))
+    extra_requests = extra_items = 0.0
+    for app_id, _output_dir, lang, items in batches:
+        voice = args.voice_ja if lang == "ja" else args.voice_en
+        prompt_chars = len(build_prompt(items, lang))
+        retries = tuner.expected_requests(profile_key(lang, app_id, voice, model), len(items)) - 1
+        latencies.append(len(items) * per_item)
+        chars += prompt_chars
+        # 二分割後の再生成は、平均して元の半分の件数・文字数のリクエストとみなす
+        extra_requests += retries
+        extra_items += retries * len(items) / 2
+        chars += round(retries * prompt_chars / 2)
+    if round(extra_requests):
+        latencies += [extra_items / extra_requests * per_item] * round(extra_requests)
+
+    remaining_today = scheduler.remaining_today()
+    per_run = min(args.max_requests, args.rpd)
+    today = min(len(latencies), args.max_requests, remaining_today)
+    today_seconds = simulate_wall_seconds(latencies[:today], args.in_flight, args.rpm,
+                                          scheduler.available_now(), args.delay)
+    total_seconds = today_seconds
+    for start in range(today, len(latencies), max(1, per_run)):
+        total_seconds += simulate_wall_seconds(latencies[start:start + per_run],
+                                               args.in_flight, args.rpm, None, args.delay)
+
+    note = ""
+    if today < len(latencies):
+        note = (f"今日の実行で {today}回（残りクォータ {remaining_today}・"
+                f"--max-requests {args.max_requests}）、残り {len(latencies) - today}回は次回以降")
+    return {
+        "backend": f"{BACKEND} ({model})",
+        "items": sum(len(job["items"]) for job in resumed_jobs)
+                 + sum(len(items) for *_rest, items in batches),
+        "chars": chars,
+        "requests": len(latencies),
+        "days": rpd_days(len(latencies), remaining_today, args.rpd),
+        "today_seconds": today_seconds,
+        "total_seconds": total_seconds,
+        "latency": per_item,
+        "samples": latency.count(key),
+        "note": note,
+    }
+
+
+def run_plan(args, app_ids: list):
+    """API を呼ばずに生成計画を表示する（API キー・google-genai・pydub は不要）。"""
+    model = args.model
+    # マニフェスト未登録ファイルの登録などは書き出さない（計画モードは何も変更しない）
+    cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+    all_items, pending, skipped = collect_pending(args, app_ids, model, cache,
+                                                  create_dirs=False)
+    pending, shared = share_pending(args, pending, model, cache, dry_run=True)
+    journal = RunJournal()
+    resumed_jobs = resume_jobs(journal, pending, app_ids, args, model)
+    pending = without_resumed(pending, resumed_jobs)
+    tuner = BatchSizeTuner(initial_size=DEFAULT_BATCH_SIZE)
+    batches, _batch_sizes = make_batches(pending, args, tuner, model)
+    scheduler = QuotaScheduler(model, args.rpm, args.rpd, min_interval=args.delay)
+
+    print(f"Gemini TTS 生成計画")
+    print(f"{'='*60}")
+    print(f"  対象アプリ   : {', '.join(app_ids)}")
+    print(f"  全ファイル   : {len(all_items)}件 (生成済み {skipped}件)")
+    if shared.reused or shared.merged:
+        print(f"  共有         : 既存から配布 {shared.reused}件, "
+              f"同じ音声をまとめる {shared.merged}件")
+    print(f"  クォータ     : {args.rpm} RPM, {args.rpd} RPD "
+          f"(今日の使用 {scheduler.used_today()}, 残り {scheduler.remaining_today()})")
+    print(f"  同時リクエスト: {args.in_flight}")
+    print_plan([plan_estimate(batches, resumed_jobs, journal, args, tuner, scheduler,
+                              LatencyHistory(), model)])
+
+
+def print_trim_report(trim_saved: dict):
+    """アプリごとの無音トリムで短くなった合計時間を表示する。"""
+    if not trim_saved:
+        return
+    print(f"  無音トリム:")
+    for app_id, (ms, count) in trim_saved.items():
+        avg = ms / count if count else 0
+        print(f"    {app_id}: 合計 -{ms / 1000:.1f}秒 ({count}件, 平均 -{avg:.0f}ms)")
+
+
+def trim_option(args) -> tuple[int, int] | None:
+    """--trim 指定時の (onset_ms, tail_ms)。"""
+    return (args.trim_onset_ms, args.trim_tail_ms) if args.trim else None
+
+
+def run_offline(args, app_ids: list):
+    """保存済み PCM だけを使って分割・エンコードをやり直す（API リクエストなし）。"""
+    store = PcmStore()
+    jobs = build_offline_jobs(store, app_ids)
+    items = sum(len(job["items"]) - len(job["skip"]) for job in jobs)
+
+    print(f"Gemini TTS 再分割・再エンコード（オフライン）")
+    print(f"{'='*60}")
+    print(f"  保存済みPCM  : {len(store.latest_entries())}エントリ")
+    print(f"  対象アプリ   : {', '.join(app_ids)}")
+    print(f"  分割方式     : {args.split_mode}")
+    print(f"  今回生成     : {items}件 ({len(jobs)}バッチ)")
+    print(f"{'='*60}")
+    if not jobs:
+        print("\n保存済みPCMがありません。先に通常モードで生成してください。")
+        return
+
+    start_time = time.time()
+    METRICS.start("gemini-offline", args.metrics_jsonl)
+    for app_id in app_ids:
+        os.makedirs(os.path.join(AUDIO_BASE_DIR, APPS[app_id]["output_dir"]), exist_ok=True)
+    cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+    tuner = BatchSizeTuner(initial_size=DEFAULT_BATCH_SIZE)
+    sizes_before = app_audio_sizes(APPS, app_ids, AUDIO_BASE_DIR)
+    pipeline = GenerationPipeline(None, None, cache, tuner, args.split_mode,
+                                  args.encode_workers, store, offline=True,
+                                  trim=trim_option(args), profiles=args.profiles)
+    try:
+        generated, errors = pipeline.run(jobs)
+    finally:
+        cache.save()
+        store.close()
+
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"  完了! (実行時間: {format_duration(elapsed)})")
+    print(f"  生成: {generated}  エラー: {errors}")
+    print_trim_report(pipeline.trim_saved)
+    print_size_report(sizes_before, app_audio_sizes(APPS, app_ids, AUDIO_BASE_DIR))
+    METRICS.print_summary()
+    print(f"{'='*60}")
+    METRICS.finish(args.metrics_prom)
+
+    if args.sprite:
+        write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+    update_precache_manifest(AUDIO_BASE_DIR)
+
+
+# --- メイン処理 ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gemini TTS 音声生成（バッチ方式・無料枠対応）"
+    )
+    parser.add_argument("--app", choices=list(APPS.keys()),
+                        help="特定のアプリのみ生成")
+    parser.add_argument("--force", action="store_true",
+                        help="既存ファイルを上書き")
+    parser.add_argument("--voice-ja", default=DEFAULT_VOICE_JA,
+                        help=f"日本語ボイス (default: {DEFAULT_VOICE_JA})")
+    parser.add_argument("--voice-en", default=DEFAULT_VOICE_EN,
+                        help=f"英語ボイス (default: {DEFAULT_VOICE_EN})")
+    parser.add_argument("--model", default=MODEL,
+                        help=f"使用モデル (default: {MODEL})")
+    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY,
+                        help=f"リクエスト開始の最小間隔・秒 (default: {DEFAULT_DELAY})")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM,
+                        help=f"1分あたりのリクエスト上限 (default: {DEFAULT_RPM})")
+    parser.add_argument("--rpd", type=int, default=DEFAULT_RPD,
+                        help=f"1日あたりのリクエスト上限 (default: {DEFAULT_RPD})")
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT,
+                        help=f"同時に応答待ちにするリクエスト数 (default: {DEFAULT_IN_FLIGHT})")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="1回のAPIで生成する単語数。省略時は分割成否の履歴から自動選択"
+                             f"（初回 {DEFAULT_BATCH_SIZE}）")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS,
+                        help=f"最大APIリクエスト数 (default: {DEFAULT_MAX_REQUESTS})")
+    parser.add_argument("--encode-workers", type=int, default=DEFAULT_ENCODE_WORKERS,
+                        help=f"同時に走らせる ffmpeg の数 (default: {DEFAULT_ENCODE_WORKERS})")
+    parser.add_argument("--split-mode", choices=SPLIT_MODES, default="auto",
+                        help="無音分割の方式 (default: auto)")
+    parser.add_argument("--trim", action="store_true",
+                        help="各ファイルの前後の無音を削る")
+    parser.add_argument("--trim-onset-ms", type=int, default=DEFAULT_TRIM_ONSET_MS,
+                        help=f"--trim 時に音の前に残す無音・ms (default: {DEFAULT_TRIM_ONSET_MS})")
+    parser.add_argument("--trim-tail-ms", type=int, default=DEFAULT_TRIM_TAIL_MS,
+                        help=f"--trim 時に音の後に残す無音・ms (default: {DEFAULT_TRIM_TAIL_MS})")
+    parser.add_argument("--profiles", default=",".join(DEFAULT_PROFILES),
+                        help="エンコードプロファイル（カンマ区切り。MP3 を1つ含める）"
+                             f" (default: {','.join(DEFAULT_PROFILES)})")
+    parser.add_argument("--stream", action="store_true",
+                        help="ストリーミングで受け取り、単語ごとに届いた順でエンコード")
+    parser.add_argument("--offline", action="store_true",
+                        help="保存済みPCMから分割・エンコードだけやり直す（APIを呼ばない）")
+    parser.add_argument("--sprite", action="store_true",
+                        help="アプリごとの音声スプライト (audio/sprites/<app>.mp3 + .json) も出力")
+    parser.add_argument("--plan", action="store_true",
+                        help="生成計画（件数・文字数・リクエスト数・日数・所要時間）だけを表示")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    try:
+        args.profiles = parse_profiles(args.profiles)
+    except ValueError as e:
+        parser.error(str(e))
+
+    app_ids = [args.app] if args.app else list(APPS.keys())
+    if args.plan:
+        run_plan(args, app_ids)
+        return
+    if args.offline:
+        run_offline(args, app_ids)
+        return
 
-    # 上限適用
-    batches_to_run = batches[:args.max_requests]
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("Error: GEMINI_API_KEY 環境変数を設定してください")
+        print("  取得: https://aistudio.google.com/apikey")
+        print("  設定: $env:GEMINI_API_KEY='your-key'  (PowerShell)")
+        sys.exit(1)
+
+    model = args.model
+    client = gemini_client(api_key)
+
+    # 未生成・入力変更ありのみ抽出
+    cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+    all_items, pending, skipped = collect_pending(args, app_ids, model, cache)
+    pending, shared = share_pending(args, pending, model, cache)
+    cache.save()
+
+    # 前回中断したジョブを同じ構成で先に再開する（受信済みなら API を呼ばない）
+    journal = RunJournal()
+    resumed_jobs = resume_jobs(journal, pending, app_ids, args, model)
+    pending = without_resumed(pending, resumed_jobs)
+    resumed_items = sum(len(job["items"]) for job in resumed_jobs)
+    resumed_requests = sum(1 for job in resumed_jobs if not journal.was_received(job_key(job)))
+
+    # バッチに分割（同一アプリ・同一言語でグループ化）
+    # バッチサイズは (言語, アプリ, ボイス, モデル) ごとに履歴から選ぶ
+    tuner = BatchSizeTuner(initial_size=DEFAULT_BATCH_SIZE)
+    batches, batch_sizes = make_batches(pending, args, tuner, model)
+
+    # 上限適用（--max-requests と、今日の残りクォータの小さい方）
+    scheduler = QuotaScheduler(model, args.rpm, args.rpd, min_interval=args.delay)
+    latency = LatencyHistory()
+    plan = plan_estimate(batches, resumed_jobs, journal, args, tuner, scheduler, latency, model)
+    remaining_today = scheduler.remaining_today()
+    limit = max(0, min(args.max_requests, remaining_today) - resumed_requests)
+    batches_to_run = batches[:limit]
     items_in_run = sum(len(b[3]) for b in batches_to_run)
-    items_deferred = sum(len(b[3]) for b in batches[args.max_requests:])
+    items_deferred = sum(len(b[3]) for b in batches[limit:])
 
     print(f"Gemini TTS 音声生成（バッチモード）")
     print(f"{'='*60}")
@@ -466,132 +1091,113 @@ def main():
     print(f"  日本語ボイス : {args.voice_ja}")
     print(f"  英語ボイス   : {args.voice_en}")
     print(f"  対象アプリ   : {', '.join(app_ids)}")
-    print(f"  バッチサイズ : {args.batch_size}単語/リクエスト")
-    print(f"  リクエスト間隔: {args.delay}秒")
+    if args.batch_size:
+        print(f"  バッチサイズ : {args.batch_size}単語/リクエスト（固定）")
+    else:
+        for profile, size in batch_sizes.items():
+            lang, app_id = profile.split("|")[:2]
+            print(f"  バッチサイズ : {size}単語/リクエスト（自動: {app_id}, {lang}）")
+    print(f"  分割方式     : {args.split_mode}")
+    print(f"  クォータ     : {args.rpm} RPM, {args.rpd} RPD "
+          f"(今日の使用 {scheduler.used_today()}, 残り {remaining_today})")
+    print(f"  同時リクエスト: {args.in_flight}")
+    if args.stream:
+        print(f"  ストリーミング: 有効（単語ごとにエンコード）")
     print(f"{'='*60}")
     print(f"  全ファイル   : {len(all_items)}件")
     print(f"  既存スキップ : {skipped}件")
+    if cache.adopted:
+        print(f"  (うちマニフェスト未登録の既存ファイル {cache.adopted}件を登録)")
+    if shared.reused:
+        print(f"  既存から配布 : {shared.reused}件（同じ音声のファイルをリンク/コピー）")
+    if shared.merged:
+        print(f"  まとめて生成 : {shared.merged}件（同じ音声の出力先を1回の合成で作る）")
+    if resumed_jobs:
+        print(f"  中断から再開 : {resumed_items}件 ({len(resumed_jobs)}バッチ, "
+              f"うち受信済み {len(resumed_jobs) - resumed_requests}バッチ)")
     print(f"  今回生成     : {items_in_run}件 ({len(batches_to_run)}リクエスト)")
     if items_deferred > 0:
-        print(f"  次回以降     : {items_deferred}件")
-    est = len(batches_to_run) * args.delay
-    print(f"  推定所要時間 : 約{format_eta(est)}")
+        reason = "（今日の残りクォータ超過分）" if remaining_today < args.max_requests else ""
+        print(f"  次回以降     : {items_deferred}件{reason}")
+    print(f"  推定所要時間 : 約{format_duration(plan['today_seconds'])}"
+          f"（応答 {plan['latency']:.1f}秒/件, 二分割の再生成込み）")
     print(f"{'='*60}")
 
-    if not batches_to_run:
+    if batches and not batches_to_run and not resumed_jobs:
+        print("\n今日のリクエスト上限を使い切っています。日付が変わってから再実行してください。")
+        return
+    if not batches_to_run and not resumed_jobs:
         print("\n生成対象がありません。全て生成済みです。")
+        if args.sprite:
+            write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+        update_precache_manifest(AUDIO_BASE_DIR)
         return
 
-    generated = 0
-    errors = 0
     start_time = time.time()
+    METRICS.start("gemini", args.metrics_jsonl)
 
+    jobs = list(resumed_jobs)
     for batch_idx, (app_id, output_dir, lang, batch_items) in enumerate(batches_to_run):
         filenames = [it["filename"] for it in batch_items]
         voice = args.voice_ja if lang == "ja" else args.voice_en
+        jobs.append({
+            "items": batch_items,
+            "ctx": {
+                "voice": voice,
+                "model": model,
+                "lang": lang,
+                "app_id": app_id,
+                "output_dir": output_dir,
+                "profile": profile_key(lang, app_id, voice, model),
+            },
+            "label": f"{batch_idx+1}/{len(batches_to_run)}",
+            "indent": "    ",
+            "header": (f"\n  バッチ {batch_idx+1}/{len(batches_to_run)} "
+                       f"[{APPS[app_id]['label']}] {len(batch_items)}件: "
+                       f"{filenames[0]}...{filenames[-1]}"),
+        })
 
-        # プロンプト構築
-        if lang == "ja":
-            prompt = build_batch_prompt_ja(batch_items)
-        else:
-            prompt = build_batch_prompt_en(batch_items)
-
-        print(f"\n  バッチ {batch_idx+1}/{len(batches_to_run)} "
-              f"[{APPS[app_id]['label']}] {len(batch_items)}件: "
-              f"{filenames[0]}...{filenames[-1]}")
-
-        success = False
-        for attempt in range(MAX_RETRIES):
-            try:
-                pcm_data = generate_speech(client, prompt, voice, model)
-                audio = pcm_to_audio_segment(pcm_data)
-                total_dur = len(audio) / 1000
-                print(f"    音声取得: {total_dur:.1f}秒 → 分割中...", end="", flush=True)
-
-                segments = split_audio_segments(audio, len(batch_items))
-
-                if segments is None:
-                    # 分割失敗: バッチサイズ=1にフォールバック
-                    actual = len(split_on_silence(audio,
-                                                  min_silence_len=SILENCE_MIN_LEN,
-                                                  silence_thresh=SILENCE_THRESH,
-                                                  keep_silence=SILENCE_KEEP))
-                    print(f" 分割失敗（期待{len(batch_items)}個, 実際{actual}個）")
-                    print(f"    → 個別生成にフォールバック")
-
-                    for item in batch_items:
-                        filepath = os.path.join(output_dir, item["filename"])
-                        if lang == "ja":
-                            ctx = f"（{item['context']}）" if item["context"] else ""
-                            single_prompt = (
-                                f"子供に語りかけるように、はっきりと日本語で読んでください。"
-                                f"余計な言葉は加えないでください{ctx}：「{item['speech']}」"
-                            )
-                        else:
-                            single_prompt = (
-                                f'Speak clearly and cheerfully for a child. '
-                                f'Say only this word: "{item["speech"]}"'
-                            )
-                        try:
-                            pcm = generate_speech(client, single_prompt, voice, model)
-                            seg = pcm_to_audio_segment(pcm)
-                            mp3 = export_mp3(seg)
-                            with open(filepath, "wb") as f:
-                                f.write(mp3)
-                            kb = len(mp3) / 1024
-                            print(f"      {item['filename']} -> OK ({kb:.1f}KB)")
-                            generated += 1
-                            time.sleep(args.delay)
-                        except Exception as e2:
-                            print(f"      {item['filename']} -> ERROR: {e2}")
-                            errors += 1
-                    success = True
-                    break
-
-                # 分割成功
-                print(f" OK ({len(segments)}セグメント)")
-                for seg, item in zip(segments, batch_items):
-                    filepath = os.path.join(output_dir, item["filename"])
-                    mp3_data = export_mp3(seg)
-                    with open(filepath, "wb") as f:
-                        f.write(mp3_data)
-                    kb = len(mp3_data) / 1024
-                    dur = len(seg) / 1000
-                    print(f"      {item['filename']} ({dur:.1f}s, {kb:.1f}KB)")
-                    generated += 1
-                success = True
-                break
-
-            except Exception as e:
-                err_str = str(e)
-                if "429" in err_str or "rate" in err_str.lower() or "quota" in err_str.lower():
-                    wait = RATE_LIMIT_WAIT * (attempt + 1)
-                    print(f"\n    レートリミット (attempt {attempt+1}/{MAX_RETRIES})。{wait}秒待機...")
-                    time.sleep(wait)
-                else:
-                    print(f"\n    ERROR: {e}")
-                    if attempt < MAX_RETRIES - 1:
-                        print(f"    リトライ ({attempt+2}/{MAX_RETRIES})...")
-                        time.sleep(5)
-
-        if not success:
-            errors += len(batch_items)
-            print(f"    FAILED: バッチ全体をスキップ")
-
-        if batch_idx < len(batches_to_run) - 1:
-            time.sleep(args.delay)
+    store = PcmStore()
+    sizes_before = app_audio_sizes(APPS, app_ids, AUDIO_BASE_DIR)
+    pipeline = GenerationPipeline(client, scheduler, cache, tuner,
+                                  args.split_mode, args.encode_workers, store,
+                                  trim=trim_option(args), profiles=args.profiles,
+                                  in_flight=args.in_flight, journal=journal, latency=latency,
+                                  shared=shared, stream=args.stream)
+    try:
+        generated, errors = pipeline.run(jobs)
+    finally:
+        cache.save()
+        tuner.save()
+        latency.save()
+        store.close()
+        journal.close()
 
     elapsed = time.time() - start_time
-    total_remaining = items_deferred + errors
+    unprocessed = items_in_run + resumed_items - generated - errors
+    total_remaining = items_deferred + errors + unprocessed
 
     print(f"\n{'='*60}")
-    print(f"  完了! (実行時間: {format_eta(elapsed)})")
+    if pipeline.stopping:
+        print(f"  中断しました (実行時間: {format_duration(elapsed)})")
+    else:
+        print(f"  完了! (実行時間: {format_duration(elapsed)})")
     print(f"  生成: {generated}  エラー: {errors}  スキップ(既存): {skipped}")
+    if shared.fanned_out:
+        print(f"  同じ音声を配布: {shared.fanned_out}件")
+    print_trim_report(pipeline.trim_saved)
+    print_size_report(sizes_before, app_audio_sizes(APPS, app_ids, AUDIO_BASE_DIR))
     if total_remaining > 0:
         print(f"  残り: {total_remaining}件 → 再実行で続きから")
     else:
         print(f"  全ファイルの生成が完了しました!")
+    METRICS.print_summary()
     print(f"{'='*60}")
+    METRICS.finish(args.metrics_prom)
+
+    if args.sprite:
+        write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+    update_precache_manifest(AUDIO_BASE_DIR)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""複数の TTS バックエンドを使い分けて全アプリの音声ファイルを生成する。
+
+Gemini TTS / Google Cloud TTS / gTTS を同時に使い、応答の速いバックエンドから順に
+仕事を渡す（tts_router.BackendRouter）。どれかがレート制限・日次クォータ超過・
+エラーになると、残りのアイテムは他のバックエンドが引き受ける。
+例: Gemini の1日の上限に達したら、続きは Cloud TTS で生成する。
+
+どのバックエンドの出力も PCM で受け取り、--profiles のプロファイルで同じようにエンコードする。
+生成済みかどうかは scripts/tts-manifest.json の合成キーで判定し、
+--backends のどれかのキーと一致すれば生成済みとみなす
+（generate-audio-gemini.py / generate-audio-cloud-tts.py で作ったファイルもそのまま使う）。
+同じ音声になるアイテム（どのバックエンドでも合成キーが同じもの）は1回だけ合成し、
+他の出力先にはハードリンク（できなければコピー）で配る（tts_cache.SharedClips）。
+
+バックエンドごとの細かい調整（Gemini のバッチサイズ自動調整・中断ジョブの再開、
+Cloud TTS の無音トリムなど）は各専用スクリプトを使う。
+
+使い方:
+  # 使えるバックエンドを全て使って生成（APIキーのないものは自動で外す）
+  GEMINI_API_KEY=... GOOGLE_API_KEY=... python scripts/generate-audio.py
+
+  # 使うバックエンドと優先順を指定（速さが同じなら先のものを使う）
+  python scripts/generate-audio.py --backends cloud-tts,gtts --app english-flash
+
+  # 生成計画だけを表示（APIキー不要・API を呼ばない）
+  python scripts/generate-audio.py --plan
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from tts_backends import (CLOUD_RATE_EN, CLOUD_RATE_JA, CLOUD_VOICE_EN, CLOUD_VOICE_JA,
+                          GEMINI_MODEL, GEMINI_VOICE_EN, GEMINI_VOICE_JA, SPLIT_MODES,
+                          CloudTtsBackend, GeminiBackend, GttsBackend)
+from tts_cache import SharedClips, SynthesisCache
+from tts_catalog import APPS, catalog_items
+from tts_encode import DEFAULT_PROFILES, audio_sizes, encode_batch, parse_profiles, profile_path
+from tts_journal import write_file_atomic
+from tts_metrics import METRICS, add_metrics_arguments
+from tts_plan import LatencyHistory, format_duration, print_plan, rpd_days, simulate_wall_seconds
+from tts_precache import update_precache_manifest
+from tts_quota import QuotaScheduler
+from tts_router import BackendRouter
+from tts_sprite import write_sprites
+
+# --- 定数 ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_BASE_DIR = os.path.join(SCRIPT_DIR, "..", "edup-app", "public", "audio")
+
+BACKEND_NAMES = [GeminiBackend.name, CloudTtsBackend.name, GttsBackend.name]
+DEFAULT_BACKENDS = ",".join(BACKEND_NAMES)
+DEFAULT_GEMINI_RPM = 10
+DEFAULT_GEMINI_RPD = 250
+DEFAULT_GEMINI_BATCH_SIZE = 20
+DEFAULT_GEMINI_IN_FLIGHT = 3
+DEFAULT_CLOUD_CONCURRENCY = 4
+DEFAULT_CLOUD_BATCH_SIZE = 1
+
+
+def parse_backends(text: str) -> list[str]:
+    """--backends（カンマ区切り）を検証してリストにする。"""
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BACKEND_NAMES]
+    if unknown:
+        raise ValueError(f"不明なバックエンド: {', '.join(unknown)} "
+                         f"(選択肢: {', '.join(BACKEND_NAMES)})")
+    if not names:
+        raise ValueError("バックエンドを1つ以上指定してください")
+    return names
+
+
+def build_backends(args, latency: LatencyHistory) -> list:
+    """--backends の順にバックエンドを作る。"""
+    backends = []
+    for name in args.backends:
+        if name == GeminiBackend.name:
+            scheduler = QuotaScheduler(args.gemini_model, args.gemini_rpm, args.gemini_rpd)
+            backends.append(GeminiBackend(
+                os.environ.get("GEMINI_API_KEY"), scheduler, model=args.gemini_model,
+                voice_ja=args.gemini_voice_ja, voice_en=args.gemini_voice_en,
+                batch_size=args.gemini_batch_size, concurrency=args.gemini_in_flight,
+                split_mode=args.split_mode, latency=latency))
+        elif name == CloudTtsBackend.name:
+            backends.append(CloudTtsBackend(
+                os.environ.get("GOOGLE_API_KEY"), voice_ja=args.cloud_voice_ja,
+                voice_en=args.cloud_voice_en, rate_ja=args.cloud_rate_ja,
+                rate_en=args.cloud_rate_en, concurrency=args.cloud_concurrency,
+                latency=latency, batch_size=args.cloud_batch_size))
+        else:
+            backends.append(GttsBackend(latency=latency))
+    return backends
+
+
+def collect_pending(args, app_ids: list, backends: list, cache: SynthesisCache,
+                    create_dirs: bool = True) -> tuple[list, list, int]:
+    """(全アイテム, 未生成の entry, スキップ数) を返す。
+
+    いずれかのバックエンドのキーで生成済みなら生成済みとみなす。
+    """
+    all_items = catalog_items(app_ids, AUDIO_BASE_DIR)
+    pending = []
+    skipped = 0
+    for app_id, output_dir, item in all_items:
+        if create_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+        filepath = os.path.join(output_dir, item["filename"])
+        if not args.force and any(cache.is_fresh(filepath, backend.cache_key(item))
+                                  for backend in backends):
+            skipped += 1
+        else:
+            pending.append({"app_id": app_id, "output_dir": output_dir, "item": item})
+    return all_items, pending, skipped
+
+
+def share_pending(args, pending: list, backends: list, cache: SynthesisCache,
+                  dry_run: bool = False) -> tuple[list, SharedClips]:
+    """同じ合成キーの出力先を1件にまとめ、以前の実行で同じ音声があれば配る。"""
+    shared = SharedClips(cache, args.profiles)
+
+    def target(entry):
+        item = entry["item"]
+        return (os.path.join(entry["output_dir"], item["filename"]),
+                [backend.cache_key(item) for backend in backends])
+
+    return shared.dedupe(pending, target, reuse=not args.force, dry_run=dry_run), shared
+
+
+def request_groups(pending: list, backend) -> list[list[dict]]:
+    """pending をそのバックエンドの1リクエスト分ずつ（同じアプリ・言語）に分ける。"""
+    groups = {}
+    for entry in pending:
+        groups.setdefault((entry["app_id"], entry["item"]["lang"]), []).append(entry["item"])
+    requests = []
+    for items in groups.values():
+        size = backend.batch_limit(items[0])
+        requests.extend(items[i:i + size] for i in range(0, len(items), size))
+    return requests
+
+
+def plan_row(pending: list, backend, latency: LatencyHistory) -> dict:
+    """pending を全てこのバックエンドで生成した場合の見積もり（tts_plan.print_plan の1行分）。"""
+    requests = request_groups(pending, backend)
+    per_item = latency.seconds_per_item(backend.latency_key) or backend.default_latency
+    latencies = [per_item * len(items) for items in requests]
+    days = None
+    rpm = None
+    tokens = None
+    today = len(latencies)
+    if isinstance(backend, GeminiBackend):
+        scheduler = backend.scheduler
+        rpm = scheduler.rpm
+        tokens = scheduler.available_now()
+        days = rpd_days(len(latencies), scheduler.remaining_today(), scheduler.rpd)
+        today = min(today, scheduler.remaining_today())
+    total_seconds = simulate_wall_seconds(latencies, backend.concurrency, rpm, tokens)
+    today_seconds = simulate_wall_seconds(latencies[:today], backend.concurrency, rpm, tokens)
+    reason = backend.unavailable()
+    return {
+        "backend": backend.name,
+        "items": len(pending),
+        "chars": sum(backend.billed_chars(items) for items in requests),
+        "requests": len(latencies),
+        "days": days,
+        "today_seconds": today_seconds,
+        "total_seconds": total_seconds,
+        "latency": per_item,
+        "samples": latency.count(backend.latency_key),
+        "note": f"使用不可: {reason}" if reason else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="複数の TTS バックエンドで知育アプリの音声ファイルを生成"
+    )
+    parser.add_argument("--app", choices=list(APPS.keys()),
+                        help="特定のアプリのみ生成")
+    parser.add_argument("--force", action="store_true",
+                        help="既存ファイルを上書き")
+    parser.add_argument("--backends", default=DEFAULT_BACKENDS,
+                        help=f"使うバックエンド（カンマ区切り・優先順） (default: {DEFAULT_BACKENDS})")
+    parser.add_argument("--profiles", default=",".join(DEFAULT_PROFILES),
+                        help="エンコードプロファイル（カンマ区切り。MP3 を1つ含める） "
+                             f"(default: {','.join(DEFAULT_PROFILES)})")
+    parser.add_argument("--gemini-model", default=GEMINI_MODEL,
+                        help=f"Gemini のモデル (default: {GEMINI_MODEL})")
+    parser.add_argument("--gemini-voice-ja", default=GEMINI_VOICE_JA,
+                        help=f"Gemini の日本語ボイス (default: {GEMINI_VOICE_JA})")
+    parser.add_argument("--gemini-voice-en", default=GEMINI_VOICE_EN,
+                        help=f"Gemini の英語ボイス (default: {GEMINI_VOICE_EN})")
+    parser.add_argument("--gemini-rpm", type=int, default=DEFAULT_GEMINI_RPM,
+                        help=f"Gemini の1分あたりリクエスト上限 (default: {DEFAULT_GEMINI_RPM})")
+    parser.add_argument("--gemini-rpd", type=int, default=DEFAULT_GEMINI_RPD,
+                        help=f"Gemini の1日あたりリクエスト上限 (default: {DEFAULT_GEMINI_RPD})")
+    parser.add_argument("--gemini-batch-size", type=int, default=DEFAULT_GEMINI_BATCH_SIZE,
+                        help=f"Gemini の1リクエストの単語数 (default: {DEFAULT_GEMINI_BATCH_SIZE})")
+    parser.add_argument("--gemini-in-flight", type=int, default=DEFAULT_GEMINI_IN_FLIGHT,
+                        help=f"Gemini の同時リクエスト数 (default: {DEFAULT_GEMINI_IN_FLIGHT})")
+    parser.add_argument("--split-mode", choices=SPLIT_MODES, default="auto",
+                        help="Gemini のバッチ音声の分割方式 (default: auto)")
+    parser.add_argument("--cloud-voice-ja", default=CLOUD_VOICE_JA,
+                        help=f"Cloud TTS の日本語ボイス (default: {CLOUD_VOICE_JA})")
+    parser.add_argument("--cloud-voice-en", default=CLOUD_VOICE_EN,
+                        help=f"Cloud TTS の英語ボイス (default: {CLOUD_VOICE_EN})")
+    parser.add_argument("--cloud-rate-ja", type=float, default=CLOUD_RATE_JA,
+                        help=f"Cloud TTS の日本語の話速 (default: {CLOUD_RATE_JA})")
+    parser.add_argument("--cloud-rate-en", type=float, default=CLOUD_RATE_EN,
+                        help=f"Cloud TTS の英語の話速 (default: {CLOUD_RATE_EN})")
+    parser.add_argument("--cloud-concurrency", type=int, default=DEFAULT_CLOUD_CONCURRENCY,
+                        help=f"Cloud TTS の同時リクエスト数 (default: {DEFAULT_CLOUD_CONCURRENCY})")
+    parser.add_argument("--cloud-batch-size", type=int, default=DEFAULT_CLOUD_BATCH_SIZE,
+                        help="Cloud TTS の SSML 1リクエストにまとめる単語数（<mark> で切り出す。"
+                             f"Chirp3-HD ボイスは1件ずつ） (default: {DEFAULT_CLOUD_BATCH_SIZE})")
+    parser.add_argument("--sprite", action="store_true",
+                        help="アプリごとの音声スプライト (audio/sprites/<app>.mp3 + .json) も出力")
+    parser.add_argument("--plan", action="store_true",
+                        help="バックエンドごとの生成計画（件数・文字数・リクエスト数・所要時間）だけを表示")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    try:
+        args.backends = parse_backends(args.backends)
+        args.profiles = parse_profiles(args.profiles)
+    except ValueError as e:
+        parser.error(str(e))
+
+    app_ids = [args.app] if args.app else list(APPS.keys())
+    latency = LatencyHistory()
+    backends = build_backends(args, latency)
+
+    if args.plan:
+        # 何も書き出さない（マニフェスト未登録ファイルの登録もしない）
+        cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+        all_items, pending, skipped = collect_pending(args, app_ids, backends, cache,
+                                                      create_dirs=False)
+        pending, shared = share_pending(args, pending, backends, cache, dry_run=True)
+        print(f"マルチバックエンド生成計画")
+        print(f"{'='*60}")
+        print(f"  対象アプリ   : {', '.join(app_ids)}")
+        print(f"  全ファイル   : {len(all_items)}件 (生成済み {skipped}件)")
+        if shared.reused or shared.merged:
+            print(f"  共有         : 既存から配布 {shared.reused}件, "
+                  f"同じ音声をまとめる {shared.merged}件")
+        print(f"  ※ 各行は未生成分を全てそのバックエンドで作った場合（実際は速い順に分担）")
+        print_plan([plan_row(pending, backend, latency) for backend in backends])
+        return
+
+    usable = []
+    for backend in backends:
+        reason = backend.unavailable()
+        if reason:
+            print(f"  [{backend.name}] 使用しません: {reason}")
+        else:
+            usable.append(backend)
+    if not usable:
+        print("Error: 使えるバックエンドがありません（APIキー・ライブラリを確認してください）")
+        raise SystemExit(1)
+
+    cache = SynthesisCache(base_dir=AUDIO_BASE_DIR)
+    # 使えないバックエンド（今日の上限に達した Gemini など）で作ったファイルも生成済みとみなす
+    all_items, pending, skipped = collect_pending(args, app_ids, backends, cache)
+    pending, shared = share_pending(args, pending, backends, cache)
+    cache.save()
+
+    print(f"マルチバックエンド音声生成")
+    print(f"{'='*60}")
+    print(f"  バックエンド : {', '.join(b.name for b in usable)}")
+    print(f"  対象アプリ   : {', '.join(app_ids)}")
+    print(f"  プロファイル : {', '.join(args.profiles)}")
+    print(f"{'='*60}")
+    print(f"  全ファイル   : {len(all_items)}件")
+    print(f"  既存スキップ : {skipped}件")
+    if cache.adopted:
+        print(f"  (うちマニフェスト未登録の既存ファイル {cache.adopted}件を登録)")
+    if shared.reused:
+        print(f"  既存から配布 : {shared.reused}件（同じ音声のファイルをリンク/コピー）")
+    if shared.merged:
+        print(f"  まとめて生成 : {shared.merged}件（同じ音声の出力先を1回の合成で作る）")
+    print(f"  今回生成     : {len(pending)}件")
+    print(f"{'='*60}")
+
+    if not pending:
+        print("\n全て生成済みです。")
+        if args.sprite:
+            write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+        update_precache_manifest(AUDIO_BASE_DIR)
+        return
+
+    log_lock = threading.Lock()
+
+    def log(message: str):
+        with log_lock:
+            print(message, flush=True)
+
+    def on_result(backend, batch: list, pcms: list) -> int:
+        """合成した PCM をエンコードして保存する（ワーカースレッドから呼ばれる）。"""
+        sample_rate = pcms[0][1]
+        outputs = encode_batch([pcm for pcm, _rate in pcms], sample_rate, args.profiles)
+        for entry, encoded in zip(batch, outputs):
+            item = entry["item"]
+            filepath = os.path.join(entry["output_dir"], item["filename"])
+            for profile, data in encoded.items():
+                write_file_atomic(profile_path(filepath, profile), data)
+            cache.record(filepath, backend.cache_key(item), backend=backend.name,
+                         text=item["text"], profiles=args.profiles)
+            shared.written(filepath)
+        return len(batch)
+
+    start_time = time.time()
+    METRICS.start("multi", args.metrics_jsonl)
+    router = BackendRouter(usable, latency, on_result, log)
+    try:
+        leftover = router.run(pending)
+    finally:
+        cache.save()
+        latency.save()
+    elapsed = time.time() - start_time
+
+    generated = sum(state.items for state in router.states)
+    print(f"\n{'='*60}")
+    if router.stopping:
+        print(f"  中断しました (実行時間: {format_duration(elapsed)})")
+    else:
+        print(f"  完了! (実行時間: {format_duration(elapsed)})")
+    print(f"  生成: {generated}  エラー: {len(router.failed)}  スキップ(既存): {skipped}")
+    if shared.fanned_out:
+        print(f"  同じ音声を配布: {shared.fanned_out}件")
+    for state in router.states:
+        status = f"  使用停止: {state.disabled}" if state.disabled else ""
+        print(f"    {state.name}: {state.items}件 ({state.requests}リクエスト){status}")
+    remaining = len(leftover) + len(router.failed)
+    if remaining:
+        print(f"  残り: {remaining}件 → 再実行で続きから")
+    print(f"  音声サイズ:")
+    for app_id in app_ids:
+        sizes = audio_sizes(os.path.join(AUDIO_BASE_DIR, APPS[app_id]["output_dir"]))
+        parts = [f"{ext} {size / 1024:.0f}KB" for ext, size in sorted(sizes.items())]
+        print(f"    {app_id}: {', '.join(parts) or '-'}")
+    METRICS.print_summary()
+    print(f"{'='*60}")
+    METRICS.finish(args.metrics_prom)
+
+    if args.sprite:
+        write_sprites(APPS, app_ids, AUDIO_BASE_DIR)
+    update_precache_manifest(AUDIO_BASE_DIR)
+
+
+if __name__ == "__main__":
+    main()
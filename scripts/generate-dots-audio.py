@@ -1,25 +1,20 @@
 #!/usr/bin/env python3
-"""Generate MP3 files for DotsCard using gTTS. Format: 'これは N です' for 1-100."""
+"""DotsCard の「これは N です」(1-100) を gTTS で生成する。
 
-from gtts import gTTS
-import os
+語彙は tts_catalog.py にまとめたので、generate-audio.py を
+--backends gtts --app dots で呼ぶだけの互換用スクリプト。
+追加の引数（--force など）はそのまま渡す。
 
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "edup-app", "public", "audio", "dots")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+  python scripts/generate-dots-audio.py [--force]
+"""
 
-import time
+import os
+import runpy
+import sys
 
-for n in range(1, 101):
-    filename = f"{n}.mp3"
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    # Skip if file is already > 5KB (already generated with sentence)
-    if os.path.exists(filepath) and os.path.getsize(filepath) > 5000:
-        print(f"SKIP {filename}")
-        continue
-    text = f"これは {n} です"
-    print(f"Generating {filename} ({text})...")
-    tts = gTTS(text=text, lang="ja", slow=False)
-    tts.save(filepath)
-    time.sleep(0.5)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-print(f"\nDone! Generated 100 audio files in {OUTPUT_DIR}")
+if __name__ == "__main__":
+    sys.argv = [sys.argv[0], "--backends", "gtts", "--app", "dots", *sys.argv[1:]]
+    sys.path.insert(0, SCRIPT_DIR)
+    runpy.run_path(os.path.join(SCRIPT_DIR, "generate-audio.py"), run_name="__main__")
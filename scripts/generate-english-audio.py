@@ -1,47 +1,20 @@
 #!/usr/bin/env python3
-"""Generate MP3 files for English flashcard words using Google TTS (gTTS)."""
+"""English flashcard の単語を gTTS で生成する。
 
-from gtts import gTTS
-import os
+語彙は tts_catalog.py にまとめたので、generate-audio.py を
+--backends gtts --app english-flash で呼ぶだけの互換用スクリプト。
+追加の引数（--force など）はそのまま渡す。
 
-WORDS = [
-    # 動物
-    "dog", "cat", "bird", "fish", "rabbit", "bear", "elephant", "lion",
-    "monkey", "pig", "cow", "horse", "sheep", "chicken", "duck", "frog",
-    "turtle", "penguin", "whale", "butterfly", "giraffe", "zebra", "snake",
-    "owl", "dolphin",
-    # 食べ物
-    "apple", "banana", "orange", "grape", "strawberry", "watermelon",
-    "peach", "cherry", "bread", "rice", "egg", "milk", "cake", "cookie",
-    "ice cream", "pizza", "tomato", "corn", "carrot", "lemon",
-    "chocolate", "cheese", "donut", "pineapple", "mushroom",
-    # もの
-    "car", "bus", "train", "airplane", "bicycle", "boat", "rocket",
-    "star", "sun", "moon", "rainbow", "flower", "tree", "house", "book",
-    "pencil", "clock", "umbrella", "hat", "shoe", "key", "bell", "ball",
-    "guitar", "camera",
-    # からだ
-    "eye", "ear", "hand", "foot", "heart", "nose", "mouth", "tooth",
-    "leg", "bone", "brain", "muscle", "finger", "face", "tongue",
-    # しぜん
-    "fire", "water", "snow", "cloud", "mountain", "rain", "wind",
-    "thunder", "ocean", "river", "leaf", "rock", "sand", "earth", "volcano",
-    # いろ
-    "red", "blue", "green", "yellow", "orange", "purple", "pink",
-    "white", "black", "brown",
-]
+  python scripts/generate-english-audio.py [--force]
+"""
 
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "edup-app", "public", "audio", "english-flash")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+import os
+import runpy
+import sys
 
-for word in WORDS:
-    filename = word.replace(" ", "-") + ".mp3"
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    if os.path.exists(filepath):
-        print(f"SKIP {filename}")
-        continue
-    print(f"Generating {filename}...")
-    tts = gTTS(text=word, lang="en", slow=False)
-    tts.save(filepath)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-print(f"\nDone! Generated {len(WORDS)} audio files in {OUTPUT_DIR}")
+if __name__ == "__main__":
+    sys.argv = [sys.argv[0], "--backends", "gtts", "--app", "english-flash", *sys.argv[1:]]
+    sys.path.insert(0, SCRIPT_DIR)
+    runpy.run_path(os.path.join(SCRIPT_DIR, "generate-audio.py"), run_name="__main__")
@@ -0,0 +1,706 @@
+"""TTS バックエンドの共通インターフェースと、各 API の呼び出し。
+
+バックエンド（GeminiBackend / CloudTtsBackend / GttsBackend）は次を持つ:
+  name             マニフェスト・ログで使う名前
+  max_batch        1リクエストでまとめて合成できる件数（同じアプリ・言語のアイテム）
+  batch_limit(item)  そのアイテムの言語で実際にまとめられる件数（ボイスによっては1）
+  concurrency      同時に出せるリクエスト数
+  default_latency  応答時間の履歴がないときの見積もり（秒/件）
+  latency_key      tts_plan.LatencyHistory のキー
+  cache_key(item)  合成キャッシュキー（各専用スクリプトと同じキー）
+  billed_chars(items)  課金対象の文字数
+  unavailable()    使えない理由（APIキー未設定・ライブラリ未インストールなど）。使えれば None
+  synthesize(items) -> [(pcm, sample_rate), ...]  16-bit mono PCM をアイテム順に返す
+
+latency（LatencyHistory）を渡すと、API の応答時間（クォータ待ちを除く）を記録する。
+
+synthesize は失敗の種類に応じて次の例外を送出し、tts_router.BackendRouter が
+フェイルオーバーに使う:
+  BackendThrottled    一時的なレート制限。retry_after 秒後にまた使える
+  BackendUnavailable  日次クォータ超過・認証エラーなど、この実行中はもう使えない
+  BackendError        その他の失敗（そのアイテムは別のバックエンドで再試行する）
+
+generate-audio-cloud-tts.py / generate-audio-gemini.py の API 呼び出し
+（keep-alive 接続プール、Gemini のプロンプトと無音分割）もここにまとめている。
+アイテムは tts_catalog の形式（speech / context は Gemini、text は Cloud TTS と gTTS が使う）。
+"""
+
+from __future__ import annotations
+
+import base64
+import http.client
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import wave
+from typing import TYPE_CHECKING
+from xml.sax.saxutils import escape
+
+from tts_cache import synthesis_key
+from tts_metrics import METRICS
+from tts_plan import LatencyHistory, latency_key
+from tts_quota import is_daily_quota_error, is_rate_limited, retry_delay
+
+if TYPE_CHECKING:
+    from google import genai
+    from tts_quota import QuotaScheduler
+    from tts_silence import SilenceEnvelope
+
+# --- 既定のボイス ---
+GEMINI_MODEL = "gemini-2.5-flash-preview-tts"
+GEMINI_VOICE_JA = "Kore"
+GEMINI_VOICE_EN = "Aoede"
+GEMINI_SAMPLE_RATE = 24000
+
+# CLOUD_VOICE_JA = "ja-JP-Neural2-C"   # 女性、明瞭
+CLOUD_VOICE_JA = "ja-JP-Chirp3-HD-Callirrhoe"   # 女性、明瞭
+CLOUD_VOICE_EN = "en-US-Neural2-F"    # 女性、明瞭
+CLOUD_RATE_JA = 0.9                   # やや遅め（子供向け）
+CLOUD_RATE_EN = 0.9
+
+# --- Cloud TTS ---
+HTTP_TIMEOUT = 30                       # 1リクエストのタイムアウト（秒）
+# 環境変数 TTS_API_URL / GEMINI_BASE_URL で送り先を変えられる（tts_mock_server での計測用）
+TTS_API_URL = os.environ.get("TTS_API_URL",
+                             "https://texttospeech.googleapis.com/v1/text:synthesize")
+# LINEAR16 で受け取ってローカルでエンコードする場合のサンプルレート
+LINEAR16_SAMPLE_RATE = 24000
+CLOUD_RATE_LIMIT_WAIT = 10              # 429 に Retry-After がない場合の待機（秒）
+
+# SSML バッチ（複数の単語を1リクエストで合成し、<mark> の時刻で切る）
+SSML_BREAK_MS = 600      # 単語間に入れる <break>
+SSML_CUT_PAD_MS = 150    # mark の時刻の前後に残す余白（SSML_BREAK_MS の半分未満）
+# SSML（<mark>）に対応していないボイス。これらは1単語1リクエストで合成する
+SSML_UNSUPPORTED_VOICES = ("Chirp3-HD", "Chirp-HD")
+
+# --- Gemini ---
+GEMINI_RATE_LIMIT_WAIT = 60   # 429 に待ち時間の指示がない場合の待機（秒）
+
+# 無音分割パラメータ
+SILENCE_MIN_LEN = 800    # 無音と判定する最小長さ (ms)
+SILENCE_THRESH = -36      # 無音と判定する音量閾値 (dBFS)
+SILENCE_KEEP = 150        # 分割後に前後に残す無音 (ms)
+PROMPT_PAUSE_MS = 3000    # プロンプトで指示する単語間の沈黙 (ms)
+EXACT_MIN_GAP = PROMPT_PAUSE_MS // 10   # exact 分割で区切りとして認める最短の無音 (ms)
+SPLIT_MODES = ["auto", "exact", "threshold"]
+
+# --- gTTS ---
+GTTS_RATE_LIMIT_WAIT = 60
+
+
+class BackendError(Exception):
+    """バックエンドでの合成失敗（別のバックエンドで再試行できる）。"""
+
+
+class BackendThrottled(BackendError):
+    """一時的なレート制限。retry_after 秒後に再開できる。"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BackendUnavailable(BackendError):
+    """日次クォータ超過・認証エラーなど、この実行中はもう使えない。"""
+
+
+def gemini_cache_key(item: dict, voice: str, model: str) -> str:
+    """Gemini のアイテムの合成キャッシュキー。Gemini には話速パラメータがないため rate は None。"""
+    return synthesis_key(speech=item["speech"], context=item["context"],
+                         voice=voice, model=model, backend=GeminiBackend.name)
+
+
+def cloud_cache_key(item: dict, voice: str, rate: float) -> str:
+    """Cloud TTS のアイテムの合成キャッシュキー。"""
+    return synthesis_key(speech=item["text"], voice=voice, rate=rate,
+                         backend=CloudTtsBackend.name)
+
+
+def _slice_pcm(pcm: bytes, sample_rate: int, start_ms: int, end_ms: int) -> bytes:
+    """16-bit mono PCM の [start_ms, end_ms) を切り出す。"""
+    return pcm[start_ms * sample_rate // 1000 * 2:end_ms * sample_rate // 1000 * 2]
+
+
+# --- HTTP 接続プール ---
+# urlopen は毎回 TLS ハンドシェイクからやり直すため、スレッドごとに
+# keep-alive 接続を1本保持して使い回す。
+
+_local = threading.local()
+
+
+def _get_connection() -> http.client.HTTPConnection:
+    """現在のスレッド用の keep-alive 接続を返す（なければ作成）。"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        parsed = urllib.parse.urlsplit(TTS_API_URL)
+        conn_cls = (http.client.HTTPSConnection if parsed.scheme == "https"
+                    else http.client.HTTPConnection)
+        conn = conn_cls(parsed.netloc, timeout=HTTP_TIMEOUT)
+        _local.conn = conn
+    return conn
+
+
+def _drop_connection():
+    """壊れた接続を破棄する。次回の _get_connection() で張り直される。"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def post_json(url: str, payload: dict) -> dict:
+    """プール済み接続で JSON を POST し、レスポンスの JSON を返す。
+
+    HTTP エラーは urlopen と同じく urllib.error.HTTPError として送出する。
+    """
+    parsed = urllib.parse.urlsplit(url)
+    path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+    for attempt in range(2):
+        conn = _get_connection()
+        try:
+            METRICS.count("requests")
+            with METRICS.stage("api"):
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            break
+        except (http.client.HTTPException, ConnectionError):
+            # サーバー側でアイドル切断された接続を再利用した場合は1回だけ張り直す
+            _drop_connection()
+            METRICS.count("reconnects")
+            if attempt == 1:
+                raise
+
+    if resp.will_close:
+        _drop_connection()
+    if resp.status == 429:
+        METRICS.count("throttled")
+    if resp.status != 200:
+        raise urllib.error.HTTPError(url, resp.status, resp.reason,
+                                     resp.headers, io.BytesIO(data))
+    return json.loads(data)
+
+
+def synthesize(text: str, voice_name: str, lang_code: str,
+               speaking_rate: float, api_key: str, encoding: str = "MP3") -> bytes:
+    """Google Cloud TTS REST API で音声合成し、音声バイト列を返す。
+
+    encoding="LINEAR16" の場合は LINEAR16_SAMPLE_RATE の WAV が返る。
+    """
+    url = f"{TTS_API_URL}?key={api_key}"
+    audio_config = {
+        "audioEncoding": encoding,
+        "speakingRate": speaking_rate,
+    }
+    if encoding == "LINEAR16":
+        audio_config["sampleRateHertz"] = LINEAR16_SAMPLE_RATE
+    data = post_json(url, {
+        "input": {"text": text},
+        "voice": {
+            "languageCode": lang_code,
+            "name": voice_name,
+        },
+        "audioConfig": audio_config,
+    })
+    return base64.b64decode(data["audioContent"])
+
+
+def cloud_http_error(error: urllib.error.HTTPError) -> BackendError:
+    """Cloud TTS の HTTP エラーをバックエンドの例外に変換する（応答本文を読み切る）。
+
+    429 は Retry-After（なければ CLOUD_RATE_LIMIT_WAIT 秒）を retry_after に持つ BackendThrottled、
+    401 / 403 は BackendUnavailable、それ以外は BackendError。
+    """
+    detail = error.read().decode("utf-8", errors="replace")[:200]
+    if error.code == 429:
+        wait = error.headers.get("Retry-After") if error.headers else None
+        wait = float(wait) if wait and wait.isdigit() else CLOUD_RATE_LIMIT_WAIT
+        return BackendThrottled(f"レートリミット ({wait:.0f}秒待機)", wait)
+    if error.code in (401, 403):
+        return BackendUnavailable(f"HTTP {error.code}: {detail}")
+    return BackendError(f"HTTP {error.code}: {detail}")
+
+
+def supports_ssml_marks(voice_name: str) -> bool:
+    """ボイスが SSML の <mark> とタイムポイントに対応しているか。"""
+    return not any(tag in voice_name for tag in SSML_UNSUPPORTED_VOICES)
+
+
+def build_marked_ssml(texts: list[str]) -> str:
+    """各テキストの前後に <mark> を置き、間に <break> を入れた SSML を作る。"""
+    parts = []
+    for i, text in enumerate(texts):
+        if i > 0:
+            parts.append(f'<break time="{SSML_BREAK_MS}ms"/>')
+        parts.append(f'<mark name="s{i}"/>{escape(text)}<mark name="e{i}"/>')
+    return f"<speak>{''.join(parts)}</speak>"
+
+
+def synthesize_marked(texts: list[str], voice_name: str, lang_code: str,
+                      speaking_rate: float, api_key: str) -> tuple[list[bytes], int]:
+    """複数のテキストを SSML 1リクエストで合成し、mark の時刻で切った PCM を返す。
+
+    v1beta1 の enableTimePointing で各 mark の時刻を受け取り、
+    [s_i - 余白, e_i + 余白] を切り出す（無音検出の推測は不要）。
+    (テキスト順の 16-bit mono PCM のリスト, サンプルレート) を返す。
+    タイムポイントが揃っていなければ ValueError。
+    """
+    url = f"{TTS_API_URL.replace('/v1/', '/v1beta1/')}?key={api_key}"
+    data = post_json(url, {
+        "input": {"ssml": build_marked_ssml(texts)},
+        "voice": {
+            "languageCode": lang_code,
+            "name": voice_name,
+        },
+        "audioConfig": {
+            "audioEncoding": "LINEAR16",
+            "speakingRate": speaking_rate,
+            "sampleRateHertz": LINEAR16_SAMPLE_RATE,
+        },
+        "enableTimePointing": ["SSML_MARK"],
+    })
+    with wave.open(io.BytesIO(base64.b64decode(data["audioContent"])), "rb") as wf:
+        sample_rate = wf.getframerate()
+        pcm = wf.readframes(wf.getnframes())
+    marks = {tp["markName"]: tp["timeSeconds"] * 1000 for tp in data.get("timepoints", [])}
+    missing = [name for i in range(len(texts)) for name in (f"s{i}", f"e{i}") if name not in marks]
+    if missing:
+        raise ValueError(f"タイムポイントが不足: {', '.join(missing[:4])}")
+
+    duration_ms = len(pcm) // 2 * 1000 // sample_rate
+    clips = []
+    for i in range(len(texts)):
+        start = max(0, int(marks[f"s{i}"]) - SSML_CUT_PAD_MS)
+        end = min(duration_ms, int(marks[f"e{i}"]) + SSML_CUT_PAD_MS)
+        if end <= start:
+            raise ValueError(f"タイムポイントの順序が不正: s{i}={marks[f's{i}']:.0f}ms")
+        clips.append(_slice_pcm(pcm, sample_rate, start, end))
+    return clips, sample_rate
+
+
+# --- Gemini ---
+
+def gemini_client(api_key: str) -> genai.Client:
+    """Gemini のクライアントを作る。環境変数 GEMINI_BASE_URL があればその URL に送る。"""
+    from google import genai
+
+    base_url = os.environ.get("GEMINI_BASE_URL")
+    if base_url:
+        return genai.Client(api_key=api_key, http_options={"base_url": base_url})
+    return genai.Client(api_key=api_key)
+
+
+def _speech_config(voice_name: str):
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        response_modalities=["AUDIO"],
+        speech_config=types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                    voice_name=voice_name,
+                )
+            )
+        ),
+    )
+
+
+def _check_candidate(response):
+    """応答の候補を検査して返す。ブロック・空の応答は RuntimeError。"""
+    if not response.candidates:
+        raise RuntimeError(f"Empty candidates. prompt_feedback={response.prompt_feedback}")
+    candidate = response.candidates[0]
+    if candidate.finish_reason and candidate.finish_reason.name not in ("STOP", "MAX_TOKENS"):
+        raise RuntimeError(f"Blocked: finish_reason={candidate.finish_reason}")
+    return candidate
+
+
+def generate_speech(client: genai.Client, text: str, voice_name: str, model: str) -> bytes:
+    """Gemini TTS で音声を生成し、PCM バイト列を返す。"""
+    METRICS.count("requests")
+    try:
+        with METRICS.stage("api"):
+            response = client.models.generate_content(
+                model=model,
+                contents=text,
+                config=_speech_config(voice_name),
+            )
+    except Exception as e:
+        if is_rate_limited(e):
+            METRICS.count("throttled")
+        raise
+    candidate = _check_candidate(response)
+    if not candidate.content or not candidate.content.parts:
+        raise RuntimeError(
+            f"No content returned. finish_reason={candidate.finish_reason}, "
+            f"safety_ratings={candidate.safety_ratings}"
+        )
+    return candidate.content.parts[0].inline_data.data
+
+
+def generate_speech_stream(client: genai.Client, text: str, voice_name: str, model: str):
+    """generate_speech のストリーミング版。届いた順に PCM のチャンクを返すジェネレーター。
+
+    応答全体を待たずに受け取れるので、先頭の単語の処理を早く始められる。
+    "api" には次のチャンクを待っていた時間だけを足す（呼び出し側の処理時間は含めない）。
+    """
+    METRICS.count("requests")
+    waited = 0.0
+    received = 0
+    first = True
+    candidate = None
+    try:
+        stream = iter(client.models.generate_content_stream(
+            model=model,
+            contents=text,
+            config=_speech_config(voice_name),
+        ))
+        while True:
+            start = time.perf_counter()
+            try:
+                response = next(stream)
+            except StopIteration:
+                break
+            finally:
+                waited += time.perf_counter() - start
+            if first:
+                METRICS.add_time("api_first_chunk", waited)
+                first = False
+            if not response.candidates and received:
+                continue   # 音声の後の使用量だけのチャンクなど
+            candidate = _check_candidate(response)
+            for part in (candidate.content.parts if candidate.content else None) or ():
+                if part.inline_data and part.inline_data.data:
+                    received += len(part.inline_data.data)
+                    yield part.inline_data.data
+    except Exception as e:
+        if is_rate_limited(e):
+            METRICS.count("throttled")
+        raise
+    finally:
+        METRICS.add_time("api", waited)
+    if received == 0:
+        raise RuntimeError(
+            f"No content returned. finish_reason={candidate and candidate.finish_reason}"
+        )
+
+
+def build_batch_prompt_ja(batch_items: list) -> str:
+    """日本語バッチ用のプロンプトを構築。"""
+    lines = []
+    for i, item in enumerate(batch_items, 1):
+        ctx = f"（{item['context']}）" if item["context"] else ""
+        lines.append(f"{i}. 「{item['speech']}」{ctx}")
+    word_list = "\n".join(lines)
+    return (
+        f"子供に語りかけるように、以下の{len(batch_items)}個のフレーズを"
+        f"1つずつ順番に、はっきりと日本語で読んでください。\n"
+        f"各フレーズの間には{PROMPT_PAUSE_MS // 1000}秒の沈黙を入れてください。\n"
+        f"番号や余計な言葉は加えず、指定されたフレーズのみ読んでください。\n\n"
+        f"{word_list}"
+    )
+
+
+def build_batch_prompt_en(batch_items: list) -> str:
+    """英語バッチ用のプロンプトを構築。"""
+    lines = []
+    for i, item in enumerate(batch_items, 1):
+        lines.append(f'{i}. "{item["speech"]}"')
+    word_list = "\n".join(lines)
+    return (
+        f"Speak clearly and cheerfully for a child learning English.\n"
+        f"Say each of the following {len(batch_items)} words one at a time, in order.\n"
+        f"Put {PROMPT_PAUSE_MS // 1000} seconds of silence between each word.\n"
+        f"Do not add numbers, explanations, or any extra words.\n\n"
+        f"{word_list}"
+    )
+
+
+def build_single_prompt(item: dict, lang: str) -> str:
+    """1単語だけを読ませるプロンプトを構築。"""
+    if lang == "ja":
+        ctx = f"（{item['context']}）" if item["context"] else ""
+        return (
+            f"子供に語りかけるように、はっきりと日本語で読んでください。"
+            f"余計な言葉は加えないでください{ctx}：「{item['speech']}」"
+        )
+    return (
+        f'Speak clearly and cheerfully for a child. '
+        f'Say only this word: "{item["speech"]}"'
+    )
+
+
+def build_prompt(batch_items: list, lang: str) -> str:
+    """件数と言語に応じたプロンプトを構築。"""
+    if len(batch_items) == 1:
+        return build_single_prompt(batch_items[0], lang)
+    if lang == "ja":
+        return build_batch_prompt_ja(batch_items)
+    return build_batch_prompt_en(batch_items)
+
+
+def split_candidates():
+    """分割パラメータ (無音長, 閾値) の候補を優先順に列挙する。"""
+    yield SILENCE_MIN_LEN, SILENCE_THRESH
+    for thresh_adj in [-4, -8, 4, 8]:
+        for len_adj in [0, -200, 200]:
+            yield max(300, SILENCE_MIN_LEN + len_adj), SILENCE_THRESH + thresh_adj
+
+
+def find_split_ranges(envelope: SilenceEnvelope, expected_count: int,
+                      mode: str = "auto") -> list[tuple[int, int]] | None:
+    """無音区間で区切った (start_ms, end_ms) を返す。期待数と一致しなければ None。
+
+    mode:
+      exact     - 長く深い無音の上位 K-1 個で区切る（区切りが不自然なら None）
+      threshold - 閾値候補を順に試し、ちょうど K 個になる設定を探す
+      auto      - exact → threshold の順に試す
+
+    エネルギー包絡線は1回だけ計算し、全ての候補をその上で評価する。
+    """
+    if mode in ("auto", "exact"):
+        ranges = envelope.split_exact(expected_count, SILENCE_THRESH, SILENCE_KEEP,
+                                      min_gap_len=EXACT_MIN_GAP)
+        if ranges is not None or mode == "exact":
+            return ranges
+    for min_len, thresh in split_candidates():
+        ranges = envelope.split_ranges(min_len, thresh, SILENCE_KEEP)
+        if len(ranges) == expected_count:
+            return ranges
+    return None
+
+
+# --- バックエンド ---
+
+class GeminiBackend:
+    """Gemini TTS。複数アイテムを1リクエストで読ませ、無音で分割する。
+
+    分割できなければ半分ずつ取り直す。リクエストは QuotaScheduler の許可を待って出し、
+    日次クォータを使い切ると BackendUnavailable になる。
+    """
+
+    name = "gemini"
+    default_latency = 1.5
+
+    def __init__(self, api_key: str | None, scheduler: QuotaScheduler,
+                 model: str = GEMINI_MODEL, voice_ja: str = GEMINI_VOICE_JA,
+                 voice_en: str = GEMINI_VOICE_EN, batch_size: int = 20,
+                 concurrency: int = 3, split_mode: str = "auto",
+                 latency: LatencyHistory | None = None):
+        self.api_key = api_key
+        self.scheduler = scheduler
+        self.model = model
+        self.voices = {"ja": voice_ja, "en": voice_en}
+        self.max_batch = batch_size
+        self.concurrency = concurrency
+        self.split_mode = split_mode
+        self.latency = latency
+        self.latency_key = latency_key(self.name, model)
+        self._client = None
+        self._lock = threading.Lock()
+
+    def cache_key(self, item: dict) -> str:
+        return gemini_cache_key(item, self.voices[item["lang"]], self.model)
+
+    def batch_limit(self, item: dict) -> int:
+        return self.max_batch
+
+    def billed_chars(self, items: list) -> int:
+        return len(build_prompt(items, items[0]["lang"]))
+
+    def unavailable(self) -> str | None:
+        if not self.api_key:
+            return "GEMINI_API_KEY が未設定"
+        try:
+            import google.genai  # noqa: F401
+        except ImportError:
+            return "google-genai が未インストール"
+        if self.scheduler.remaining_today() == 0:
+            return "今日のリクエスト上限を使い切っています"
+        return None
+
+    def _get_client(self) -> genai.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = gemini_client(self.api_key)
+            return self._client
+
+    def _request(self, items: list) -> bytes:
+        if not self.scheduler.acquire():
+            raise BackendUnavailable(f"1日のリクエスト上限 ({self.scheduler.rpd}) に達しました")
+        lang = items[0]["lang"]
+        try:
+            start = time.monotonic()
+            pcm = generate_speech(self._get_client(), build_prompt(items, lang),
+                                  self.voices[lang], self.model)
+            if self.latency is not None:
+                self.latency.record(self.latency_key, time.monotonic() - start, len(items))
+            return pcm
+        except Exception as e:
+            if is_rate_limited(e):
+                if is_daily_quota_error(e):
+                    self.scheduler.exhaust_today()
+                    raise BackendUnavailable("日次クォータ超過") from e
+                wait = retry_delay(e) or GEMINI_RATE_LIMIT_WAIT
+                self.scheduler.pause(wait)
+                raise BackendThrottled(f"レートリミット ({wait:.0f}秒待機)", wait) from e
+            raise BackendError(str(e)) from e
+
+    def synthesize(self, items: list) -> list[tuple[bytes, int]]:
+        from tts_silence import SilenceEnvelope
+
+        pcm = self._request(items)
+        if len(items) == 1:
+            return [(pcm, GEMINI_SAMPLE_RATE)]
+        with METRICS.stage("split"):
+            envelope = SilenceEnvelope(pcm, GEMINI_SAMPLE_RATE)
+            ranges = find_split_ranges(envelope, len(items), self.split_mode)
+        if ranges is None:
+            METRICS.count("fallbacks")
+            mid = (len(items) + 1) // 2
+            return self.synthesize(items[:mid]) + self.synthesize(items[mid:])
+        return [(_slice_pcm(pcm, GEMINI_SAMPLE_RATE, start, end), GEMINI_SAMPLE_RATE)
+                for start, end in ranges]
+
+
+class CloudTtsBackend:
+    """Google Cloud TTS（REST）。LINEAR16 で受け取る。
+
+    batch_size > 1 なら同じ言語の複数アイテムを SSML 1リクエストで合成し、<mark> の時刻で切る
+    （SSML 非対応のボイスと、タイムポイントが揃わなかったバッチは1件ずつ合成し直す）。
+    """
+
+    name = "cloud-tts"
+    default_latency = 0.3
+
+    def __init__(self, api_key: str | None, voice_ja: str = CLOUD_VOICE_JA,
+                 voice_en: str = CLOUD_VOICE_EN, rate_ja: float = CLOUD_RATE_JA,
+                 rate_en: float = CLOUD_RATE_EN, concurrency: int = 4,
+                 latency: LatencyHistory | None = None, batch_size: int = 1):
+        self.api_key = api_key
+        self.voices = {"ja": (voice_ja, "ja-JP", rate_ja), "en": (voice_en, "en-US", rate_en)}
+        self.concurrency = concurrency
+        self.latency = latency
+        self.max_batch = max(1, batch_size)
+        # 履歴はボイスごと（generate-audio-cloud-tts.py と共通）。ルーターは日本語ボイスで代表させる
+        self.latency_key = latency_key(self.name, voice_ja)
+
+    def cache_key(self, item: dict) -> str:
+        voice, _lang_code, rate = self.voices[item["lang"]]
+        return cloud_cache_key(item, voice, rate)
+
+    def batch_limit(self, item: dict) -> int:
+        return self.max_batch if supports_ssml_marks(self.voices[item["lang"]][0]) else 1
+
+    def billed_chars(self, items: list) -> int:
+        if len(items) > 1 and supports_ssml_marks(self.voices[items[0]["lang"]][0]):
+            return len(build_marked_ssml([item["text"] for item in items]))
+        return sum(len(item["text"]) for item in items)
+
+    def unavailable(self) -> str | None:
+        return None if self.api_key else "GOOGLE_API_KEY が未設定"
+
+    def _call(self, fn, *args):
+        """API を呼び、失敗をバックエンドの例外に変換する。応答時間を記録する。"""
+        voice = args[1]
+        try:
+            start = time.monotonic()
+            result = fn(*args)
+        except urllib.error.HTTPError as e:
+            raise cloud_http_error(e) from e
+        except (OSError, http.client.HTTPException, KeyError) as e:
+            raise BackendError(str(e)) from e
+        if self.latency is not None:
+            items = len(args[0]) if isinstance(args[0], list) else 1
+            self.latency.record(latency_key(self.name, voice), time.monotonic() - start, items)
+        return result
+
+    def synthesize(self, items: list) -> list[tuple[bytes, int]]:
+        voice, lang_code, rate = self.voices[items[0]["lang"]]
+        if len(items) > 1 and supports_ssml_marks(voice):
+            try:
+                clips, sample_rate = self._call(synthesize_marked, [item["text"] for item in items],
+                                                voice, lang_code, rate, self.api_key)
+                return [(clip, sample_rate) for clip in clips]
+            except ValueError:
+                METRICS.count("fallbacks")   # タイムポイントが揃わなければ1件ずつ合成する
+        results = []
+        for item in items:
+            voice, lang_code, rate = self.voices[item["lang"]]
+            wav_data = self._call(synthesize, item["text"], voice, lang_code, rate,
+                                  self.api_key, "LINEAR16")
+            try:
+                with wave.open(io.BytesIO(wav_data), "rb") as wf:
+                    results.append((wf.readframes(wf.getnframes()), wf.getframerate()))
+            except (wave.Error, EOFError) as e:
+                raise BackendError(f"WAV を読めません: {e}") from e
+        return results
+
+
+class GttsBackend:
+    """gTTS（Google 翻訳の読み上げ）。非公式 API なので1本ずつ、最後の手段として使う。
+
+    MP3 で返るので ffmpeg で PCM にデコードする（ほかのバックエンドと同じくプロファイルで再エンコード）。
+    """
+
+    name = "gtts"
+    max_batch = 1
+    default_latency = 1.0
+
+    def __init__(self, concurrency: int = 1, sample_rate: int = LINEAR16_SAMPLE_RATE,
+                 latency: LatencyHistory | None = None):
+        self.concurrency = concurrency
+        self.sample_rate = sample_rate
+        self.latency = latency
+        self.latency_key = latency_key(self.name, "translate")
+
+    def cache_key(self, item: dict) -> str:
+        return synthesis_key(speech=item["text"], voice=item["lang"], backend=self.name)
+
+    def batch_limit(self, item: dict) -> int:
+        return 1
+
+    def billed_chars(self, items: list) -> int:
+        return 0   # 課金なし
+
+    def unavailable(self) -> str | None:
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return "gTTS が未インストール"
+        return None
+
+    def synthesize(self, items: list) -> list[tuple[bytes, int]]:
+        from gtts import gTTS
+        from gtts.tts import gTTSError
+
+        from tts_encode import decode_batch
+
+        with tempfile.TemporaryDirectory(prefix="tts-gtts-") as tmp_dir:
+            paths = []
+            for i, item in enumerate(items):
+                path = os.path.join(tmp_dir, f"{i}.mp3")
+                try:
+                    start = time.monotonic()
+                    gTTS(text=item["text"], lang=item["lang"], slow=False).save(path)
+                    if self.latency is not None:
+                        self.latency.record(self.latency_key, time.monotonic() - start)
+                except gTTSError as e:
+                    status = getattr(getattr(e, "rsp", None), "status_code", None)
+                    if status == 429:
+                        raise BackendThrottled("レートリミット", GTTS_RATE_LIMIT_WAIT) from e
+                    raise BackendError(str(e)) from e
+                paths.append(path)
+            try:
+                pcms = decode_batch(paths, self.sample_rate)
+            except RuntimeError as e:
+                raise BackendError(str(e)) from e
+        return [(pcm, self.sample_rate) for pcm in pcms]
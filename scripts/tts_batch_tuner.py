@@ -0,0 +1,116 @@
+"""Gemini バッチ生成のバッチサイズ自動調整。
+
+無音分割の成否を (言語, アプリ, ボイス, モデル) ごとにバッチサイズ別で記録し、
+次回の実行で「1リクエストあたりの期待生成件数」が最大になるサイズを選ぶ。
+
+成功確率の推定:
+  分割の難しさはバッチサイズに対して単調と仮定し、
+    サイズ s 以上で成功した回数 → s でも成功したとみなす
+    サイズ s 以下で失敗した回数 → s でも失敗したとみなす
+  として数え、(成功+1) / (成功+失敗+2) を p(s) とする。
+
+期待コスト:
+  分割に失敗したバッチは半分ずつ再生成する（generate_batch の二分割）ので、
+    R(1) = 1
+    R(s) = 1 + (1 - p(s)) * (R(ceil(s/2)) + R(floor(s/2)))
+  がサイズ s のバッチを全件生成するまでの期待リクエスト数。s / R(s) を最大化する。
+
+探索範囲は「これまで成功した最大サイズ × GROWTH_FACTOR」まで（初回は初期値まで）に
+制限するため、きれいに分割できるたびに少しずつ大きくなり、失敗が続けば小さくなる。
+
+記録は scripts/gemini-batch-history.json（マシンごとのデータなので git 管理外）。
+"""
+
+import json
+import math
+import os
+from functools import lru_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(SCRIPT_DIR, "gemini-batch-history.json")
+HISTORY_VERSION = 1
+
+GROWTH_FACTOR = 1.5
+MIN_BATCH_SIZE = 2
+MAX_BATCH_SIZE = 100
+
+
+def profile_key(lang: str, app_id: str, voice: str, model: str) -> str:
+    """履歴を分ける単位のキー。"""
+    return f"{lang}|{app_id}|{voice}|{model}"
+
+
+class BatchSizeTuner:
+    """分割成否の履歴と、それに基づくバッチサイズの選択。"""
+
+    def __init__(self, path: str | None = None, initial_size: int = 50):
+        self.path = path or HISTORY_PATH
+        self.initial_size = initial_size
+        self.profiles = {}
+        self._dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == HISTORY_VERSION:
+                self.profiles = data.get("profiles", {})
+
+    def record(self, key: str, size: int, ok: bool):
+        """サイズ size のバッチの分割結果を記録する。"""
+        if size < MIN_BATCH_SIZE:
+            return
+        sizes = self.profiles.setdefault(key, {}).setdefault("sizes", {})
+        counts = sizes.setdefault(str(size), {"ok": 0, "fail": 0})
+        counts["ok" if ok else "fail"] += 1
+        self._dirty = True
+
+    def _counts(self, key: str) -> dict[int, tuple[int, int]]:
+        sizes = self.profiles.get(key, {}).get("sizes", {})
+        return {int(s): (c["ok"], c["fail"]) for s, c in sizes.items()}
+
+    def success_rate(self, key: str, size: int) -> float:
+        """サイズ size での分割成功確率の推定値。"""
+        if size < MIN_BATCH_SIZE:
+            return 1.0
+        counts = self._counts(key)
+        ok = sum(o for s, (o, _f) in counts.items() if s >= size)
+        fail = sum(f for s, (_o, f) in counts.items() if s <= size)
+        return (ok + 1) / (ok + fail + 2)
+
+    def expected_requests(self, key: str, size: int) -> float:
+        """サイズ size のバッチを二分割フォールバック込みで生成する期待リクエスト数。"""
+
+        @lru_cache(maxsize=None)
+        def cost(s: int) -> float:
+            if s <= 1:
+                return 1.0
+            p = self.success_rate(key, s)
+            return 1.0 + (1.0 - p) * (cost(math.ceil(s / 2)) + cost(s // 2))
+
+        return cost(size)
+
+    def choose(self, key: str) -> int:
+        """次に使うバッチサイズ（1リクエストあたりの期待生成件数が最大のもの）。"""
+        counts = self._counts(key)
+        if not counts:
+            return self.initial_size
+        best_ok = max((s for s, (o, _f) in counts.items() if o > 0), default=0)
+        if best_ok:
+            limit = int(best_ok * GROWTH_FACTOR)
+        else:
+            # まだ一度も分割できていなければ、失敗した最小サイズの半分から出直す
+            limit = min(counts) // 2
+        limit = min(max(limit, MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+        return max(range(1, limit + 1),
+                   key=lambda s: s / self.expected_requests(key, s))
+
+    def save(self):
+        """履歴を書き出す。"""
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": HISTORY_VERSION, "profiles": self.profiles},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
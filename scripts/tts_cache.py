@@ -0,0 +1,222 @@
+"""音声生成スクリプト共通の合成キャッシュ（マニフェスト）。
+
+出力ファイルごとに「どの入力で合成したか」のハッシュを記録し、
+入力（読み上げテキスト・補足・ボイス・話速・モデル・バックエンド）が
+変わったファイルだけを再生成できるようにする。
+
+マニフェストは scripts/tts-manifest.json に保存する:
+  {
+    "version": 1,
+    "entries": {
+      "hiragana-flash/あひる.mp3": {"key": "<sha256>", "backend": "...", ...},
+      ...
+    }
+  }
+
+パスは AUDIO_BASE_DIR からの相対パス（区切りは "/"）で記録する。
+
+同じ合成キーの出力先が複数ある（英語フラッシュの "orange" が果物と色で2回ある、
+別のアプリと同じ読み上げがある など）場合は SharedClips で1回の合成にまとめ、
+できたファイルを他の出力先にハードリンク（できなければコピー）で配る。
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from tts_encode import ENCODING_PROFILES, profile_path
+from tts_journal import link_file_atomic
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_BASE_DIR = os.path.join(SCRIPT_DIR, "..", "edup-app", "public", "audio")
+MANIFEST_PATH = os.path.join(SCRIPT_DIR, "tts-manifest.json")
+MANIFEST_VERSION = 1
+
+
+def synthesis_key(*, speech: str, context: str = "", voice: str,
+                  rate: float | None = None, model: str | None = None,
+                  backend: str) -> str:
+    """合成入力からキャッシュキー（SHA-256 の16進文字列）を作る。"""
+    payload = json.dumps({
+        "speech": speech,
+        "context": context or "",
+        "voice": voice,
+        "rate": rate,
+        "model": model,
+        "backend": backend,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """出力ファイル → 合成キーのマニフェスト。"""
+
+    def __init__(self, path: str | None = None, base_dir: str | None = None):
+        self.path = path or MANIFEST_PATH
+        self.base_dir = os.path.abspath(base_dir or AUDIO_BASE_DIR)
+        self.entries = {}
+        self.adopted = 0
+        self._dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("entries", {})
+
+    def _rel(self, filepath: str) -> str:
+        rel = os.path.relpath(os.path.abspath(filepath), self.base_dir)
+        return rel.replace(os.sep, "/")
+
+    def is_fresh(self, filepath: str, key: str) -> bool:
+        """ファイルが存在し、記録済みのキーが一致すれば True。
+
+        マニフェスト導入前から存在するファイル（記録なし）は現在の入力で
+        生成されたものとみなして取り込む。以後の入力変更は検出される。
+        """
+        if not os.path.exists(filepath):
+            return False
+        entry = self.entries.get(self._rel(filepath))
+        if entry is None:
+            self.record(filepath, key)
+            self.adopted += 1
+            return True
+        return entry.get("key") == key
+
+    def record(self, filepath: str, key: str, **meta):
+        """生成済みファイルのキーを記録する（保存は save() で行う）。"""
+        entry = {"key": key}
+        entry.update(meta)
+        self.entries[self._rel(filepath)] = entry
+        self._dirty = True
+
+    def entry(self, filepath: str) -> dict | None:
+        """ファイルの記録（なければ None）。"""
+        return self.entries.get(self._rel(filepath))
+
+    def invalidate(self, filepath: str, reason: str = ""):
+        """記録を無効にし、次回の実行で再生成させる。
+
+        記録を消すだけだと既存ファイルが is_fresh で取り込み直されるので、
+        どのキーとも一致しない記録（key: None）に置き換える。
+        """
+        entry = {"key": None}
+        if reason:
+            entry["invalid"] = reason
+        self.entries[self._rel(filepath)] = entry
+        self._dirty = True
+
+    def save(self):
+        """マニフェストを書き出す。途中で中断されても壊れないよう置き換えで保存。"""
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def _profile_files(filepath: str, profiles) -> list[str]:
+    """filepath とプロファイルごとの出力ファイル（.opus など）のパス。"""
+    paths = [filepath]
+    for profile in profiles or ():
+        if profile in ENCODING_PROFILES and profile_path(filepath, profile) not in paths:
+            paths.append(profile_path(filepath, profile))
+    return paths
+
+
+class SharedClips:
+    """同じ合成キーの出力先をまとめ、1回の合成結果を全ての出力先に配る。
+
+    dedupe() で生成対象を絞り、代表の出力先を書き込んで record() した後に
+    written() を呼ぶと、同じキーの他の出力先にファイルを配って記録する。
+    written() は複数スレッドから呼んでよい。
+    """
+
+    def __init__(self, cache: SynthesisCache, profiles: list | None):
+        self.cache = cache
+        self.profiles = list(profiles or [])
+        self.followers = {}     # 代表の filepath -> [同じキーの他の filepath]
+        self.reused = 0         # 以前の実行のファイルを配った件数
+        self.merged = 0         # 今回の生成対象のうち他の出力先とまとめた件数
+        self.fanned_out = 0     # written() で配った件数
+        self._lock = threading.Lock()
+
+    def _reusable(self, rel: str) -> bool:
+        """記録済みのファイルが今回のプロファイルを全て含んでいれば True。"""
+        entry = self.cache.entries[rel]
+        recorded = entry.get("profiles")
+        if recorded is None:
+            # 取り込んだだけの既存ファイル（.mp3 のみ）
+            return all(profile not in ENCODING_PROFILES
+                       or ENCODING_PROFILES[profile][0] == ".mp3" for profile in self.profiles)
+        return set(self.profiles) <= set(recorded)
+
+    def _copy(self, src: str, dst: str, key: str):
+        entry = self.cache.entry(src)
+        for src_path, dst_path in zip(_profile_files(src, entry.get("profiles")),
+                                      _profile_files(dst, entry.get("profiles"))):
+            if os.path.exists(src_path):
+                link_file_atomic(src_path, dst_path)
+        meta = {name: value for name, value in entry.items()
+                if name not in ("key", "shared_from")}
+        self.cache.record(dst, key, shared_from=self.cache._rel(src), **meta)
+
+    def dedupe(self, pending: list, target, reuse: bool = True, dry_run: bool = False) -> list:
+        """pending から、合成しなくてよいものを除いたリストを返す。
+
+        target(entry) は (出力先の filepath, 合成キーのリスト) を返す関数。
+        キーはバックエンドごとの候補で、複数バックエンドを使うときは全バックエンド分を渡す。
+          - 以前の実行で同じキーのファイルができていれば、それを配って生成対象から外す
+          - 今回の生成対象どうしでキーが全て同じものは最初の1件だけを残す
+            （出力先も同じなら1件にまとめ、違えば written() で配る）
+        reuse=False（--force）では以前の実行のファイルを使わない。
+        dry_run では配らずに件数だけ数える（--plan 用）。
+        """
+        by_key = {}
+        for rel, entry in self.cache.entries.items():
+            if entry.get("key"):
+                by_key.setdefault(entry["key"], []).append(rel)
+
+        unique = []
+        primaries = {}   # キーの組 -> 代表の filepath
+        for entry in pending:
+            filepath, keys = target(entry)
+            source = reuse and next((
+                (os.path.join(self.cache.base_dir, rel), key)
+                for key in keys for rel in by_key.get(key, ())
+                if rel != self.cache._rel(filepath)
+                and os.path.exists(os.path.join(self.cache.base_dir, rel))
+                and self._reusable(rel)), None)
+            if source:
+                if not dry_run:
+                    self._copy(source[0], filepath, source[1])
+                self.reused += 1
+                continue
+            group = tuple(keys)
+            primary = primaries.get(group)
+            if primary is None:
+                primaries[group] = filepath
+                unique.append(entry)
+                continue
+            self.merged += 1
+            if os.path.abspath(primary) != os.path.abspath(filepath):
+                followers = self.followers.setdefault(primary, [])
+                if filepath not in followers:
+                    followers.append(filepath)
+        return unique
+
+    def written(self, filepath: str) -> int:
+        """代表の出力先を書き込んで記録した後に呼ぶ。同じキーの他の出力先に配った件数を返す。"""
+        followers = self.followers.get(filepath, ())
+        entry = self.cache.entry(filepath)
+        if not followers or entry is None:
+            return 0
+        for follower in followers:
+            self._copy(filepath, follower, entry["key"])
+        with self._lock:
+            self.fanned_out += len(followers)
+        return len(followers)
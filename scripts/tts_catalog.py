@@ -0,0 +1,219 @@
+"""全アプリの読み上げ項目の定義（全バックエンド共通のカタログ）。
+
+各アイテムは以下の形式:
+  filename: 出力ファイル名
+  lang:     言語 ("ja" or "en")
+  speech:   Gemini に読ませるテキスト（ひらがな単語はそのまま）
+  context:  同音異義語の区別等、Gemini への補足情報（空文字可）
+  text:     Cloud TTS / gTTS に渡すテキスト。文脈を渡せないバックエンド向けに、
+            漢字で正しく読めるものは漢字、誤読されやすいものはカタカナ/ひらがなにする
+
+語彙を変えるときはここだけを直す（アプリ側のデータとも同期すること）。
+"""
+
+import os
+
+
+def get_dots_items():
+    """ドッツカード: 「これは N です」(1-100)"""
+    items = []
+    for n in range(1, 101):
+        items.append({
+            "filename": f"{n}.mp3",
+            "speech": f"これは{n}です",
+            "context": "",
+            "text": f"これは{n}です",
+            "lang": "ja",
+        })
+    return items
+
+
+def get_dots_math_items():
+    """ドッツ計算: 演算子 + 数字(1-100)"""
+    items = []
+    operators = [
+        ("plus.mp3", "たす", "足し算の「たす」"),
+        ("minus.mp3", "ひく", "引き算の「ひく」"),
+        ("wa.mp3", "わ", "「〜は」の助詞"),
+    ]
+    for filename, speech, context in operators:
+        items.append({
+            "filename": filename,
+            "speech": speech,
+            "context": context,
+            "text": speech,
+            "lang": "ja",
+        })
+    for n in range(1, 101):
+        items.append({
+            "filename": f"{n}.mp3",
+            "speech": str(n),
+            "context": f"数字の{n}",
+            "text": str(n),
+            "lang": "ja",
+        })
+    return items
+
+
+def get_hiragana_flash_items():
+    """ひらがなフラッシュ: 日本語単語
+
+    4つ組: (ファイル名・Gemini 用ひらがな, 表示用漢字, 絵文字, Cloud TTS / gTTS 用テキスト)
+    Gemini には漢字と絵文字を補足として渡す。コンポーネントの HIRAGANA_DATA と同期。
+    """
+    data = [
+        # あ行
+        ("あり", "蟻", "🐜", "蟻"), ("あめ", "飴", "🍬", "飴"), ("あひる", "家鴨", "🦆", "アヒル"),
+        ("いぬ", "犬", "🐕", "犬"), ("いちご", "苺", "🍓", "苺"), ("いるか", "海豚", "🐬", "イルカ"),
+        ("うし", "牛", "🐄", "うし"), ("うさぎ", "兎", "🐰", "ウサギ"), ("うみ", "海", "🌊", "海"),
+        ("えび", "海老", "🦐", "海老"), ("えんぴつ", "鉛筆", "✏️", "鉛筆"),
+        ("おに", "鬼", "👹", "おに"), ("おばけ", "お化け", "👻", "お化け"),
+        # か行
+        ("かに", "蟹", "🦀", "カニ"), ("かさ", "傘", "☂️", "傘"), ("かめ", "亀", "🐢", "亀"),
+        ("きつね", "狐", "🦊", "狐"), ("きのこ", "茸", "🍄", "キノコ"),
+        ("くま", "熊", "🐻", "熊"), ("くじら", "鯨", "🐋", "鯨"), ("くるま", "車", "🚗", "車"),
+        ("けむし", "毛虫", "🐛", "毛虫"), ("けーき", "ケーキ", "🎂", "ケーキ"),
+        ("こあら", "コアラ", "🐨", "コアラ"), ("こいのぼり", "鯉のぼり", "🎏", "鯉のぼり"),
+        # さ行
+        ("さる", "猿", "🐵", "猿"), ("さかな", "魚", "🐟", "魚"),
+        ("しか", "鹿", "🦌", "鹿"), ("しんかんせん", "新幹線", "🚄", "新幹線"),
+        ("すいか", "西瓜", "🍉", "スイカ"), ("すし", "寿司", "🍣", "寿司"),
+        ("せんす", "扇子", "🪭", "扇子"), ("せんべい", "煎餅", "🍘", "煎餅"),
+        ("そら", "空", "🌤️", "空"), ("そり", "橇", "🛷", "ソリ"),
+        # た行
+        ("たこ", "蛸", "🐙", "蛸"), ("たいよう", "太陽", "☀️", "太陽"),
+        ("ちょう", "蝶", "🦋", "蝶"), ("ちーず", "チーズ", "🧀", "チーズ"),
+        ("つき", "月", "🌙", "月"), ("つばめ", "燕", "🐦", "ツバメ"),
+        ("てんとうむし", "天道虫", "🐞", "テントウムシ"), ("てがみ", "手紙", "💌", "手紙"),
+        ("とら", "虎", "🐯", "虎"), ("とけい", "時計", "⏰", "時計"),
+        # な行
+        ("なす", "茄子", "🍆", "茄子"), ("なると", "鳴門", "🍥", "なると"),
+        ("にわとり", "鶏", "🐔", "ニワトリ"), ("にじ", "虹", "🌈", "虹"),
+        ("ぬいぐるみ", "縫いぐるみ", "🧸", "ぬいぐるみ"),
+        ("ねこ", "猫", "🐱", "猫"), ("ねずみ", "鼠", "🐭", "ネズミ"),
+        ("のり", "海苔", "🍙", "ノリ"),
+        # は行
+        ("はな", "花", "🌸", "花"), ("はち", "蜂", "🐝", "蜂"),
+        ("ひよこ", "雛", "🐤", "ヒヨコ"), ("ひこうき", "飛行機", "✈️", "飛行機"),
+        ("ふくろう", "梟", "🦉", "フクロウ"), ("ふね", "船", "🚢", "船"),
+        ("へび", "蛇", "🐍", "蛇"),
+        ("ほし", "星", "⭐", "星"), ("ほうき", "箒", "🧹", "ホウキ"),
+        # ま行
+        ("まめ", "豆", "🫘", "豆"), ("まと", "的", "🎯", "まと"),
+        ("みかん", "蜜柑", "🍊", "ミカン"), ("みず", "水", "💧", "みず"),
+        ("むし", "虫", "🐛", "虫"),
+        ("め", "目", "👁️", "目"), ("めだまやき", "目玉焼き", "🍳", "目玉焼き"),
+        ("もも", "桃", "🍑", "桃"), ("もり", "森", "🌲", "森"),
+        # や行
+        ("やま", "山", "⛰️", "山"), ("やきいも", "焼き芋", "🍠", "焼き芋"),
+        ("ゆき", "雪", "❄️", "雪"), ("ゆびわ", "指輪", "💍", "指輪"),
+        ("よっと", "ヨット", "⛵", "ヨット"),
+        # ら行
+        ("らいおん", "ライオン", "🦁", "ライオン"), ("らっこ", "ラッコ", "🦦", "ラッコ"),
+        ("りんご", "林檎", "🍎", "リンゴ"), ("りす", "栗鼠", "🐿️", "リス"),
+        ("るびー", "ルビー", "💎", "ルビー"), ("れもん", "レモン", "🍋", "レモン"),
+        ("ろうそく", "蝋燭", "🕯️", "ロウソク"), ("ろけっと", "ロケット", "🚀", "ロケット"),
+        # わ行
+        ("わに", "鰐", "🐊", "ワニ"),
+        # 濁音 が行
+        ("がっこう", "学校", "🏫", "学校"), ("がいこつ", "骸骨", "💀", "ガイコツ"),
+        ("ぎたー", "ギター", "🎸", "ギター"), ("ぎゅうにゅう", "牛乳", "🥛", "牛乳"),
+        ("ぐー", "グー", "✊", "グー"),
+        ("げーむ", "ゲーム", "🎮", "ゲーム"),
+        ("ごりら", "ゴリラ", "🦍", "ゴリラ"), ("ごはん", "御飯", "🍚", "ごはん"),
+        # 濁音 ざ行
+        ("ざりがに", "ザリガニ", "🦞", "ザリガニ"),
+        ("じしゃく", "磁石", "🧲", "磁石"), ("じてんしゃ", "自転車", "🚲", "自転車"),
+        ("ずぼん", "ズボン", "👖", "ズボン"), ("ぜりー", "ゼリー", "🍮", "ゼリー"),
+        ("ぞう", "象", "🐘", "象"),
+        # 濁音 だ行
+        ("だんご", "団子", "🍡", "団子"),
+        ("でんしゃ", "電車", "🚃", "電車"), ("でんわ", "電話", "📞", "電話"),
+        ("どんぐり", "団栗", "🌰", "ドングリ"), ("どーなつ", "ドーナツ", "🍩", "ドーナツ"),
+        # 濁音 ば行
+        ("ばなな", "バナナ", "🍌", "バナナ"), ("ばった", "飛蝗", "🦗", "バッタ"),
+        ("びーだま", "ビー玉", "🔮", "ビー玉"),
+        ("ぶどう", "葡萄", "🍇", "葡萄"), ("ぶた", "豚", "🐷", "豚"),
+        ("べる", "ベル", "🔔", "ベル"),
+        ("ぼうし", "帽子", "🎩", "帽子"), ("ぼーる", "ボール", "⚽", "ボール"),
+        # 半濁音 ぱ行
+        ("ぱんだ", "パンダ", "🐼", "パンダ"), ("ぱいなっぷる", "パイナップル", "🍍", "パイナップル"),
+        ("ぴあの", "ピアノ", "🎹", "ピアノ"), ("ぷーる", "プール", "🏊", "プール"),
+        ("ぺんぎん", "ペンギン", "🐧", "ペンギン"),
+        ("ぽすと", "ポスト", "📮", "ポスト"), ("ぽっぷこーん", "ポップコーン", "🍿", "ポップコーン"),
+    ]
+    items = []
+    for word, kanji, emoji, text in data:
+        items.append({
+            "filename": f"{word}.mp3",
+            "speech": word,
+            "context": f"{kanji}{emoji}",
+            "text": text,
+            "lang": "ja",
+        })
+    return items
+
+
+def get_english_flash_items():
+    """英語フラッシュ: 英単語"""
+    words = [
+        "dog", "cat", "bird", "fish", "rabbit", "bear", "elephant", "lion",
+        "monkey", "pig", "cow", "horse", "sheep", "chicken", "duck", "frog",
+        "turtle", "penguin", "whale", "butterfly", "giraffe", "zebra", "snake",
+        "owl", "dolphin",
+        "apple", "banana", "orange", "grape", "strawberry", "watermelon",
+        "peach", "cherry", "bread", "rice", "egg", "milk", "cake", "cookie",
+        "ice cream", "pizza", "tomato", "corn", "carrot", "lemon",
+        "chocolate", "cheese", "donut", "pineapple", "mushroom",
+        "car", "bus", "train", "airplane", "bicycle", "boat", "rocket",
+        "star", "sun", "moon", "rainbow", "flower", "tree", "house", "book",
+        "pencil", "clock", "umbrella", "hat", "shoe", "key", "bell", "ball",
+        "guitar", "camera",
+        "eye", "ear", "hand", "foot", "heart", "nose", "mouth", "tooth",
+        "leg", "bone", "brain", "muscle", "finger", "face", "tongue",
+        "fire", "water", "snow", "cloud", "mountain", "rain", "wind",
+        "thunder", "ocean", "river", "leaf", "rock", "sand", "earth", "volcano",
+        "red", "blue", "green", "yellow", "orange", "purple", "pink",
+        "white", "black", "brown",
+    ]
+    items = []
+    for w in words:
+        items.append({
+            "filename": w.replace(" ", "-") + ".mp3",
+            "speech": w,
+            "context": "",
+            "text": w,
+            "lang": "en",
+        })
+    return items
+
+
+# アプリ定義
+APPS = {
+    "dots": {
+        "label": "ドッツカード",
+        "output_dir": "dots",
+        "get_items": get_dots_items,
+    },
+    "dots-math": {
+        "label": "ドッツ計算",
+        "output_dir": "dots-math",
+        "get_items": get_dots_math_items,
+    },
+    "hiragana-flash": {
+        "label": "ひらがなフラッシュ",
+        "output_dir": "hiragana-flash",
+        "get_items": get_hiragana_flash_items,
+    },
+    "english-flash": {
+        "label": "英語フラッシュ",
+        "output_dir": "english-flash",
+        "get_items": get_english_flash_items,
+    },
+}
+
+
+def catalog_items(app_ids: list, audio_base_dir: str) -> list[tuple[str, str, dict]]:
+    """指定アプリの全アイテムを (app_id, 出力ディレクトリ, item) で返す。"""
+    return [(app_id, os.path.join(audio_base_dir, APPS[app_id]["output_dir"]), item)
+            for app_id in app_ids for item in APPS[app_id]["get_items"]()]
@@ -0,0 +1,133 @@
+"""ドッツ計算の等式音声（「a たす b わ c」）を1ファイルに合成する。
+
+DotsCardMath は等式ごとに 数字 → 演算子 → 数字 → わ → 答え の5ファイルを
+順に読み込んで再生しているため、ファイルごとに読み込み・デコードの待ちが入る。
+ここでは public/audio/dots-math/ の個別クリップを PCM に戻して連結し、
+等式1つを1本の MP3 にする。
+
+合成済みの等式はディスク上の LRU キャッシュに置く。最終利用時刻は
+ファイルの mtime で持つので、プロセスを再起動しても使用順が引き継がれる。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from tts_encode import decode_batch, encode_mp3_batch
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, "equation-cache")
+
+COMPOSE_SAMPLE_RATE = 24000
+COMPOSE_BITRATE = "64k"
+DEFAULT_GAP_MS = 100        # クリップ間に挟む無音 (ms)
+DEFAULT_CACHE_SIZE = 500    # キャッシュに残す等式の数
+
+OPERATORS = {"plus": "plus.mp3", "minus": "minus.mp3"}
+MIN_NUMBER = 1
+MAX_NUMBER = 100
+
+
+def equation_answer(a: int, op: str, b: int) -> int:
+    """等式の答え。クリップがない数になる場合は ValueError。"""
+    if op not in OPERATORS:
+        raise ValueError(f"unknown operator: {op}")
+    answer = a + b if op == "plus" else a - b
+    for n in (a, b, answer):
+        if not MIN_NUMBER <= n <= MAX_NUMBER:
+            raise ValueError(f"number out of range ({MIN_NUMBER}-{MAX_NUMBER}): {n}")
+    return answer
+
+
+def equation_filename(a: int, op: str, b: int) -> str:
+    """合成ファイル名（例: 3-plus-4.mp3）。"""
+    return f"{a}-{op}-{b}.mp3"
+
+
+def equation_clips(a: int, op: str, b: int) -> list[str]:
+    """等式を構成する dots-math のクリップ名（再生順）。"""
+    answer = equation_answer(a, op, b)
+    return [f"{a}.mp3", OPERATORS[op], f"{b}.mp3", "wa.mp3", f"{answer}.mp3"]
+
+
+class EquationComposer:
+    """dots-math のクリップから等式音声を合成し、LRU でディスクに保持する。
+
+    max_entries=None なら追い出さない（ビルド時の一括生成用）。
+    複数スレッドから get() を呼んでよい。
+    """
+
+    def __init__(self, clip_dir: str, cache_dir: str | None = None,
+                 max_entries: int | None = DEFAULT_CACHE_SIZE,
+                 gap_ms: int = DEFAULT_GAP_MS):
+        self.clip_dir = clip_dir
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_entries = max_entries
+        self.gap = b"\0\0" * (COMPOSE_SAMPLE_RATE * gap_ms // 1000)
+        self.hits = 0
+        self.misses = 0
+        self._clips = {}    # クリップ名 -> PCM
+        self._lru = OrderedDict()   # ファイル名 -> None（古い順）
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cached = [name for name in os.listdir(self.cache_dir) if name.endswith(".mp3")]
+        cached.sort(key=lambda name: os.path.getmtime(os.path.join(self.cache_dir, name)))
+        for name in cached:
+            self._lru[name] = None
+
+    def _load_clips(self, names: list):
+        """未読み込みのクリップをまとめてデコードする（呼び出し側でロック済み）。"""
+        missing = [name for name in dict.fromkeys(names) if name not in self._clips]
+        if not missing:
+            return
+        paths = [os.path.join(self.clip_dir, name) for name in missing]
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+        for name, pcm in zip(missing, decode_batch(paths, COMPOSE_SAMPLE_RATE)):
+            self._clips[name] = pcm
+
+    def compose(self, a: int, op: str, b: int) -> bytes:
+        """等式音声の MP3 バイト列を合成する（キャッシュは使わない）。"""
+        names = equation_clips(a, op, b)
+        with self._lock:
+            self._load_clips(names)
+            pcm = self.gap.join(self._clips[name] for name in names)
+        [mp3_data] = encode_mp3_batch([pcm], COMPOSE_SAMPLE_RATE, COMPOSE_BITRATE)
+        return mp3_data
+
+    def get(self, a: int, op: str, b: int) -> str:
+        """等式音声のファイルパスを返す。キャッシュになければ合成する。"""
+        name = equation_filename(a, op, b)
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if name in self._lru and os.path.exists(path):
+                self._lru.move_to_end(name)
+                os.utime(path)
+                self.hits += 1
+                return path
+
+        mp3_data = self.compose(a, op, b)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(mp3_data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.misses += 1
+            self._lru[name] = None
+            self._lru.move_to_end(name)
+            self._evict()
+        return path
+
+    def _evict(self):
+        """max_entries を超えた分を古い順に削除する（呼び出し側でロック済み）。"""
+        if self.max_entries is None:
+            return
+        while len(self._lru) > self.max_entries:
+            name, _ = self._lru.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,215 @@
+"""複数クリップを1回の ffmpeg 起動でまとめてエンコード／デコードする。
+
+pydub の AudioSegment.export はクリップごとに ffmpeg プロセスと一時ファイルを
+作るため、数百クリップのエンコードではプロセス起動が処理時間の大半を占める。
+ここでは全クリップの PCM を1つの ffmpeg の標準入力へ順に流し（連結したコピーは作らない）、
+filter_complex の asplit + atrim でクリップごとに切り出して、
+それぞれを別ファイルとして出力する。デコード（decode_batch）も同様に
+複数の入力ファイルを1プロセスで PCM に戻す。
+
+encode_batch は同じ PCM（マスター）から複数のエンコードプロファイル
+（低ビットレート MP3・Opus など）を同じ1回の ffmpeg 起動で出力する。
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from tts_metrics import METRICS
+
+DEFAULT_BITRATE = "128k"
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+# エンコードプロファイル: 名前 -> (拡張子, ffmpeg の出力オプション)
+# 24kHz モノラルの短い音声なので、128k は過剰。MP3 は 48k、Opus は 24〜32k で十分聞き取れる。
+ENCODING_PROFILES = {
+    "mp3-128k": (".mp3", ["-c:a", "libmp3lame", "-b:a", "128k", "-f", "mp3"]),
+    "mp3-64k": (".mp3", ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"]),
+    "mp3-48k": (".mp3", ["-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3"]),
+    "mp3-32k": (".mp3", ["-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3"]),
+    "opus-32k": (".opus", ["-c:a", "libopus", "-b:a", "32k", "-application", "voip", "-f", "ogg"]),
+    "opus-24k": (".opus", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"]),
+}
+DEFAULT_PROFILES = ["mp3-128k"]
+
+
+def find_ffmpeg() -> str:
+    """ffmpeg の実行ファイルパス（見つからなければコマンド名のまま）。"""
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+
+def parse_profiles(text: str) -> list[str]:
+    """カンマ区切りのプロファイル名を検証してリストにする。
+
+    アプリは .mp3 を読み込むので MP3 のプロファイルがちょうど1つ必要。
+    同じ拡張子のプロファイルは複数指定できない（出力先が重なるため）。
+    """
+    profiles = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in profiles if name not in ENCODING_PROFILES]
+    if unknown:
+        raise ValueError(f"unknown profile: {', '.join(unknown)} "
+                         f"(choices: {', '.join(ENCODING_PROFILES)})")
+    exts = [ENCODING_PROFILES[name][0] for name in profiles]
+    if len(set(exts)) != len(exts):
+        raise ValueError("profiles must have distinct file extensions")
+    if ".mp3" not in exts:
+        raise ValueError("one mp3 profile is required")
+    return profiles
+
+
+def profile_path(filepath: str, profile: str) -> str:
+    """filepath（.mp3）に対応するプロファイルの出力パス。"""
+    ext = ENCODING_PROFILES[profile][0]
+    return os.path.splitext(filepath)[0] + ext
+
+
+def _write_clips(stream, clips: list):
+    """clips を順に書き込んで閉じる。ffmpeg が先に終了した場合は止める（終了コードで報告される）。"""
+    try:
+        for clip in clips:
+            stream.write(clip)
+        stream.close()
+    except BrokenPipeError:
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+
+def _encode(clips: list, sample_rate: int, outputs: list) -> list[list[bytes]]:
+    """クリップごとに outputs（ffmpeg の出力オプションのリスト）の各形式で変換する。
+
+    戻り値は clips と同じ順で、各要素は outputs と同じ順のバイト列リスト。
+    """
+    # 連結した PCM 上での各クリップのサンプル範囲
+    bounds = []
+    pos = 0
+    for clip in clips:
+        n = len(clip) // SAMPLE_WIDTH
+        bounds.append((pos, pos + n))
+        pos += n
+
+    count = len(clips) * len(outputs)
+    labels = "".join(f"[s{i}]" for i in range(count))
+    filters = [f"[0:a]asplit={count}{labels}"] if count > 1 else []
+    for i in range(count):
+        start, end = bounds[i // len(outputs)]
+        src = f"[s{i}]" if count > 1 else "[0:a]"
+        filters.append(f"{src}atrim=start_sample={start}:end_sample={end},"
+                       f"asetpts=PTS-STARTPTS[o{i}]")
+
+    with tempfile.TemporaryDirectory(prefix="tts-encode-") as tmp_dir:
+        cmd = [
+            find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-filter_complex", ";".join(filters),
+        ]
+        out_paths = []
+        for i in range(count):
+            out_path = os.path.join(tmp_dir, f"{i}.out")
+            out_paths.append(out_path)
+            cmd += ["-map", f"[o{i}]"] + outputs[i % len(outputs)] + [out_path]
+
+        # クリップは連結せずに順に標準入力へ流す（memoryview などのビューのままでよい）。
+        # エラー出力はファイルに受けるので、書き込み中にパイプが詰まることはない
+        with open(os.path.join(tmp_dir, "stderr"), "w+b") as err:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                    stderr=err)
+            _write_clips(proc.stdin, clips)
+            returncode = proc.wait()
+            if returncode != 0:
+                err.seek(0)
+                raise RuntimeError(
+                    f"ffmpeg failed ({returncode}): "
+                    f"{err.read().decode('utf-8', errors='replace').strip()}"
+                )
+
+        encoded = []
+        for out_path in out_paths:
+            with open(out_path, "rb") as f:
+                encoded.append(f.read())
+        return [encoded[i:i + len(outputs)] for i in range(0, count, len(outputs))]
+
+
+def encode_mp3_batch(clips: list, sample_rate: int = 24000,
+                     bitrate: str = DEFAULT_BITRATE) -> list[bytes]:
+    """16-bit mono PCM のクリップ群を MP3 に変換し、同じ順で返す。"""
+    if not clips:
+        return []
+    output = ["-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3"]
+    return [data for [data] in _encode(clips, sample_rate, [output])]
+
+
+def encode_batch(clips: list, sample_rate: int = 24000,
+                 profiles: list | None = None) -> list[dict[str, bytes]]:
+    """16-bit mono PCM のクリップ群を各プロファイルで変換し、同じ順で返す。
+
+    各要素は {プロファイル名: バイト列}。全プロファイルを1回の ffmpeg 起動で出力する。
+    """
+    if not clips:
+        return []
+    profiles = profiles or DEFAULT_PROFILES
+    outputs = [ENCODING_PROFILES[name][1] for name in profiles]
+    with METRICS.stage("encode"):
+        return [dict(zip(profiles, data)) for data in _encode(clips, sample_rate, outputs)]
+
+
+def audio_sizes(output_dir: str) -> dict[str, int]:
+    """ディレクトリ直下の音声ファイルの合計バイト数を拡張子ごとに返す。"""
+    sizes = {}
+    if not os.path.isdir(output_dir):
+        return sizes
+    exts = {ext for ext, _args in ENCODING_PROFILES.values()}
+    for entry in os.scandir(output_dir):
+        ext = os.path.splitext(entry.name)[1]
+        if entry.is_file() and ext in exts:
+            sizes[ext] = sizes.get(ext, 0) + entry.stat().st_size
+    return sizes
+
+
+def app_audio_sizes(apps: dict, app_ids: list, audio_base_dir: str) -> dict[str, dict[str, int]]:
+    """アプリごと・拡張子ごとの音声ファイル合計バイト数（apps は tts_catalog.APPS）。"""
+    return {app_id: audio_sizes(os.path.join(audio_base_dir, apps[app_id]["output_dir"]))
+            for app_id in app_ids}
+
+
+def print_size_report(before: dict, after: dict):
+    """実行前後のアプリごとの音声サイズ（app_audio_sizes の結果）を表示する。"""
+    print(f"  音声サイズ (実行前 → 実行後):")
+    for app_id in after:
+        exts = sorted(set(before.get(app_id, {})) | set(after[app_id]))
+        parts = [f"{ext} {before.get(app_id, {}).get(ext, 0) / 1024:.0f}KB → "
+                 f"{after[app_id].get(ext, 0) / 1024:.0f}KB" for ext in exts]
+        print(f"    {app_id}: {', '.join(parts) or '-'}")
+
+
+def decode_batch(paths: list, sample_rate: int = 24000) -> list[bytes]:
+    """音声ファイル群を1回の ffmpeg 起動で 16-bit mono PCM にデコードし、同じ順で返す。"""
+    if not paths:
+        return []
+
+    with tempfile.TemporaryDirectory(prefix="tts-decode-") as tmp_dir:
+        cmd = [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y"]
+        for path in paths:
+            cmd += ["-i", path]
+        out_paths = []
+        for i in range(len(paths)):
+            out_path = os.path.join(tmp_dir, f"{i}.raw")
+            out_paths.append(out_path)
+            cmd += ["-map", f"{i}:a", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1",
+                    out_path]
+
+        with METRICS.stage("decode"):
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg failed ({result.returncode}): "
+                f"{result.stderr.decode('utf-8', errors='replace').strip()}"
+            )
+
+        outputs = []
+        for out_path in out_paths:
+            with open(out_path, "rb") as f:
+                outputs.append(f.read())
+        return outputs
@@ -0,0 +1,142 @@
+"""生成ジョブの実行ジャーナルと、途中で止まっても壊れないファイル書き込み。
+
+Gemini のバッチ（ジョブ）ごとに状態を追記専用の JSONL に記録する:
+  queued     取得待ち（二分割で後回しになった半分）
+  requested  API にリクエストした
+  received   PCM を受け取り PcmStore に保存した
+  split      分割できた
+  written    全ファイルを書き込んだ（完了）
+  bisected   分割できず二分割した（完了。半分はそれぞれ別ジョブ）
+  failed     取得・エンコードに失敗した（完了。次回は通常どおり再バッチ）
+
+クォータ待ちの長い実行が Ctrl-C やクラッシュで止まっても、次回は
+未完了のジョブを同じ構成で先に再開し、received 以降のものは
+保存済み PCM を使うので API を呼び直さない。
+
+記録は scripts/gemini-journal.jsonl（git 管理外）。close() で完了済みの
+エントリを捨てて書き直し、全て完了していればファイルごと消す。
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+from tts_metrics import METRICS
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(SCRIPT_DIR, "gemini-journal.jsonl")
+
+FINISHED_STATES = {"written", "bisected", "failed"}
+RECEIVED_STATES = {"received", "split"}
+
+
+def write_file_atomic(path: str, data: bytes):
+    """一時ファイルに書いてから置き換える。途中で止まっても中途半端なファイルが残らない。"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with METRICS.stage("write"):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    METRICS.count("bytes_written", len(data))
+
+
+def link_file_atomic(src: str, dst: str):
+    """src と同じ内容のファイルを dst に置く（ハードリンク。できなければコピー）。
+
+    write_file_atomic は置き換えで書くので、後でどちらかを作り直しても
+    もう片方の内容は変わらない。
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp_path = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with METRICS.stage("write"):
+            try:
+                os.link(src, tmp_path)
+            except OSError:
+                shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RunJournal:
+    """ジョブごとの状態の追記専用ジャーナル。複数スレッドから record() を呼んでよい。"""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or JOURNAL_PATH
+        self._jobs = {}     # key -> {"job": {...}, "state": str}（最初に記録された順）
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 書き込み途中で止まった最後の行
+                    self._apply(entry)
+        self._file = None
+
+    def _apply(self, entry: dict):
+        record = self._jobs.setdefault(entry["key"], {"job": None, "state": None})
+        if entry.get("job") is not None:
+            record["job"] = entry["job"]
+        record["state"] = entry["state"]
+
+    def state(self, key: str) -> str | None:
+        with self._lock:
+            record = self._jobs.get(key)
+            return record["state"] if record else None
+
+    def was_received(self, key: str) -> bool:
+        """前回以前に PCM を受け取ったまま書き込みまで終わっていないジョブか。"""
+        return self.state(key) in RECEIVED_STATES
+
+    def unfinished(self) -> list[tuple[str, dict, str]]:
+        """未完了ジョブの (key, job, state) を記録順に返す。"""
+        with self._lock:
+            return [(key, record["job"], record["state"])
+                    for key, record in self._jobs.items()
+                    if record["state"] not in FINISHED_STATES and record["job"] is not None]
+
+    def record(self, key: str, state: str, job: dict | None = None):
+        """ジョブの状態を追記する。job を渡すと再開用にアイテムと設定も残す。"""
+        entry = {"key": key, "state": state, "time": round(time.time(), 3)}
+        if job is not None:
+            entry["job"] = {"items": job["items"], "ctx": job["ctx"], "label": job["label"]}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(entry)
+
+    def close(self):
+        """完了済みのエントリを捨てて書き直す（全て完了ならファイルを消す）。"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            pending = [(key, record) for key, record in self._jobs.items()
+                       if record["state"] not in FINISHED_STATES and record["job"] is not None]
+            if not pending:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, record in pending:
+                    f.write(json.dumps({"key": key, "state": record["state"],
+                                        "job": record["job"]}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
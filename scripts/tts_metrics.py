@@ -0,0 +1,153 @@
+"""生成スクリプトの段階ごとの所要時間とカウンタの計測。
+
+どこで時間を使っているか（API の応答待ち・クォータ待ち・PCM 変換・分割・エンコード・
+書き込み・sleep など）を調べるためのもの。計測は共通モジュール側（tts_backends の API 呼び出し、
+tts_encode、tts_journal.write_file_atomic、tts_quota）と各スクリプトで
+  with METRICS.stage("split"):
+      ...
+  METRICS.count("retries")
+のように行う。複数スレッドから呼んでよい。並行に動く段階の時間はそれぞれ足し込むので、
+段階の合計は実行時間を超えることがある。
+
+出力:
+  - 実行の最後に段階ごとの表（print_summary）
+  - --metrics-jsonl: 計測1回ごとの JSON 行と、最後に集計の行（追記）
+  - --metrics-prom: node_exporter の textfile collector 向けの Prometheus テキスト形式（置き換え）
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+PROM_PREFIX = "tts"
+
+
+class Metrics:
+    """段階ごとの (合計秒, 回数) とカウンタ。"""
+
+    def __init__(self):
+        self.stages = {}       # name -> [秒, 回数]
+        self.counters = {}     # name -> 値
+        self.run_id = uuid.uuid4().hex[:12]
+        self.script = None
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._jsonl = None
+
+    def start(self, script: str, jsonl_path: str | None = None):
+        """計測を始める（実行時間の起点をリセットし、JSON 行の出力先を開く）。"""
+        self.script = script
+        self._started = time.monotonic()
+        if jsonl_path:
+            self._jsonl = open(jsonl_path, "a", encoding="utf-8")
+            self._emit({"event": "start", "time": time.time()})
+
+    def _emit(self, record: dict):
+        """JSON 行を1行書く（呼び出し側でロックを持つか、単一スレッドから呼ぶ）。"""
+        if self._jsonl is None:
+            return
+        record = {"run": self.run_id, "script": self.script,
+                  "t": round(time.monotonic() - self._started, 4), **record}
+        self._jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def stage(self, name: str):
+        """with ブロックの所要時間を段階 name に足す。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+            self._emit({"stage": name, "seconds": round(seconds, 6)})
+
+    def count(self, name: str, value: int = 1):
+        """カウンタ name に value を足す（requests, retries, throttled, fallbacks, bytes_written など）。"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self._emit({"counter": name, "value": value})
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def finish(self, prom_path: str | None = None):
+        """集計の JSON 行と Prometheus のテキストファイルを書き出し、JSON 行の出力を閉じる。"""
+        with self._lock:
+            stages = {name: {"seconds": round(seconds, 4), "calls": calls}
+                      for name, (seconds, calls) in self.stages.items()}
+            counters = dict(self.counters)
+            if self._jsonl is not None:
+                self._emit({"event": "summary", "wall_seconds": round(self.elapsed(), 3),
+                            "stages": stages, "counters": counters})
+                self._jsonl.close()
+                self._jsonl = None
+        if prom_path:
+            self.write_prometheus(prom_path)
+
+    def write_prometheus(self, path: str):
+        """Prometheus のテキスト形式で書き出す（書きかけを読まれないよう置き換えで保存）。"""
+        label = f'script="{self.script or "unknown"}"'
+        lines = [
+            f"# HELP {PROM_PREFIX}_stage_seconds_total 段階ごとの所要時間の合計",
+            f"# TYPE {PROM_PREFIX}_stage_seconds_total counter",
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+        lines += [f'{PROM_PREFIX}_stage_seconds_total{{{label},stage="{name}"}} {seconds:.6f}'
+                  for name, (seconds, _calls) in stages]
+        lines += [f"# HELP {PROM_PREFIX}_stage_calls_total 段階ごとの計測回数",
+                  f"# TYPE {PROM_PREFIX}_stage_calls_total counter"]
+        lines += [f'{PROM_PREFIX}_stage_calls_total{{{label},stage="{name}"}} {calls}'
+                  for name, (_seconds, calls) in stages]
+        lines += [f"# HELP {PROM_PREFIX}_events_total リクエスト数・リトライ数などのカウンタ",
+                  f"# TYPE {PROM_PREFIX}_events_total counter"]
+        lines += [f'{PROM_PREFIX}_events_total{{{label},event="{name}"}} {value}'
+                  for name, value in counters]
+        lines += [f"# HELP {PROM_PREFIX}_run_seconds 実行時間",
+                  f"# TYPE {PROM_PREFIX}_run_seconds gauge",
+                  f"{PROM_PREFIX}_run_seconds{{{label}}} {self.elapsed():.3f}",
+                  f"# HELP {PROM_PREFIX}_run_timestamp_seconds 計測を書き出した時刻",
+                  f"# TYPE {PROM_PREFIX}_run_timestamp_seconds gauge",
+                  f"{PROM_PREFIX}_run_timestamp_seconds{{{label}}} {time.time():.0f}"]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        """段階ごとの所要時間とカウンタの表を表示する。"""
+        wall = self.elapsed()
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda kv: -kv[1][0])
+            counters = sorted(self.counters.items())
+        if not stages and not counters:
+            return
+        print(f"  段階ごとの時間 (実行時間 {wall:.1f}秒。並行する段階は重複して数える):")
+        # 全角の見出しは表示幅2なので、データ行の列幅（22, 10, 8, 10, 12）に手で合わせる
+        print(f"    段階{' ' * 18}    合計秒    回数    平均ms  実行時間比")
+        for name, (seconds, calls) in stages:
+            avg_ms = seconds / calls * 1000 if calls else 0
+            share = seconds / wall if wall > 0 else 0
+            print(f"    {name:<22}{seconds:>10.2f}{calls:>8}{avg_ms:>10.1f}{share:>12.0%}")
+        if counters:
+            print(f"  カウンタ: " + ", ".join(f"{name}={value:,}" for name, value in counters))
+
+
+METRICS = Metrics()
+
+
+def add_metrics_arguments(parser):
+    """--metrics-jsonl / --metrics-prom を argparse に追加する。"""
+    parser.add_argument("--metrics-jsonl",
+                        help="段階ごとの計測を JSON Lines で追記するファイル")
+    parser.add_argument("--metrics-prom",
+                        help="計測を Prometheus のテキスト形式で書き出すファイル（textfile collector 用）")
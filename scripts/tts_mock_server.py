@@ -0,0 +1,287 @@
+"""Cloud TTS / Gemini TTS の代わりに応答するローカルのモックサーバー（性能計測用）。
+
+実際のクォータを使わずに生成スクリプトを動かすためのもの。次の2つに応答する:
+  POST /v1/text:synthesize, /v1beta1/text:synthesize   Cloud TTS（text / SSML の <mark>）
+  POST /v1beta/models/<model>:generateContent           Gemini の音声レスポンス
+  POST /v1beta/models/<model>:streamGenerateContent     同じ音声を STREAM_CHUNK_MS ごとの SSE で返す
+
+応答は合成した PCM（単語ごとのトーンと、gap_ms の範囲の無音）で、
+  latency / jitter   応答までの待ち時間（秒。jitter は ± の一様乱数）
+  burst_every / burst_length  burst_every 回ごとに burst_length 回続けて 429 を返す
+で実際の API の振る舞いを真似る。Gemini のバッチは「N. 」で始まる行の数を単語数とみなす。
+ストリーミングでは latency を全チャンクに均等に割り振る（最後のチャンクが届くまでの時間は
+通常の応答と同じ）。
+
+生成スクリプトは環境変数 TTS_API_URL / GEMINI_BASE_URL で送り先を切り替える
+（tts_backends を参照）。benchmark-tts.py から使うほか、単体でも起動できる:
+
+  python scripts/tts_mock_server.py --port 8080 --latency 0.3 --burst-every 50
+  TTS_API_URL=http://127.0.0.1:8080/v1/text:synthesize GOOGLE_API_KEY=mock \\
+      python scripts/generate-audio-cloud-tts.py
+"""
+
+import argparse
+import base64
+import io
+import json
+import random
+import re
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import unescape
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+LEAD_MS = 200              # 音声の先頭・末尾の無音
+DEFAULT_GAP_MS = (2500, 3200)
+SSML_MARK_RE = re.compile(r'<mark name="(s\d+)"/>(.*?)<mark name="(e\d+)"/>', re.S)
+SSML_BREAK_RE = re.compile(r'<break time="(\d+)ms"/>')
+PROMPT_LINE_RE = re.compile(r"^\d+\. ", re.M)
+STREAM_CHUNK_MS = 500      # ストリーミング応答の1チャンクの音声の長さ
+
+
+def synth_pcm(words: list[str], gap_ms: tuple[int, int], rng: random.Random,
+              breaks_ms: list[int] | None = None) -> tuple[bytes, list[tuple[float, float]]]:
+    """単語ごとのトーンと無音をつないだ 16-bit mono PCM と、各単語の (開始秒, 終了秒) を返す。
+
+    トーンの長さは単語の文字数に比例する。breaks_ms を渡すと単語間の無音をその長さにする。
+    """
+    noise = np.random.default_rng(rng.getrandbits(32))
+    parts = [np.zeros(SAMPLE_RATE * LEAD_MS // 1000)]
+    spans = []
+    t = LEAD_MS / 1000
+    for i, word in enumerate(words):
+        if i > 0:
+            gap = breaks_ms[i - 1] if breaks_ms else rng.uniform(*gap_ms)
+            parts.append(noise.normal(0, 20, int(SAMPLE_RATE * gap / 1000)))
+            t += gap / 1000
+        duration = 0.25 + 0.06 * len(word)
+        n = int(SAMPLE_RATE * duration)
+        k = np.arange(n)
+        envelope = np.sin(np.pi * k / n)
+        freq = rng.uniform(180, 400)
+        parts.append(envelope * 8000 * np.sin(2 * np.pi * freq * k / SAMPLE_RATE))
+        spans.append((t, t + n / SAMPLE_RATE))
+        t += n / SAMPLE_RATE
+    parts.append(np.zeros(SAMPLE_RATE * LEAD_MS // 1000))
+    return np.concatenate(parts).astype("<i2").tobytes(), spans
+
+
+def to_wav(pcm: bytes) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+    return buf.getvalue()
+
+
+class MockTtsServer:
+    """別スレッドで動くモックサーバー。stats に種類ごとのリクエスト数を数える。"""
+
+    def __init__(self, port: int = 0, latency: float = 0.2, jitter: float = 0.05,
+                 burst_every: int = 0, burst_length: int = 3, retry_after: float = 1.0,
+                 gap_ms: tuple[int, int] = DEFAULT_GAP_MS, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.gap_ms = gap_ms
+        self.rng = random.Random(seed)
+        self.stats = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def cloud_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1/text:synthesize"
+
+    @property
+    def gemini_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "MockTtsServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {}
+            self._count = 0
+
+    def _next(self, kind: str) -> tuple[bool, float, random.Random]:
+        """リクエストを数え、(429 にするか, 待ち時間, 音声合成用の乱数) を返す。"""
+        with self._lock:
+            self._count += 1
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+            throttled = (self.burst_every > 0
+                         and self._count % self.burst_every < self.burst_length
+                         and self._count >= self.burst_every)
+            if throttled:
+                self.stats["429"] = self.stats.get("429", 0) + 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            rng = random.Random(self.rng.random())
+        return throttled, delay, rng
+
+    def cloud_response(self, body: dict, rng: random.Random) -> dict:
+        """Cloud TTS の text:synthesize の応答（LINEAR16 の WAV）。"""
+        if "ssml" in body["input"]:
+            ssml = body["input"]["ssml"]
+            words = [(start, unescape(text), end) for start, text, end in SSML_MARK_RE.findall(ssml)]
+            breaks = [int(ms) for ms in SSML_BREAK_RE.findall(ssml)]
+            pcm, spans = synth_pcm([text for _s, text, _e in words], self.gap_ms, rng,
+                                   breaks_ms=breaks or None)
+            response = {"audioContent": base64.b64encode(to_wav(pcm)).decode()}
+            if body.get("enableTimePointing"):
+                response["timepoints"] = [
+                    tp for (start, _text, end), (t0, t1) in zip(words, spans)
+                    for tp in ({"markName": start, "timeSeconds": t0},
+                               {"markName": end, "timeSeconds": t1})]
+            return response
+        pcm, _spans = synth_pcm([body["input"]["text"]], self.gap_ms, rng)
+        return {"audioContent": base64.b64encode(to_wav(pcm)).decode()}
+
+    def gemini_pcm(self, body: dict, rng: random.Random) -> bytes:
+        """プロンプトの単語数だけトーンを並べた PCM。"""
+        prompt = "".join(part.get("text", "") for content in body.get("contents", [])
+                         for part in content.get("parts", []))
+        count = len(PROMPT_LINE_RE.findall(prompt)) or 1
+        pcm, _spans = synth_pcm(["x" * rng.randint(2, 8) for _ in range(count)],
+                                self.gap_ms, rng)
+        return pcm
+
+    @staticmethod
+    def gemini_chunk(pcm: bytes, finish: bool = True) -> dict:
+        """Gemini の generateContent の音声応答（inlineData に 24kHz PCM）。"""
+        candidate = {
+            "content": {"role": "model", "parts": [{"inlineData": {
+                "mimeType": f"audio/L16;codec=pcm;rate={SAMPLE_RATE}",
+                "data": base64.b64encode(pcm).decode(),
+            }}]},
+        }
+        if finish:
+            candidate["finishReason"] = "STOP"
+        return {"candidates": [candidate]}
+
+    def gemini_response(self, body: dict, rng: random.Random) -> dict:
+        return self.gemini_chunk(self.gemini_pcm(body, rng))
+
+    def gemini_stream(self, body: dict, rng: random.Random) -> list[dict]:
+        """streamGenerateContent の応答（STREAM_CHUNK_MS ごとに区切ったチャンクのリスト）。"""
+        pcm = self.gemini_pcm(body, rng)
+        step = SAMPLE_RATE * STREAM_CHUNK_MS // 1000 * 2
+        starts = range(0, len(pcm), step)
+        return [self.gemini_chunk(pcm[i:i + step], finish=i + step >= len(pcm)) for i in starts]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: dict | None = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_events(self, events: list[dict], delay: float):
+                """SSE を chunked で1イベントずつ送る（delay をイベント間に均等に割り振る）。"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in events:
+                    time.sleep(delay / len(events))
+                    data = f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?")[0]
+                if path.endswith("text:synthesize"):
+                    kind = "cloud-ssml" if "ssml" in body.get("input", {}) else "cloud"
+                elif path.endswith(":generateContent"):
+                    kind = "gemini"
+                elif path.endswith(":streamGenerateContent"):
+                    kind = "gemini-stream"
+                else:
+                    self._send(404, {"error": {"code": 404, "message": path}})
+                    return
+                throttled, delay, rng = server._next(kind)
+                if kind == "gemini-stream" and not throttled:
+                    self._send_events(server.gemini_stream(body, rng), delay)
+                    return
+                time.sleep(delay)
+                if throttled:
+                    self._send(429, {"error": {
+                        "code": 429, "status": "RESOURCE_EXHAUSTED",
+                        "message": "mock: rate limited",
+                        "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                     "retryDelay": f"{server.retry_after:g}s"}],
+                    }}, {"Retry-After": str(int(server.retry_after))})
+                elif kind == "gemini":
+                    self._send(200, server.gemini_response(body, rng))
+                else:
+                    self._send(200, server.cloud_response(body, rng))
+
+        return Handler
+
+
+def parse_gap(text: str) -> tuple[int, int]:
+    low, _sep, high = text.partition(",")
+    return int(low), int(high or low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cloud TTS / Gemini TTS のモックサーバー")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.2, help="応答までの秒数 (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="latency の揺らぎ・秒 (default: 0.05)")
+    parser.add_argument("--burst-every", type=int, default=0,
+                        help="この回数ごとに 429 を返す（0 なら返さない）")
+    parser.add_argument("--burst-length", type=int, default=3, help="429 を続けて返す回数 (default: 3)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 で指示する待ち秒数 (default: 1)")
+    parser.add_argument("--gap-ms", type=parse_gap, default=DEFAULT_GAP_MS,
+                        help="Gemini の単語間の無音・ms の範囲 (default: 2500,3200)")
+    args = parser.parse_args()
+
+    server = MockTtsServer(args.port, args.latency, args.jitter, args.burst_every,
+                           args.burst_length, args.retry_after, args.gap_ms)
+    print(f"Cloud TTS: TTS_API_URL={server.cloud_url}")
+    print(f"Gemini   : GEMINI_BASE_URL={server.gemini_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nリクエスト数: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Gemini から受け取った生 PCM の保存庫（追記専用パックファイル）。
+
+API の応答（16-bit mono PCM）を捨てずに保存しておくことで、
+SILENCE_THRESH / SILENCE_KEEP の調整やビットレート変更のやり直しを
+API を呼ばずにローカルだけで行えるようにする。
+
+保存先: scripts/gemini-pcm/（サイズが大きいので git 管理外）
+  pcm.pack     PCM をそのまま連結した追記専用ファイル
+  index.jsonl  1行1エントリのインデックス（追記専用）
+               {"key", "offset", "length", "sample_rate",
+                "voice", "model", "lang", "app_id", "items": [...]}
+
+key はプロンプト・ボイス・モデルのハッシュ。同じ key が複数回追記された場合は
+最後のものが有効。PCM を書き終えてからインデックスを追記するため、
+書き込み途中で止まってもインデックスが壊れたエントリを指すことはない。
+読み出しはパックファイルを mmap して行う。複数スレッドから append / get を呼んでよい。
+ストリーミングで受け取る場合は open_stream() の書き込み口にチャンクを渡し、
+受け取り終えたら commit() で追記する（それまでは一時ファイルに溜める）。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(SCRIPT_DIR, "gemini-pcm")
+PACK_NAME = "pcm.pack"
+INDEX_NAME = "index.jsonl"
+
+
+def pcm_key(prompt: str, voice: str, model: str) -> str:
+    """プロンプト・ボイス・モデルから保存キーを作る。"""
+    payload = json.dumps([prompt, voice, model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PcmStore:
+    """追記専用の PCM パックファイルとそのインデックス。"""
+
+    def __init__(self, store_dir: str | None = None):
+        self.store_dir = store_dir or STORE_DIR
+        self.pack_path = os.path.join(self.store_dir, PACK_NAME)
+        self.index_path = os.path.join(self.store_dir, INDEX_NAME)
+        self.entries = []   # 追記順
+        self._by_key = {}
+        self._map = None
+        self._map_size = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._add_entry(json.loads(line))
+
+    def _add_entry(self, entry: dict):
+        self.entries.append(entry)
+        self._by_key[entry["key"]] = entry
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._by_key
+
+    def append(self, key: str, pcm: bytes, sample_rate: int, **meta) -> dict:
+        """PCM を追記し、インデックスに登録したエントリを返す。"""
+        with self._lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(self.pack_path, "ab") as f:
+                offset = f.tell()
+                f.write(pcm)
+                f.flush()
+                os.fsync(f.fileno())
+            entry = {"key": key, "offset": offset, "length": len(pcm),
+                     "sample_rate": sample_rate}
+            entry.update(meta)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._add_entry(entry)
+            return entry
+
+    def open_stream(self, key: str, sample_rate: int, **meta) -> "PcmStreamWriter":
+        """PCM をチャンクごとに受け取って保存する書き込み口を返す（ストリーミング取得用）。"""
+        return PcmStreamWriter(self, key, sample_rate, meta)
+
+    def _append_file(self, key: str, path: str, sample_rate: int, meta: dict) -> dict:
+        """一時ファイルの PCM をパックファイルに追記し、インデックスに登録する。"""
+        with self._lock:
+            with open(path, "rb") as src, open(self.pack_path, "ab") as f:
+                offset = f.tell()
+                shutil.copyfileobj(src, f)
+                length = f.tell() - offset
+                f.flush()
+                os.fsync(f.fileno())
+            entry = {"key": key, "offset": offset, "length": length,
+                     "sample_rate": sample_rate}
+            entry.update(meta)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._add_entry(entry)
+            return entry
+
+    def get(self, key: str) -> tuple[memoryview, int] | None:
+        """保存済み PCM を (mmap 上のビュー, サンプルレート) で返す。未保存なら None。"""
+        with self._lock:
+            entry = self._by_key.get(key)
+            if entry is None:
+                return None
+            end = entry["offset"] + entry["length"]
+            if self._map is None or end > self._map_size:
+                self._remap()
+            return memoryview(self._map)[entry["offset"]:end], entry["sample_rate"]
+
+    def _remap(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # 古いビューがまだ使われていれば、参照が消えた時点で解放される
+        with open(self.pack_path, "rb") as f:
+            self._map_size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def latest_entries(self) -> list[dict]:
+        """key ごとに最後に追記されたエントリを、新しい順に返す。"""
+        seen = set()
+        result = []
+        for entry in reversed(self.entries):
+            if entry["key"] not in seen:
+                seen.add(entry["key"])
+                result.append(entry)
+        return result
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+
+
+class PcmStreamWriter:
+    """届いたチャンクを一時ファイルに書き、commit() でまとめてパックファイルに追記する。
+
+    途中のチャンクをメモリに溜めないためのもの。パックファイルには commit() の時点で
+    1回で追記するので、同時に取得している他のジョブの PCM と混ざらない。
+    """
+
+    def __init__(self, store: PcmStore, key: str, sample_rate: int, meta: dict):
+        self.store = store
+        self.key = key
+        self.sample_rate = sample_rate
+        self.meta = meta
+        self.length = 0
+        os.makedirs(store.store_dir, exist_ok=True)
+        self.path = os.path.join(store.store_dir,
+                                 f"{key}.{os.getpid()}.{threading.get_ident()}.part")
+        self._file = open(self.path, "wb")
+
+    def write(self, pcm: bytes):
+        self._file.write(pcm)
+        self.length += len(pcm)
+
+    def commit(self) -> dict:
+        """パックファイルに追記してインデックスに登録したエントリを返す。"""
+        self._file.close()
+        try:
+            return self.store._append_file(self.key, self.path, self.sample_rate, self.meta)
+        finally:
+            os.remove(self.path)
+
+    def discard(self):
+        """書きかけを捨てる（取得失敗・リトライ時）。"""
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
@@ -0,0 +1,143 @@
+"""生成計画（--plan）のための応答時間の履歴と所要時間の見積もり。
+
+各バックエンドの1リクエストの応答時間を (秒, 件数) で記録しておき、
+計画モードでは「1件あたりの秒数」の中央値からリクエストごとの応答時間を見積もる。
+所要時間は同時リクエスト数・RPM・リクエスト間隔を入れた簡単なシミュレーションで求める。
+
+記録は scripts/tts-latency.json（マシンごとのデータなので git 管理外）。
+計画モード自体は API を呼ばず、API キーも重いライブラリも必要としない。
+"""
+
+import heapq
+import json
+import math
+import os
+import statistics
+import threading
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LATENCY_PATH = os.path.join(SCRIPT_DIR, "tts-latency.json")
+LATENCY_VERSION = 1
+MAX_SAMPLES = 200   # キーごとに残す直近のサンプル数
+
+
+def latency_key(backend: str, model: str) -> str:
+    """履歴を分ける単位のキー（Cloud TTS はボイスごと、Gemini はモデルごと）。"""
+    return f"{backend}|{model}"
+
+
+class LatencyHistory:
+    """リクエストの応答時間の履歴。複数スレッドから record() を呼んでよい。"""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or LATENCY_PATH
+        self.samples = {}   # key -> [[秒, 件数], ...]
+        self._lock = threading.Lock()
+        self._dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == LATENCY_VERSION:
+                self.samples = data.get("samples", {})
+
+    def record(self, key: str, seconds: float, items: int = 1):
+        """items 件分のリクエストが seconds 秒で返ったことを記録する。"""
+        with self._lock:
+            samples = self.samples.setdefault(key, [])
+            samples.append([round(seconds, 3), items])
+            del samples[:-MAX_SAMPLES]
+            self._dirty = True
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self.samples.get(key, []))
+
+    def seconds_per_item(self, key: str) -> float | None:
+        """1件あたりの応答時間の中央値。履歴がなければ None。"""
+        with self._lock:
+            samples = self.samples.get(key, [])
+            if not samples:
+                return None
+            return statistics.median(seconds / max(1, items) for seconds, items in samples)
+
+    def save(self):
+        """履歴を書き出す。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": LATENCY_VERSION, "samples": self.samples},
+                          f, ensure_ascii=False, indent=1, sort_keys=True)
+                f.write("\n")
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def simulate_wall_seconds(latencies: list[float], concurrency: int, rpm: int | None = None,
+                          tokens: float | None = None, min_interval: float = 0) -> float:
+    """latencies の応答時間のリクエストを順に出し終えるまでの時間を見積もる。
+
+    concurrency 本まで同時に応答待ちにし、rpm を渡すと手持ち tokens 回分
+    （省略時は rpm 回分）を使い切った後は 60/rpm 秒に1回しか出さない。
+    """
+    workers = [0.0] * max(1, concurrency)   # 各スロットが空く時刻
+    tokens = rpm if tokens is None else tokens
+    finish = 0.0
+    last_start = None
+    for k, latency in enumerate(latencies):
+        start = heapq.heappop(workers)
+        if rpm:
+            start = max(start, (k + 1 - tokens) * 60 / rpm)
+        if last_start is not None:
+            start = max(start, last_start + min_interval)
+        last_start = start
+        heapq.heappush(workers, start + latency)
+        finish = max(finish, start + latency)
+    return finish
+
+
+def rpd_days(requests: int, remaining_today: int, rpd: int) -> int:
+    """RPD の上限内で requests 回を出し切るのに必要な日数（今日を含む）。"""
+    if requests <= 0:
+        return 0
+    if requests <= remaining_today:
+        return 1
+    later = math.ceil((requests - remaining_today) / rpd)
+    return later + (1 if remaining_today > 0 else 0)
+
+
+def print_plan(rows: list[dict]):
+    """バックエンドごとの計画を表示する。
+
+    rows の各要素: backend, items, chars, requests, days, today_seconds, total_seconds,
+    latency（1件あたり秒）, samples（履歴の件数。0 なら既定値を使った）, note（省略可）
+    """
+    print(f"\n生成計画（API は呼びません）")
+    print(f"{'='*60}")
+    for row in rows:
+        basis = (f"履歴 {row['samples']}件の中央値" if row["samples"]
+                 else "履歴なし・既定値")
+        print(f"  [{row['backend']}]")
+        print(f"    未生成       : {row['items']}件")
+        print(f"    課金文字数   : {row['chars']:,}文字")
+        print(f"    リクエスト数 : {row['requests']}回")
+        if row["days"] is not None:
+            print(f"    必要日数(RPD): {row['days']}日")
+        print(f"    応答時間     : {row['latency']:.2f}秒/件 ({basis})")
+        if row["total_seconds"] > row["today_seconds"]:
+            print(f"    推定所要時間 : 今日 約{format_duration(row['today_seconds'])} "
+                  f"/ 合計 約{format_duration(row['total_seconds'])}")
+        else:
+            print(f"    推定所要時間 : 約{format_duration(row['total_seconds'])}")
+        if row.get("note"):
+            print(f"    {row['note']}")
+    print(f"{'='*60}")
+
+
+def format_duration(seconds: float) -> str:
+    h, rest = divmod(int(seconds), 3600)
+    m, s = divmod(rest, 60)
+    if h > 0:
+        return f"{h}h {m}m"
+    return f"{m}m {s}s" if m > 0 else f"{s}s"
@@ -0,0 +1,78 @@
+"""Service Worker 用の音声プリキャッシュマニフェストを書き出す。
+
+public/audio/ 以下の音声ファイルを走査し、URL・内容ハッシュ・サイズを
+ディレクトリ（アプリ）ごとにまとめて public/audio/precache-manifest.json に書く。
+public/sw.js はこれを読んでアプリごとに音声をプリキャッシュし、
+再生成後はハッシュが変わったファイルだけを取り直す。
+
+  {
+    "version": "<全エントリのハッシュ>",
+    "apps": {
+      "dots": [{"url": "/audio/dots/1.mp3", "hash": "3f2a...", "size": 8123}, ...],
+      "sprites": [...]
+    }
+  }
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "precache-manifest.json"
+AUDIO_EXTENSIONS = (".mp3", ".opus", ".json")
+HASH_LENGTH = 16
+
+
+def file_hash(path: str) -> str:
+    """ファイル内容の SHA-256（先頭 HASH_LENGTH 桁）。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def build_precache_manifest(audio_base_dir: str) -> dict:
+    """audio_base_dir 以下の音声ファイルのマニフェストを作る。
+
+    グループ名は audio_base_dir からのディレクトリの相対パス（例: dots, dots-math/equations）。
+    """
+    apps = {}
+    for dirpath, dirnames, filenames in os.walk(audio_base_dir):
+        dirnames.sort()
+        rel_dir = os.path.relpath(dirpath, audio_base_dir).replace(os.sep, "/")
+        for filename in sorted(filenames):
+            if not filename.endswith(AUDIO_EXTENSIONS) or filename == MANIFEST_NAME:
+                continue
+            path = os.path.join(dirpath, filename)
+            rel = filename if rel_dir == "." else f"{rel_dir}/{filename}"
+            apps.setdefault(rel_dir, []).append({
+                "url": f"/audio/{rel}",
+                "hash": file_hash(path),
+                "size": os.path.getsize(path),
+            })
+
+    version = hashlib.sha256(json.dumps(apps, sort_keys=True).encode("utf-8"))
+    return {"version": version.hexdigest()[:HASH_LENGTH], "apps": apps}
+
+
+def write_precache_manifest(audio_base_dir: str) -> tuple[str, dict]:
+    """マニフェストを書き出し、(パス, マニフェスト) を返す。"""
+    manifest = build_precache_manifest(audio_base_dir)
+    path = os.path.join(audio_base_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return path, manifest
+
+
+def update_precache_manifest(audio_base_dir: str):
+    """マニフェストを書き出し、件数・合計サイズ・version を表示する（各生成スクリプトの最後に呼ぶ）。"""
+    path, manifest = write_precache_manifest(audio_base_dir)
+    entries = [e for group in manifest["apps"].values() for e in group]
+    kb = sum(e["size"] for e in entries) / 1024
+    rel = os.path.relpath(path, audio_base_dir).replace(os.sep, "/")
+    print(f"\nプリキャッシュマニフェスト: {rel} ({len(entries)}件, {kb:.1f}KB, "
+          f"version {manifest['version']})")
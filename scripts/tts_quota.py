@@ -0,0 +1,204 @@
+"""API のクォータ（RPM / RPD）に合わせてリクエストを出すスケジューラ。
+
+固定の sleep で間隔を空ける代わりに、
+  - RPM: 容量 rpm、毎秒 rpm/60 ずつ回復するトークンバケット
+  - RPD: その日のリクエスト数（実行をまたいで scripts/gemini-usage.json に保存）
+でリクエストを許可する。429 の応答に RetryInfo（retryDelay）や Retry-After が
+含まれていればその時間だけ全スレッドを止め、日次クォータ超過なら当日分を使い切り扱いにする。
+
+日付の区切りは Gemini API の日次クォータと同じ太平洋時間の 0 時。
+複数スレッドから acquire() を呼んでよい。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from tts_metrics import METRICS
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:  # tzdata がない環境（Windows など）
+    QUOTA_TZ = timezone(timedelta(hours=-8))
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+USAGE_PATH = os.path.join(SCRIPT_DIR, "gemini-usage.json")
+USAGE_VERSION = 1
+
+
+def quota_day() -> str:
+    """日次クォータの日付（太平洋時間）。"""
+    return datetime.now(QUOTA_TZ).date().isoformat()
+
+
+def _walk(value):
+    """ネストした dict / list の全ての (キー, 値) を列挙する。"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield key, item
+            yield from _walk(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _walk(item)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED のエラーか（google.genai.errors.APIError の code / status で判定）。"""
+    return (getattr(error, "code", None) == 429
+            or getattr(error, "status", None) == "RESOURCE_EXHAUSTED")
+
+
+def retry_delay(error: Exception) -> float | None:
+    """エラー応答に含まれる再試行までの待ち時間（秒）。なければ None。"""
+    for key, value in _walk(getattr(error, "details", None)):
+        if key == "retryDelay" and isinstance(value, str):
+            match = re.fullmatch(r"([\d.]+)s", value.strip())
+            if match:
+                return float(match.group(1))
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        if value and value.strip().isdigit():
+            return float(value)
+    return None
+
+
+def is_daily_quota_error(error: Exception) -> bool:
+    """日次クォータ（PerDay）超過による 429 か。"""
+    return any(key == "quotaId" and "PerDay" in str(value)
+               for key, value in _walk(getattr(error, "details", None)))
+
+
+class QuotaScheduler:
+    """RPM のトークンバケットと、保存される日次使用量によるリクエスト許可。"""
+
+    def __init__(self, model: str, rpm: int, rpd: int, min_interval: float = 0,
+                 path: str | None = None):
+        self.model = model
+        self.rpm = rpm
+        self.rpd = rpd
+        self.min_interval = min_interval
+        self.path = path or USAGE_PATH
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+        self._last_request = None
+
+        self._usage = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == USAGE_VERSION:
+                self._usage = data.get("models", {})
+
+        # 直前の実行で使った分はまだバケットから引いておく
+        now = time.time()
+        recent = [t for t in self._model_usage()["recent"] if now - t < 60]
+        self._tokens = float(max(0, rpm - len(recent)))
+        self._refilled_at = time.monotonic()
+
+    def _model_usage(self) -> dict:
+        usage = self._usage.setdefault(self.model, {"day": quota_day(), "requests": 0,
+                                                     "recent": []})
+        if usage["day"] != quota_day():
+            usage.update(day=quota_day(), requests=0)
+        return usage
+
+    def used_today(self) -> int:
+        """今日（太平洋時間）使ったリクエスト数。"""
+        with self._cond:
+            return self._model_usage()["requests"]
+
+    def remaining_today(self) -> int:
+        """今日の残りリクエスト数。"""
+        return max(0, self.rpd - self.used_today())
+
+    def available_now(self) -> float:
+        """RPM のバケットに残っている（待たずに出せる）リクエスト数。"""
+        with self._cond:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def _refill(self, now: float):
+        if now <= self._refilled_at:
+            return  # pause() 中は回復させない
+        self._tokens = min(float(self.rpm),
+                           self._tokens + (now - self._refilled_at) * self.rpm / 60)
+        self._refilled_at = now
+
+    def acquire(self) -> bool:
+        """リクエスト1回分の許可を待つ。今日のクォータを使い切っていれば False。"""
+        with METRICS.stage("quota_wait"), self._cond:
+            while True:
+                usage = self._model_usage()
+                if usage["requests"] >= self.rpd:
+                    return False
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(self._paused_until - now,
+                           (1 - self._tokens) * 60 / self.rpm)
+                if self._last_request is not None:
+                    wait = max(wait, self._last_request + self.min_interval - now)
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+
+            self._tokens -= 1
+            self._last_request = now
+            usage["requests"] += 1
+            usage["recent"] = [t for t in usage["recent"] if time.time() - t < 60]
+            usage["recent"].append(time.time())
+            self._save()
+            return True
+
+    def pause(self, seconds: float):
+        """サーバーから待つよう指示されたとき、全スレッドのリクエストを seconds 秒止める。"""
+        with self._cond:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # 待ち明けに溜まったトークンで一斉に送らないよう、回復も待ち明けから始める
+            self._tokens = 0.0
+            self._refilled_at = max(self._refilled_at, now + seconds)
+            self._cond.notify_all()
+
+    def exhaust_today(self):
+        """サーバーが日次クォータ超過を返したとき、今日の残りを 0 にする。"""
+        with self._cond:
+            self._model_usage()["requests"] = max(self._model_usage()["requests"], self.rpd)
+            self._save()
+            self._cond.notify_all()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": USAGE_VERSION, "models": self._usage},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+
+
+class PauseGate:
+    """429 の指示で全スレッドのリクエストを止める門（RPM / RPD の管理はしない）。
+
+    クォータを自前で数えない API（Cloud TTS）の並列リクエスト用。
+    各スレッドはリクエストの前に wait() を呼び、429 を受けたスレッドが pause() する。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+
+    def wait(self):
+        """pause() で指定された時刻まで待つ。"""
+        with METRICS.stage("quota_wait"), self._cond:
+            while (remaining := self._paused_until - time.monotonic()) > 0:
+                self._cond.wait(remaining)
+
+    def pause(self, seconds: float):
+        """全スレッドのリクエストを seconds 秒止める。"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
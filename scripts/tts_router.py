@@ -0,0 +1,207 @@
+"""複数の TTS バックエンドへの振り分けとフェイルオーバー。
+
+アイテムの待ち行列から、空きのあるバックエンドのうち1件あたりの応答が速いもの
+（tts_plan.LatencyHistory の過去の実測から始め、今回の実行中の実測で指数移動平均をとる。
+クォータ待ちも含めた実効の速さ）から順に仕事を渡す。
+速いバックエンドが埋まっていれば次に速いものにも渡すので、全バックエンドが同時に動く。
+
+失敗したときは tts_backends の例外の種類で扱いを変える:
+  BackendThrottled    retry_after 秒そのバックエンドを休ませ、アイテムは待ち行列の先頭へ戻す
+  BackendUnavailable  この実行中はそのバックエンドを使わない（例: Gemini の日次クォータ超過
+                      → 残りは Cloud TTS などが引き受ける）
+  BackendError        アイテムを別のバックエンドで再試行する。同じバックエンドで
+                      MAX_CONSECUTIVE_ERRORS 回続けて失敗したら COOLDOWN 秒休ませる
+
+合成とエンコード・書き込み（on_result）はバックエンドごとのスレッドプールで行い、
+振り分けはメインスレッドだけが行う。Ctrl-C では新しい仕事を渡すのをやめ、
+処理中の分を書き込んでから戻る（2回目の Ctrl-C で即中断）。
+"""
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tts_backends import BackendError, BackendThrottled, BackendUnavailable
+from tts_metrics import METRICS
+from tts_plan import LatencyHistory
+
+MAX_CONSECUTIVE_ERRORS = 3
+COOLDOWN = 60          # 連続して失敗したバックエンドを休ませる時間（秒）
+LATENCY_SMOOTHING = 0.3
+
+
+class BackendState:
+    """ルーターから見た1つのバックエンドの状態。"""
+
+    def __init__(self, backend, seconds_per_item: float):
+        self.backend = backend
+        self.seconds_per_item = seconds_per_item
+        self.executor = ThreadPoolExecutor(max_workers=max(1, backend.concurrency))
+        self.in_flight = 0
+        self.resume_at = 0.0          # これより前は休ませる（レート制限・連続失敗）
+        self.disabled = None          # 使えなくなった理由
+        self.errors_in_row = 0
+        self.items = 0                # 生成した件数
+        self.requests = 0
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def ready(self, now: float) -> bool:
+        return (self.disabled is None and now >= self.resume_at
+                and self.in_flight < max(1, self.backend.concurrency))
+
+
+class BackendRouter:
+    """アイテムを最も速い使用可能なバックエンドへ振り分け、失敗時は他へ回す。
+
+    backends は優先順（速さが同じなら先のものを使う）。on_result(backend, entries, pcms) は
+    合成できたアイテムの書き込み（エンコード・保存）を行い、書き込めた件数を返す。
+    ワーカースレッドから呼ばれる。log はスレッドセーフな出力関数。
+    """
+
+    def __init__(self, backends: list, latency: LatencyHistory, on_result, log):
+        self.latency = latency
+        self.on_result = on_result
+        self.log = log
+        self.states = [BackendState(b, latency.seconds_per_item(b.latency_key)
+                                    or b.default_latency)
+                       for b in backends]
+        self.stopping = False
+        self.failed = []      # どのバックエンドでも作れなかった entry
+
+    def run(self, entries: list) -> list:
+        """entries（dict: app_id, output_dir, item）を全て処理し、未処理で残った entry を返す。"""
+        queue = deque(dict(entry, tried=set()) for entry in entries)
+        running = {}   # future -> (state, batch)
+        try:
+            while queue or running:
+                if not self.stopping:
+                    self._dispatch(queue, running)
+                try:
+                    if not running:
+                        # 全バックエンドが休み中なら、どれかが戻るまで待つ
+                        if self.stopping or not self._can_progress(queue):
+                            break
+                        time.sleep(self._seconds_until_ready())
+                        continue
+                    done, _pending = wait(running, timeout=self._seconds_until_ready(),
+                                          return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    if self.stopping:
+                        raise
+                    self.stopping = True
+                    self.log("\n中断要求: 処理中の分を書き込んでから終了します（もう一度 Ctrl-C で即中断）")
+                    continue
+                for future in done:
+                    state, batch = running.pop(future)
+                    state.in_flight -= 1
+                    self._handle(state, batch, future, queue)
+        finally:
+            for state in self.states:
+                state.executor.shutdown(wait=True)
+        return list(queue)
+
+    def _dispatch(self, queue: deque, running: dict):
+        """空きのあるバックエンドへ、速い順に仕事を渡す。"""
+        now = time.monotonic()
+        for state in sorted(self.states, key=lambda s: s.seconds_per_item):
+            while queue and state.ready(now):
+                batch = self._take(queue, state)
+                if not batch:
+                    break
+                state.in_flight += 1
+                future = state.executor.submit(self._work, state, batch)
+                running[future] = (state, batch)
+
+    def _take(self, queue: deque, state: BackendState) -> list:
+        """待ち行列の先頭から、そのバックエンドでまだ試していない同じアプリ・言語の entry を取る。"""
+        batch = []
+        limit = 1
+        for entry in list(queue):
+            if len(batch) >= limit:
+                break
+            if state.name in entry["tried"]:
+                continue
+            if batch and (entry["app_id"], entry["item"]["lang"]) != (
+                    batch[0]["app_id"], batch[0]["item"]["lang"]):
+                break
+            if not batch:
+                limit = state.backend.batch_limit(entry["item"])
+            batch.append(entry)
+        for entry in batch:
+            queue.remove(entry)
+        return batch
+
+    def _work(self, state: BackendState, batch: list) -> tuple[int, float]:
+        start = time.monotonic()
+        pcms = state.backend.synthesize([entry["item"] for entry in batch])
+        elapsed = time.monotonic() - start
+        return self.on_result(state.backend, batch, pcms), elapsed
+
+    def _handle(self, state: BackendState, batch: list, future, queue: deque):
+        try:
+            written, elapsed = future.result()
+        except BackendThrottled as e:
+            state.resume_at = time.monotonic() + e.retry_after
+            self.log(f"  [{state.name}] {e} → {len(batch)}件を他へ回します")
+            METRICS.count("fallbacks", len(batch))
+            queue.extendleft(reversed(batch))
+            return
+        except BackendUnavailable as e:
+            if state.disabled is None:
+                state.disabled = str(e)
+                self.log(f"  [{state.name}] 使用停止: {e}")
+            self.log(f"  [{state.name}] {len(batch)}件を他へ回します")
+            METRICS.count("fallbacks", len(batch))
+            queue.extendleft(reversed(batch))
+            return
+        except Exception as e:
+            if not isinstance(e, BackendError):
+                e = BackendError(f"{type(e).__name__}: {e}")
+            self._on_error(state, batch, e, queue)
+            return
+
+        state.errors_in_row = 0
+        state.requests += 1
+        state.items += written
+        per_item = elapsed / max(1, len(batch))
+        state.seconds_per_item += LATENCY_SMOOTHING * (per_item - state.seconds_per_item)
+        names = ", ".join(entry["item"]["filename"] for entry in batch[:3])
+        more = f" 他{len(batch) - 3}件" if len(batch) > 3 else ""
+        self.log(f"  [{state.name}] {batch[0]['app_id']}: {names}{more} "
+                 f"-> OK {written}/{len(batch)}件 ({elapsed:.1f}s)")
+
+    def _on_error(self, state: BackendState, batch: list, error: BackendError, queue: deque):
+        state.errors_in_row += 1
+        if state.errors_in_row >= MAX_CONSECUTIVE_ERRORS:
+            state.resume_at = time.monotonic() + COOLDOWN
+            state.errors_in_row = 0
+            self.log(f"  [{state.name}] {MAX_CONSECUTIVE_ERRORS}回続けて失敗したため"
+                     f"{COOLDOWN}秒休ませます")
+        usable = {s.name for s in self.states if s.disabled is None}
+        retry = []
+        for entry in batch:
+            entry["tried"].add(state.name)
+            if usable - entry["tried"]:
+                retry.append(entry)
+            else:
+                self.failed.append(entry)
+                self.log(f"  {entry['item']['filename']} -> ERROR: {error}")
+        if retry:
+            self.log(f"  [{state.name}] ERROR: {error} → {len(retry)}件を他のバックエンドで再試行")
+            METRICS.count("fallbacks", len(retry))
+        queue.extendleft(reversed(retry))
+
+    def _can_progress(self, queue: deque) -> bool:
+        """待ち行列のどれかを、まだ使えるバックエンドで試せるか。"""
+        usable = {s.name for s in self.states if s.disabled is None}
+        return any(usable - entry["tried"] for entry in queue)
+
+    def _seconds_until_ready(self) -> float:
+        """休んでいるバックエンドが戻るまでの時間（仕事の完了待ちの上限にも使う）。"""
+        now = time.monotonic()
+        waits = [s.resume_at - now for s in self.states
+                 if s.disabled is None and s.resume_at > now]
+        return max(0.05, min(waits, default=1.0))
@@ -0,0 +1,255 @@
+"""NumPy による無音検出（pydub.silence の高速版）。
+
+pydub.silence.split_on_silence は 1ms ずつずらした窓ごとに RMS を
+Python ループで計算するため、数分の音声だと1回の走査に数秒かかる。
+ここでは 16-bit PCM から 1ms ごとの二乗和を一度だけ計算して累積和を持ち、
+任意の (無音長, 閾値) の組み合わせを配列演算だけで評価する。
+
+判定ロジックは pydub (detect_silence / detect_nonsilent / split_on_silence)
+と同じ:
+  - 長さ min_silence_len の窓の RMS が閾値以下なら、その窓の開始位置は無音
+  - 無音の開始位置が min_silence_len 以内で続く間は1つの無音区間にまとめる
+  - 有音区間の前後に keep_silence ms を残し、隣と重なる場合は中間で切る
+"""
+
+import numpy as np
+
+MAX_AMPLITUDE = 1 << 15  # 16-bit PCM の最大振幅（pydub の max_possible_amplitude）
+
+
+def pcm_to_samples(pcm) -> np.ndarray:
+    """16-bit little-endian PCM をコピーせずに int16 配列として見る。"""
+    if isinstance(pcm, np.ndarray):
+        return pcm
+    return np.frombuffer(pcm, dtype="<i2")
+
+
+class SilenceEnvelope:
+    """1ms 単位のエネルギー累積和。無音区間の検索を何度でも安価に行える。"""
+
+    def __init__(self, pcm, sample_rate: int = 24000):
+        samples = pcm_to_samples(pcm)
+        self.sample_rate = sample_rate
+        self.duration_ms = len(samples) * 1000 // sample_rate
+
+        # 各 ms の開始サンプル位置（pydub の ms スライスと同じ切り捨て）
+        bounds = np.arange(self.duration_ms + 1, dtype=np.int64) * sample_rate // 1000
+        self._bounds = bounds
+
+        # ms ごとの二乗和 → その累積和（ms 境界での累積エネルギー）
+        energy = np.zeros(self.duration_ms + 1, dtype=np.int64)
+        if self.duration_ms > 0:
+            squares = samples[:bounds[-1]].astype(np.int64) ** 2
+            np.cumsum(np.add.reduceat(squares, bounds[:-1]), out=energy[1:])
+        self._energy = energy
+
+    def silent_ranges(self, min_silence_len: int, silence_thresh: float) -> list[list[int]]:
+        """無音区間 [start_ms, end_ms] のリスト（pydub.silence.detect_silence 相当）。"""
+        n = self.duration_ms
+        if n < min_silence_len:
+            return []
+
+        # 全ての窓開始位置 i (0..n-L) について窓 [i, i+L) の平均二乗を求める
+        starts = np.arange(n - min_silence_len + 1)
+        ends = starts + min_silence_len
+        energy = self._energy[ends] - self._energy[starts]
+        counts = self._bounds[ends] - self._bounds[starts]
+        # pydub は int(RMS) <= 閾値 で判定するため、整数演算で同じ境界にそろえる
+        thresh_amp = int((10 ** (silence_thresh / 20)) * MAX_AMPLITUDE)
+        silent = energy < (thresh_amp + 1) ** 2 * counts
+
+        silence_starts = np.flatnonzero(silent)
+        if len(silence_starts) == 0:
+            return []
+
+        # 開始位置の間隔が窓長を超えたところで区間を区切る
+        breaks = np.flatnonzero(np.diff(silence_starts) > min_silence_len)
+        range_starts = np.concatenate(([silence_starts[0]], silence_starts[breaks + 1]))
+        range_ends = np.concatenate((silence_starts[breaks], [silence_starts[-1]])) + min_silence_len
+        return [[int(s), int(e)] for s, e in zip(range_starts, range_ends)]
+
+    def nonsilent_ranges(self, min_silence_len: int, silence_thresh: float) -> list[list[int]]:
+        """有音区間 [start_ms, end_ms] のリスト（pydub.silence.detect_nonsilent 相当）。"""
+        silent = self.silent_ranges(min_silence_len, silence_thresh)
+        n = self.duration_ms
+        if not silent:
+            return [[0, n]]
+        if silent[0][0] == 0 and silent[0][1] == n:
+            return []
+
+        ranges = []
+        prev_end = 0
+        for start, end in silent:
+            ranges.append([prev_end, start])
+            prev_end = end
+        if prev_end != n:
+            ranges.append([prev_end, n])
+        if ranges[0] == [0, 0]:
+            ranges.pop(0)
+        return ranges
+
+    def split_ranges(self, min_silence_len: int, silence_thresh: float,
+                     keep_silence: int) -> list[tuple[int, int]]:
+        """分割後の各区間 (start_ms, end_ms)（pydub.silence.split_on_silence 相当）。"""
+        ranges = [[start - keep_silence, end + keep_silence]
+                  for start, end in self.nonsilent_ranges(min_silence_len, silence_thresh)]
+        for prev, nxt in zip(ranges, ranges[1:]):
+            if nxt[0] < prev[1]:
+                prev[1] = (prev[1] + nxt[0]) // 2
+                nxt[0] = prev[1]
+        return [(max(start, 0), min(end, self.duration_ms)) for start, end in ranges]
+
+    def sound_bounds(self, silence_thresh: float, frame_ms: int = 10) -> tuple[int, int] | None:
+        """音がある最初と最後の位置 (start_ms, end_ms)。全体が無音なら None。
+
+        frame_ms の窓の平均音量が閾値を超える最初の窓の先頭から、
+        最後の窓の末尾までを返す（単発のクリックノイズに反応しにくくするため窓で見る）。
+        """
+        n = self.duration_ms
+        frame_ms = min(frame_ms, n)
+        if frame_ms <= 0:
+            return None
+        starts = np.arange(n - frame_ms + 1)
+        ends = starts + frame_ms
+        energy = self._energy[ends] - self._energy[starts]
+        counts = self._bounds[ends] - self._bounds[starts]
+        thresh_amp = (10 ** (silence_thresh / 20)) * MAX_AMPLITUDE
+        loud = np.flatnonzero(energy > (thresh_amp ** 2) * counts)
+        if len(loud) == 0:
+            return None
+        return int(loud[0]), int(loud[-1]) + frame_ms
+
+    def trim_range(self, silence_thresh: float, onset_ms: int, tail_ms: int) -> tuple[int, int]:
+        """前後の無音を、音の前に onset_ms・後に tail_ms だけ残して削った範囲。
+
+        全体が無音なら削らずに全体を返す。
+        """
+        bounds = self.sound_bounds(silence_thresh)
+        if bounds is None:
+            return 0, self.duration_ms
+        start, end = bounds
+        return max(0, start - onset_ms), min(self.duration_ms, end + tail_ms)
+
+    def mean_dbfs(self, start_ms: int, end_ms: int) -> float:
+        """区間 [start_ms, end_ms) の平均音量 (dBFS)。無音なら -inf。"""
+        energy = self._energy[end_ms] - self._energy[start_ms]
+        count = self._bounds[end_ms] - self._bounds[start_ms]
+        if energy <= 0 or count <= 0:
+            return float("-inf")
+        return 10 * np.log10(energy / count / MAX_AMPLITUDE ** 2)
+
+    def split_exact(self, expected_count: int, silence_thresh: float, keep_silence: int,
+                    min_gap_len: int, ambiguity_ratio: float = 0.8) -> list[tuple[int, int]] | None:
+        """期待数 K に合わせ、最も確からしい K-1 個の無音で分割する。
+
+        min_gap_len 以上の内部無音（先頭・末尾の無音は除く）を候補とし、
+        長さと深さ（閾値からどれだけ静かか）のスコア上位 K-1 個を区切りに使う。
+        以下の場合は信頼できないとして None を返す:
+          - 候補が K-1 個に満たない
+          - 採用しなかった最良の候補が、採用した最弱の候補と見分けがつかない
+            （スコア比が ambiguity_ratio 以上 = 単語内の間と区別できない）
+        """
+        silent = self.silent_ranges(min_gap_len, silence_thresh)
+        n = self.duration_ms
+        speech_start = silent[0][1] if silent and silent[0][0] == 0 else 0
+        speech_end = silent[-1][0] if silent and silent[-1][1] == n else n
+        if speech_end <= speech_start:
+            return None
+
+        gaps = [(start, end) for start, end in silent
+                if start > speech_start and end < speech_end]
+        needed = expected_count - 1
+        if len(gaps) < needed:
+            return None
+
+        def score(gap):
+            start, end = gap
+            depth = max(0.0, silence_thresh - self.mean_dbfs(start, end))
+            # 深さ 1dB あたり 10ms 分の長さとして加点（完全な無音は 60dB 相当で頭打ち）
+            return (end - start) + 10 * min(depth, 60.0)
+
+        ranked = sorted(gaps, key=score, reverse=True)
+        chosen = sorted(ranked[:needed])
+        if needed and len(ranked) > needed:
+            if score(ranked[needed]) >= ambiguity_ratio * score(ranked[needed - 1]):
+                return None
+
+        bounds = [speech_start]
+        for start, end in chosen:
+            bounds.extend([start, end])
+        bounds.append(speech_end)
+
+        ranges = []
+        for i in range(0, len(bounds), 2):
+            start, end = bounds[i], bounds[i + 1]
+            # 前後の余白は隣の区間との中間点を超えない
+            lo = bounds[i - 1] if i > 0 else 0
+            hi = bounds[i + 2] if i + 2 < len(bounds) else n
+            pad_start = max(start - keep_silence, (lo + start) // 2 if i > 0 else 0)
+            pad_end = min(end + keep_silence, (end + hi) // 2 if i + 2 < len(bounds) else n)
+            ranges.append((pad_start, pad_end))
+        return ranges
+
+
+class StreamingSplitter:
+    """届いた順の PCM チャンクから、単語ごとの区間を確定したものから切り出す。
+
+    SilenceEnvelope.split_ranges(min_silence_len, silence_thresh, keep_silence) と同じ
+    区間を返す（区間の間の無音が keep_silence の2倍以上ある場合）。
+    有音のあとに min_silence_len 以上の無音が届いた時点でその単語の区間は確定するので、
+    残りの応答を待たずに返す。保持するのは最後に切った無音の先頭以降だけなので、
+    長いバッチでもメモリは1単語分と無音程度で済む。
+    """
+
+    def __init__(self, min_silence_len: int, silence_thresh: float, keep_silence: int,
+                 sample_rate: int = 24000):
+        self.min_silence_len = min_silence_len
+        self.silence_thresh = silence_thresh
+        self.keep_silence = keep_silence
+        self.sample_rate = sample_rate
+        self.emitted = 0
+        self._buffer = bytearray()
+        self._offset_ms = 0       # バッファ先頭の、音声全体での位置
+
+    def feed(self, pcm: bytes) -> list[tuple[int, int, bytes]]:
+        """チャンクを追加し、確定した区間を (開始 ms, 終了 ms, PCM) のリストで返す。"""
+        self._buffer += pcm
+        segments = []
+        while True:
+            envelope = self._envelope()
+            silent = envelope.silent_ranges(self.min_silence_len, self.silence_thresh)
+            speech_start = silent[0][1] if silent and silent[0][0] == 0 else 0
+            gaps = [gap for gap in silent if gap[0] > 0]
+            if not gaps or speech_start >= envelope.duration_ms:
+                return segments
+            gap_start = gaps[0][0]
+            start = max(0, speech_start - self.keep_silence)
+            end = gap_start + self.keep_silence
+            segments.append(self._segment(start, end))
+            # 次の単語の先頭側の無音を同じ位置で判定できるよう、無音の先頭から残す
+            del self._buffer[:gap_start * self.sample_rate // 1000 * 2]
+            self._offset_ms += gap_start
+
+    def finish(self) -> list[tuple[int, int, bytes]]:
+        """応答の終わりで呼び、残りの区間を返す。"""
+        envelope = self._envelope()
+        segments = [self._segment(start, end) for start, end in
+                    envelope.split_ranges(self.min_silence_len, self.silence_thresh,
+                                          self.keep_silence)]
+        self._buffer = bytearray()
+        return segments
+
+    def _envelope(self) -> SilenceEnvelope:
+        """バッファをコピーせずに見た SilenceEnvelope（ビューは返す前に手放す）。"""
+        # チャンクの境目がサンプルの途中のこともあるので、偶数バイトまでで判定する
+        with memoryview(self._buffer) as view:
+            return SilenceEnvelope(view[:len(view) // 2 * 2], self.sample_rate)
+
+    def _segment(self, start_ms: int, end_ms: int) -> tuple[int, int, bytes]:
+        # バッファは次の feed で詰めるので、切り出す区間だけは1回コピーする
+        first = start_ms * self.sample_rate // 1000 * 2
+        last = end_ms * self.sample_rate // 1000 * 2
+        self.emitted += 1
+        with memoryview(self._buffer) as view:
+            return (self._offset_ms + start_ms, self._offset_ms + end_ms,
+                    bytes(view[first:last]))
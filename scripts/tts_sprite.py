@@ -0,0 +1,93 @@
+"""アプリごとの音声スプライト（全クリップを1ファイルに連結）を作る。
+
+public/audio/<app>/ の個別 MP3 を1本の MP3 に連結し、各クリップの
+開始・終了位置（秒）をインデックス JSON に書き出す。アプリの音声を
+1リクエストで読み込んでキャッシュできるようにするためのもの。
+
+出力: public/audio/sprites/<app>.mp3, public/audio/sprites/<app>.json
+  {
+    "src": "/audio/sprites/<app>.mp3",
+    "clips": {"1.mp3": {"start": 0.0, "end": 0.84}, ...}
+  }
+
+再生側は Audio.currentTime = start で再生を始め、timeupdate で end を
+過ぎたら止める。クリップ間には SPRITE_GAP_MS の無音を挟み、
+停止が少し遅れても次のクリップの頭が鳴らないようにしている。
+"""
+
+import json
+import os
+
+from tts_encode import decode_batch, encode_mp3_batch
+from tts_journal import write_file_atomic
+
+SPRITE_DIR_NAME = "sprites"
+SPRITE_SAMPLE_RATE = 24000
+SPRITE_GAP_MS = 300
+SPRITE_BITRATE = "64k"     # 24kHz モノラルの音声なので個別ファイルより低くて十分
+
+
+def build_sprite(app_id: str, input_dir: str, filenames: list,
+                 audio_base_dir: str) -> tuple[str, dict]:
+    """input_dir 内の filenames を連結したスプライトを書き出し、(MP3のパス, インデックス) を返す。
+
+    存在しないファイルは飛ばす。同名ファイルは1回だけ含める。
+    """
+    paths = []
+    names = []
+    for filename in dict.fromkeys(filenames):
+        path = os.path.join(input_dir, filename)
+        if os.path.exists(path):
+            paths.append(path)
+            names.append(filename)
+
+    pcm_clips = decode_batch(paths, SPRITE_SAMPLE_RATE)
+    gap = b"\0\0" * (SPRITE_SAMPLE_RATE * SPRITE_GAP_MS // 1000)
+    parts = []
+    clips = {}
+    pos = 0  # サンプル数
+    for name, pcm in zip(names, pcm_clips):
+        n = len(pcm) // 2
+        clips[name] = {
+            "start": round(pos / SPRITE_SAMPLE_RATE, 3),
+            "end": round((pos + n) / SPRITE_SAMPLE_RATE, 3),
+        }
+        parts.append(pcm)
+        parts.append(gap)
+        pos += n + len(gap) // 2
+
+    [sprite_mp3] = encode_mp3_batch([b"".join(parts)], SPRITE_SAMPLE_RATE, SPRITE_BITRATE)
+
+    sprite_dir = os.path.join(audio_base_dir, SPRITE_DIR_NAME)
+    os.makedirs(sprite_dir, exist_ok=True)
+    index = {"src": f"/audio/{SPRITE_DIR_NAME}/{app_id}.mp3", "clips": clips}
+    sprite_path = os.path.join(sprite_dir, f"{app_id}.mp3")
+    # どちらも置き換えで保存し、途中で止まっても書きかけのスプライトやインデックスを残さない
+    write_file_atomic(sprite_path, sprite_mp3)
+    write_file_atomic(os.path.join(sprite_dir, f"{app_id}.json"),
+                      (json.dumps(index, ensure_ascii=False, indent=1) + "\n").encode("utf-8"))
+    return sprite_path, index
+
+
+def build_app_sprites(apps: dict, app_ids: list, audio_base_dir: str) -> list[tuple[str, str, int]]:
+    """各アプリのスプライトを作り、(app_id, MP3のパス, クリップ数) のリストを返す。
+
+    apps は各生成スクリプトの APPS（output_dir と get_items を持つ dict）。
+    """
+    results = []
+    for app_id in app_ids:
+        app = apps[app_id]
+        input_dir = os.path.join(audio_base_dir, app["output_dir"])
+        filenames = [item["filename"] for item in app["get_items"]()]
+        sprite_path, index = build_sprite(app_id, input_dir, filenames, audio_base_dir)
+        results.append((app_id, sprite_path, len(index["clips"])))
+    return results
+
+
+def write_sprites(apps: dict, app_ids: list, audio_base_dir: str):
+    """各アプリのスプライトを書き出し、結果を表示する（生成スクリプトの --sprite 用）。"""
+    print(f"\n音声スプライト:")
+    for app_id, path, count in build_app_sprites(apps, app_ids, audio_base_dir):
+        kb = os.path.getsize(path) / 1024
+        rel = os.path.relpath(path, audio_base_dir).replace(os.sep, "/")
+        print(f"  {app_id}: {rel} ({count}件, {kb:.1f}KB)")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""生成済みの音声ファイルを並列に検査し、おかしいものだけを次回の生成に回す。
+
+Gemini のバッチ音声の分割がずれると、別の単語・ほぼ無音のクリップ・2単語がつながった
+クリップが保存されることがある。全ファイルを聞き直したり --force で全部作り直したりせずに
+済むよう、各ファイルをデコードして次の値を調べる:
+
+  発話長    有音部分の長さ。読みの長さ（日本語はモーラ数、英語は文字数）あたりの発話長を
+            同じアプリ・同じバックエンドのファイルの中央値と比べ、極端に短い・長いものを検出する
+            （別の単語が入った・語の一部が欠けた・2語分入ったクリップ）
+  音量      有音部分の平均音量 (dBFS)。絶対値と、同じグループの中央値との差で見る
+  無音率    ファイル全体のうち無音の割合（前後の無音が長すぎる・ほぼ無音のクリップ）
+  区切れ    発話の途中の長い無音（2単語がつながったクリップ）
+
+デコードは CHUNK_SIZE 件ずつ1回の ffmpeg 起動で行い、チャンクをスレッドで並列に処理する。
+
+--requeue を付けると、検出したファイルのマニフェスト（scripts/tts-manifest.json）の記録を
+無効化する。ファイルはそのまま残るので、次に generate-audio*.py を実行したときに
+そのファイルだけが再生成される（差し替えまではアプリは今のファイルを使う）。
+
+使い方:
+  # 全アプリを検査して結果を表示
+  python scripts/validate-audio.py
+
+  # 検出したファイルを次回の生成で作り直させる
+  python scripts/validate-audio.py --requeue
+  python scripts/generate-audio.py
+
+  # 特定のアプリのみ・結果を JSON で保存
+  python scripts/validate-audio.py --app hiragana-flash --json validate.json
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tts_cache import SynthesisCache
+from tts_catalog import APPS, catalog_items
+from tts_encode import decode_batch
+from tts_silence import SilenceEnvelope
+
+# --- 定数 ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_BASE_DIR = os.path.join(SCRIPT_DIR, "..", "edup-app", "public", "audio")
+
+SAMPLE_RATE = 24000
+CHUNK_SIZE = 32                 # 1回の ffmpeg 起動でデコードするファイル数
+SILENCE_THRESH = -45            # これより小さい音は無音とみなす (dBFS)
+SILENCE_MIN_LEN = 100           # 無音とみなす最短の長さ (ms)
+GAP_MIN_LEN = 400               # 発話の途中でこれ以上の無音があれば「区切れ」とする (ms)
+MIN_SPEECH_MS = 150             # 有音部分がこれより短ければ「無音」とする
+QUIET_DBFS = -32                # 有音部分の平均音量がこれより小さければ「小さい」
+QUIET_RELATIVE_DB = 12          # グループの中央値よりこれ以上小さければ「小さい」
+DEFAULT_MAX_SILENCE_RATIO = 0.75
+DEFAULT_RATE_TOLERANCE = 2.0    # 1単位あたりの発話長が中央値の 1/x 〜 x 倍を外れたら外れ値
+OVERHEAD_UNITS = 1              # 短い語ほど1単位あたりが長くなるのを均すために足す単位数
+MIN_GROUP_SIZE = 8              # これより少ないグループは発話長の比較をしない
+
+SMALL_KANA = set("ぁぃぅぇぉゃゅょゎァィゥェォャュョヮ")
+DIGIT_MORAE = {1: 2, 2: 1, 3: 2, 4: 2, 5: 1, 6: 2, 7: 2, 8: 2, 9: 2}   # いち に さん …
+
+
+def number_morae(n: int) -> int:
+    """数の読み（いち・じゅう・ひゃく・せん）のおおよそのモーラ数。"""
+    if n == 0:
+        return 2
+    if n >= 10000:
+        return 2 * len(str(n))
+    morae = 0
+    for unit_morae, digit in ((2, n // 1000), (2, n // 100 % 10), (2, n // 10 % 10)):
+        if digit:
+            morae += unit_morae + (DIGIT_MORAE[digit] if digit > 1 else 0)
+    if n % 10:
+        morae += DIGIT_MORAE[n % 10]
+    return morae
+
+
+def reading_units(text: str, lang: str) -> int:
+    """読みの長さの目安。日本語はモーラ数（漢字は2、数字は読みで数える）、英語は文字数。"""
+    if lang != "ja":
+        return sum(1 for ch in text if ch.isalpha())
+    units = 0
+    digits = ""
+    for ch in text + " ":
+        if ch.isdigit():
+            digits += ch
+            continue
+        if digits:
+            units += number_morae(int(digits))
+            digits = ""
+        if ch in SMALL_KANA:
+            continue
+        if "ぁ" <= ch <= "ヿ":      # ひらがな・カタカナ・長音
+            units += 1
+        elif "一" <= ch <= "鿿":    # 漢字
+            units += 2
+        elif ch.isalpha():
+            units += 1
+    return units
+
+
+def analyze_clip(pcm: bytes) -> dict:
+    """1クリップの長さ・発話長・音量・無音率・途中の無音の数を返す。"""
+    envelope = SilenceEnvelope(pcm, SAMPLE_RATE)
+    duration_ms = envelope.duration_ms
+    voiced = envelope.nonsilent_ranges(SILENCE_MIN_LEN, SILENCE_THRESH)
+    speech_ms = sum(end - start for start, end in voiced)
+    if speech_ms:
+        energy = sum(10 ** (envelope.mean_dbfs(start, end) / 10) * (end - start)
+                     for start, end in voiced)
+        loudness = 10 * math.log10(energy / speech_ms) if energy > 0 else float("-inf")
+    else:
+        loudness = float("-inf")
+    if voiced:
+        speech_start, speech_end = voiced[0][0], voiced[-1][1]
+        gaps = [start - end for (_s, end), (start, _e) in zip(voiced, voiced[1:])
+                if start - end >= GAP_MIN_LEN]
+    else:
+        speech_start = speech_end = 0
+        gaps = []
+    return {
+        "duration_ms": duration_ms,
+        "speech_ms": speech_ms,
+        "span_ms": speech_end - speech_start,
+        "loudness_dbfs": round(loudness, 1) if speech_ms else None,
+        "silence_ratio": round(1 - speech_ms / duration_ms, 3) if duration_ms else 1.0,
+        "gaps": len(gaps),
+        "longest_gap_ms": max(gaps, default=0),
+    }
+
+
+def analyze_files(paths: list, jobs: int) -> dict:
+    """ファイル群をチャンクごとに並列にデコード・解析し、{パス: 解析結果} を返す。"""
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+
+    def run(chunk):
+        try:
+            pcms = decode_batch(chunk, SAMPLE_RATE)
+        except RuntimeError:
+            # 壊れたファイルが混ざっているとチャンク全体が失敗するので1件ずつやり直す
+            pcms = []
+            for path in chunk:
+                try:
+                    pcms.append(decode_batch([path], SAMPLE_RATE)[0])
+                except RuntimeError as e:
+                    pcms.append(e)
+        return {path: ({"error": str(pcm)} if isinstance(pcm, Exception) else analyze_clip(pcm))
+                for path, pcm in zip(chunk, pcms)}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for chunk_results in executor.map(run, chunks):
+            results.update(chunk_results)
+            print(f"\r  解析中: {len(results)}/{len(paths)}", end="", flush=True)
+    if chunks:
+        print()
+    return results
+
+
+def find_problems(entries: list, max_silence_ratio: float, rate_tolerance: float):
+    """entries の各 dict に problems（理由のリスト）を付ける。
+
+    発話長と音量はアプリ・バックエンドごとのグループの中央値と比べる
+    （ボイスや話速が違うバックエンドのファイルを混ぜて比べないため）。
+    """
+    groups = {}
+    for entry in entries:
+        if "error" not in entry["stats"]:
+            groups.setdefault((entry["app_id"], entry["backend"]), []).append(entry)
+
+    for group in groups.values():
+        rates = [e["stats"]["speech_ms"] / (e["units"] + OVERHEAD_UNITS)
+                 for e in group if e["stats"]["speech_ms"] >= MIN_SPEECH_MS]
+        louds = [e["stats"]["loudness_dbfs"] for e in group
+                 if e["stats"]["loudness_dbfs"] is not None]
+        median_rate = statistics.median(rates) if len(rates) >= MIN_GROUP_SIZE else None
+        median_loud = statistics.median(louds) if louds else None
+        for entry in group:
+            entry["expected_ms"] = (round(median_rate * (entry["units"] + OVERHEAD_UNITS))
+                                    if median_rate else None)
+            entry["median_loudness_dbfs"] = median_loud
+
+    for entry in entries:
+        stats = entry["stats"]
+        problems = []
+        if "error" in stats:
+            problems.append(f"デコード失敗: {stats['error']}")
+        elif stats["speech_ms"] < MIN_SPEECH_MS:
+            problems.append(f"無音 (発話 {stats['speech_ms']}ms)")
+        else:
+            expected = entry["expected_ms"]
+            if expected:
+                ratio = stats["speech_ms"] / expected
+                if ratio > rate_tolerance:
+                    problems.append(f"長すぎる (発話 {stats['speech_ms']}ms / 目安 {expected}ms)")
+                elif ratio < 1 / rate_tolerance:
+                    problems.append(f"短すぎる (発話 {stats['speech_ms']}ms / 目安 {expected}ms)")
+            loud = stats["loudness_dbfs"]
+            median_loud = entry["median_loudness_dbfs"]
+            if loud < QUIET_DBFS or (median_loud is not None
+                                     and loud < median_loud - QUIET_RELATIVE_DB):
+                problems.append(f"音が小さい ({loud:.1f}dBFS)")
+            if stats["gaps"]:
+                problems.append(f"発話の途中に無音 ({stats['longest_gap_ms']}ms)")
+            if stats["silence_ratio"] > max_silence_ratio:
+                problems.append(f"無音が多い ({stats['silence_ratio']:.0%})")
+        entry["problems"] = problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="生成済みの音声ファイルを検査し、外れ値を次回の生成に回す"
+    )
+    parser.add_argument("--app", choices=list(APPS.keys()),
+                        help="特定のアプリのみ検査")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4,
+                        help="並列に処理するチャンク数 (default: CPU 数)")
+    parser.add_argument("--max-silence-ratio", type=float, default=DEFAULT_MAX_SILENCE_RATIO,
+                        help=f"これを超える無音率を外れ値とする (default: {DEFAULT_MAX_SILENCE_RATIO})")
+    parser.add_argument("--rate-tolerance", type=float, default=DEFAULT_RATE_TOLERANCE,
+                        help="読みの長さあたりの発話長が中央値の 1/x〜x 倍を外れたら外れ値 "
+                             f"(default: {DEFAULT_RATE_TOLERANCE})")
+    parser.add_argument("--requeue", action="store_true",
+                        help="外れ値のマニフェストの記録を無効化し、次回の生成で作り直させる")
+    parser.add_argument("--json", help="全ファイルの検査結果を保存する JSON ファイル")
+    parser.add_argument("--verbose", action="store_true",
+                        help="問題のないファイルの値も表示")
+    args = parser.parse_args()
+    if args.rate_tolerance <= 1:
+        parser.error("--rate-tolerance は 1 より大きくしてください")
+
+    app_ids = [args.app] if args.app else list(APPS.keys())
+    cache = SynthesisCache()
+
+    # 同じファイル名のアイテム（英語フラッシュの "orange" など）は1回だけ検査する
+    entries = {}
+    missing = 0
+    for app_id, output_dir, item in catalog_items(app_ids, AUDIO_BASE_DIR):
+        filepath = os.path.join(output_dir, item["filename"])
+        if filepath in entries:
+            continue
+        if not os.path.exists(filepath):
+            missing += 1
+            continue
+        manifest = cache.entry(filepath) or {}
+        entries[filepath] = {
+            "app_id": app_id,
+            "path": os.path.relpath(filepath, AUDIO_BASE_DIR).replace(os.sep, "/"),
+            "filepath": filepath,
+            "speech": item["speech"],
+            "units": reading_units(item["speech"], item["lang"]),
+            "backend": manifest.get("backend", "unknown"),
+            "manifest_key": manifest.get("key"),
+        }
+
+    print(f"音声ファイルの検査")
+    print(f"{'='*60}")
+    print(f"  対象: {', '.join(app_ids)}")
+    print(f"  ファイル: {len(entries)}件 (未生成 {missing}件)")
+    print(f"  並列数: {args.jobs} (1チャンク {CHUNK_SIZE}件)")
+    print(f"{'='*60}")
+
+    start_time = time.time()
+    stats = analyze_files(list(entries), args.jobs)
+    entries = list(entries.values())
+    for entry in entries:
+        entry["stats"] = stats[entry["filepath"]]
+    find_problems(entries, args.max_silence_ratio, args.rate_tolerance)
+    elapsed = time.time() - start_time
+
+    flagged = [entry for entry in entries if entry["problems"]]
+    for entry in entries:
+        if entry["problems"]:
+            print(f"  NG {entry['path']} [{entry['backend']}]: {' / '.join(entry['problems'])}")
+        elif args.verbose:
+            s = entry["stats"]
+            print(f"  OK {entry['path']} [{entry['backend']}]: 発話 {s['speech_ms']}ms "
+                  f"(目安 {entry['expected_ms']}ms), {s['loudness_dbfs']}dBFS, "
+                  f"無音 {s['silence_ratio']:.0%}")
+
+    if args.requeue and flagged:
+        for entry in flagged:
+            cache.invalidate(entry["filepath"], reason="; ".join(entry["problems"]))
+        # 同じ音声を配った他の出力先（SharedClips）も無効化し、悪い音声が配り直されないようにする
+        bad_keys = {entry["manifest_key"] for entry in flagged if entry["manifest_key"]}
+        for rel, manifest in list(cache.entries.items()):
+            if manifest.get("key") in bad_keys:
+                cache.invalidate(os.path.join(cache.base_dir, rel), reason="同じ音声が外れ値")
+        cache.save()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([{key: value for key, value in entry.items() if key != "filepath"}
+                       for entry in entries], f, ensure_ascii=False, indent=1)
+            f.write("\n")
+
+    print(f"\n{'='*60}")
+    print(f"  検査: {len(entries)}件 ({elapsed:.1f}秒)")
+    print(f"  外れ値: {len(flagged)}件")
+    if flagged:
+        if args.requeue:
+            print(f"  → マニフェストの記録を無効化しました。次回の生成でこの{len(flagged)}件だけ作り直します")
+        else:
+            print(f"  → --requeue で次回の生成に回せます")
+    if args.json:
+        print(f"  結果: {args.json}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()